@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""
+Per-lead opener generation latency: multi-step chain vs fused single call.
+
+- multi: generic opener + generic subject + body personalization + subject personalization
+         (4 sequential LLM calls per lead, as sequence_runner.build_opener_draft does)
+- fused: one structured-output call (fused_opener.FusedOpener); leads whose fused output fails
+         validation fall back to the multi-step chain, and that cost is included
+
+Both paths run the real request building, parsing and sanitizing code. By default the LLM is
+simulated so the benchmark runs offline and is reproducible: each call costs
+rtt + prefill * input tokens + decode * output tokens (log-normal jitter), counted on a virtual
+clock and added to the measured local CPU time. `--live` sends real requests (OpenAI key and
+prompt files required) and reports wall time instead.
+
+Usage:
+  python3 scripts/bench_fused_opener.py
+  python3 scripts/bench_fused_opener.py --leads 200 --invalid-rate 0.1
+  python3 scripts/bench_fused_opener.py --rtt-ms 500 --decode-ms-per-token 20
+  python3 scripts/bench_fused_opener.py --live --leads 10
+
+Notes:
+- The LLM cache is disabled for the run (LLM_CACHE_DB=off) so every lead pays for its calls.
+- Offline, sample prompts are used for any prompt not set through its env var (OPENER_PROMPT, ...).
+"""
+from __future__ import annotations
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List
+
+# Ensure repo root is on path when run from anywhere
+REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+os.environ["LLM_CACHE_DB"] = "off"
+
+from workflows.outreach_sender.AI_Intergrations import opener_ai_writer, personalizer  # noqa: E402
+from workflows.outreach_sender.AI_Intergrations.fused_opener import FusedOpener  # noqa: E402
+from workflows.universal_outreach_utils import llm_pool  # noqa: E402
+from workflows.universal_outreach_utils.token_budget import count_tokens, tokenizer_for  # noqa: E402
+
+SAMPLE_PROMPTS = {
+    "OPENER_PROMPT": (
+        "Write a short cold email (3-5 sentences) from an automation agency to a small business owner. "
+        "Open with an observation about their business, name one workflow we could automate, and end "
+        "with a low-friction question. No links, no placeholders in brackets."
+    ),
+    "SUBJECT_PROMPT": 'Write one short, curiosity-driven subject line (max 6 words). Return ONLY JSON: {"subject": "..."}',
+    "PERSONALIZER_PROMPT": (
+        "Rewrite the base email for {{first_name}} at {{company_name}}. Use the overview and custom fields "
+        "for one specific, accurate detail; keep the length and the call to action. "
+        'Return ONLY JSON: {"subject": "...", "body_html": "..."}'
+    ),
+    "SUBJECT_PERSONALIZER_PROMPT": (
+        "Personalize the base subject for {{company_name}} with at most one specific detail; keep it under "
+        '8 words. Return ONLY JSON: {"subject": "..."}'
+    ),
+}
+
+_INDUSTRIES = ["dental clinic", "roofing contractor", "law firm", "marketing agency", "physiotherapy practice", "HVAC company"]
+_SENTENCE = (
+    "We help teams like yours save hours every week by automating intake, follow-ups and reporting "
+    "so nothing slips through the cracks while you focus on clients"
+)
+
+
+def sample_leads(n: int, seed: int) -> List[Dict[str, str]]:
+    rng = random.Random(seed)
+    leads = []
+    for i in range(n):
+        industry = rng.choice(_INDUSTRIES)
+        leads.append({
+            "Email": f"lead{i}@example.com",
+            "First Name": rng.choice(["Ana", "Ben", "Chris", "Dana", "Eli", "Fran"]),
+            "Company Name": f"{rng.choice(['North', 'Blue', 'Summit', 'Oak', 'Harbor'])} {industry.title()} {i}",
+            "Industry": industry,
+            "Overview": " ".join([f"A {industry} serving the local area since {1990 + i % 30}."] + [_SENTENCE] * rng.randint(1, 6)),
+            "Custom 1": f"Recently expanded to a second {industry} location.",
+            "Custom 2": f"Online booking and quotes for {industry} customers.",
+        })
+    return leads
+
+
+# =============================
+# Simulated LLM
+# =============================
+class _Message:
+    def __init__(self, content):
+        self.content = content
+
+
+class _Choice:
+    def __init__(self, content):
+        self.message = _Message(content)
+
+
+class _Response:
+    def __init__(self, content):
+        self.choices = [_Choice(content)]
+        self.usage = None
+
+
+class SimulatedLLM:
+    """Stands in for llm_pool.chat: plausible completions per request kind, latency on a virtual clock."""
+
+    def __init__(self, rtt_ms: float, prefill_ms_per_1k: float, decode_ms_per_token: float,
+                 invalid_rate: float, seed: int):
+        self.rtt_ms = rtt_ms
+        self.prefill_ms_per_1k = prefill_ms_per_1k
+        self.decode_ms_per_token = decode_ms_per_token
+        self.invalid_rate = invalid_rate
+        self.rng = random.Random(seed)
+        self.failure_rng = random.Random(seed + 1)
+        self.clock_ms = 0.0
+        self.calls = 0
+        self.input_tokens = 0
+        self.output_tokens = 0
+
+    @staticmethod
+    def _lead_json(messages) -> Dict:
+        text = messages[-1]["content"]
+        try:
+            return json.loads(text[text.index("{"):])
+        except ValueError:
+            return {}
+
+    def _body(self, company: str) -> str:
+        who = company or "your team"
+        return (
+            f"Hi there,\n\nI was looking at {who} and noticed how much of your week goes into booking and quotes. "
+            "We build small automations that take intake and follow-ups off your plate without changing your tools.\n\n"
+            "One client cut their response time from a day to minutes with a simple workflow. "
+            f"Would a two-minute walkthrough of what that could look like for {who} be useful?"
+        )
+
+    def _content(self, request: Dict) -> str:
+        messages = request["messages"]
+        system = messages[0]["content"]
+        if "response_format" in request:  # fused
+            company = self._lead_json(messages).get("company_name", "")
+            if self.failure_rng.random() < self.invalid_rate:
+                return json.dumps({"subject": "", "body_html": "Too short."})
+            return json.dumps({"subject": f"An idea for {company}", "body_html": self._body(company)})
+        if system.startswith("You are a B2B cold email generator"):
+            return self._body("")
+        if system.startswith("You write concise, non-spammy email subjects"):
+            return json.dumps({"subject": "Quick idea for your team"})
+        if system.startswith("You rewrite emails"):
+            company = self._lead_json(messages).get("company_name", "")
+            return json.dumps({"subject": "Quick idea for your team", "body_html": self._body(company)})
+        company = self._lead_json(messages).get("company_name", "")
+        return json.dumps({"subject": f"An idea for {company}"})
+
+    def chat(self, **request):
+        content = self._content(request)
+        tokens_in = tokenizer_for().count_messages(request["messages"])
+        tokens_out = count_tokens(content)
+        ms = self.rtt_ms + self.prefill_ms_per_1k * tokens_in / 1000.0 + self.decode_ms_per_token * tokens_out
+        self.clock_ms += ms * self.rng.lognormvariate(0.0, 0.25)
+        self.calls += 1
+        self.input_tokens += tokens_in
+        self.output_tokens += tokens_out
+        return _Response(content)
+
+
+# =============================
+# Paths under test
+# =============================
+def multi_step(lead: Dict) -> Dict:
+    base_email = opener_ai_writer.generate_email(lead)
+    base_email["subject"] = opener_ai_writer.generate_generic_subject().get("subject", base_email.get("subject", ""))
+    final_email = personalizer.personalize_email(
+        base_subject=base_email.get("subject", ""),
+        base_body_html=base_email.get("body_html", ""),
+        lead=lead,
+        prompt_override=None,
+    )
+    subj_final = personalizer.personalize_subject(final_email.get("subject", ""), lead)
+    final_email["subject"] = subj_final.get("subject", final_email.get("subject", ""))
+    return final_email
+
+
+def fused(opener: FusedOpener, lead: Dict) -> Dict:
+    return opener.generate(lead) or multi_step(lead)
+
+
+def run(name, fn, leads, sim) -> Dict:
+    latencies = []
+    calls = tokens_in = tokens_out = 0
+    for lead in leads:
+        if sim is not None:
+            before = (sim.clock_ms, sim.calls, sim.input_tokens, sim.output_tokens)
+        started = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            fn(lead)
+        ms = (time.perf_counter() - started) * 1000.0
+        if sim is not None:
+            ms += sim.clock_ms - before[0]
+            calls += sim.calls - before[1]
+            tokens_in += sim.input_tokens - before[2]
+            tokens_out += sim.output_tokens - before[3]
+        latencies.append(ms)
+    latencies.sort()
+    n = len(leads)
+    return {
+        "name": name,
+        "p50": latencies[n // 2],
+        "p95": latencies[min(n - 1, int(n * 0.95))],
+        "mean": sum(latencies) / n,
+        "calls": calls / n if sim is not None else None,
+        "tokens_in": tokens_in / n if sim is not None else None,
+        "tokens_out": tokens_out / n if sim is not None else None,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark per-lead opener latency: multi-step chain vs fused call.")
+    parser.add_argument("--leads", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--live", action="store_true", help="Send real requests instead of simulating the LLM.")
+    parser.add_argument("--rtt-ms", type=float, default=350.0, help="Simulated per-call overhead (network + queueing + first token).")
+    parser.add_argument("--prefill-ms-per-1k", type=float, default=40.0, help="Simulated prompt processing per 1k input tokens.")
+    parser.add_argument("--decode-ms-per-token", type=float, default=12.0, help="Simulated generation time per output token.")
+    parser.add_argument("--invalid-rate", type=float, default=0.0, help="Share of simulated fused outputs that fail validation.")
+    args = parser.parse_args()
+
+    leads = sample_leads(args.leads, args.seed)
+    opener = FusedOpener()
+    sim = None
+    if not args.live:
+        for env_var, text in SAMPLE_PROMPTS.items():
+            os.environ.setdefault(env_var, text)
+        sim = SimulatedLLM(args.rtt_ms, args.prefill_ms_per_1k, args.decode_ms_per_token, args.invalid_rate, args.seed)
+        llm_pool.chat = sim.chat
+
+    results = [run("multi", multi_step, leads, sim), run("fused", lambda lead: fused(opener, lead), leads, sim)]
+
+    mode = "live" if args.live else "simulated"
+    print(f"Per-lead opener generation, {len(leads)} leads ({mode} LLM)")
+    print(f"{'path':<7}{'p50 ms':>10}{'p95 ms':>10}{'mean ms':>10}{'calls':>8}{'in tok':>9}{'out tok':>9}")
+    for r in results:
+        extra = "" if r["calls"] is None else f"{r['calls']:>8.2f}{r['tokens_in']:>9.0f}{r['tokens_out']:>9.0f}"
+        print(f"{r['name']:<7}{r['p50']:>10.0f}{r['p95']:>10.0f}{r['mean']:>10.0f}{extra}")
+    multi, fused_r = results
+    print(f"fused vs multi: {multi['p50'] / fused_r['p50']:.2f}x faster at p50, {multi['p95'] / fused_r['p95']:.2f}x at p95")
+    print(f"fused fallbacks to the multi-step chain: {opener.counters['invalid'] + opener.counters['errors']}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark for the LLM output post-processing rules (text_rules).
+
+Builds a deterministic corpus of sample LLM outputs (clean emails plus the artifacts the rules
+target: bracket placeholders, '<Company> like yours', empty greetings, dangling prepositions,
+'a audit', generic audience phrases, <br> runs), then times per-email CPU for:
+
+- legacy: the previous per-call re.sub chain (kept below as the reference implementation)
+- rules:  the precompiled text_rules engine
+
+and checks that both produce identical output for every sample.
+
+Usage:
+  python3 scripts/bench_text_rules.py
+  python3 scripts/bench_text_rules.py --samples 5000 --repeat 5
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import re
+import sys
+import time
+from pathlib import Path
+
+# Ensure repo root is on path when run from anywhere
+REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+from workflows.outreach_sender.AI_Intergrations import text_rules  # noqa: E402
+
+
+# =============================
+# Legacy chain (reference)
+# =============================
+def _legacy_remove_brackets(text):
+    return re.sub(r"\[.*?\]", "", text).strip()
+
+
+def _legacy_fix_company_like_yours(text, company_name):
+    if not text:
+        return ""
+    cn = (company_name or "").strip()
+    out = text
+    if cn:
+        pattern = re.compile(re.escape(cn) + r"\s+like\s+yours", re.IGNORECASE)
+        out = pattern.sub("companies like yours", out)
+    out = re.sub(r"\b[a-zA-Z0-9&\-\s]+\s+like\s+yours\b", "companies like yours", out)
+    out = re.sub(r'\bHi\s*,', 'Hi there,', out)
+    out = re.sub(r'\bHi\s{2,},', 'Hi there,', out)
+    out = re.sub(r'\bresonate with\s*\.', '', out, flags=re.IGNORECASE)
+    out = re.sub(r'\bfor\s*\.', '', out, flags=re.IGNORECASE)
+    out = re.sub(r'with\s*\.', '', out, flags=re.IGNORECASE)
+    out = re.sub(r' {2,}', ' ', out)
+    out = re.sub(r'\s+,', ',', out)
+    out = re.sub(r',\s+,', ',', out)
+    return out
+
+
+def _legacy_finish(subject, body_html, company_name):
+    subject, body_html = _legacy_remove_brackets(subject), _legacy_remove_brackets(body_html)
+    body_html = _legacy_fix_company_like_yours(body_html, company_name)
+
+    def fix_articles(text):
+        return re.sub(r'\ba\s+([aeiouAEIOU])', r'an \1', text)
+    return fix_articles(subject), fix_articles(body_html)
+
+
+def _legacy_specialize(text, company_name, offer_summary):
+    cn = (company_name or "").strip()
+    target = cn or (offer_summary or "").strip()
+    out = text
+    if not target:
+        out = re.sub(r"\bwe\s+help\s+(?:business\s*owners|businesses|companies|teams)\b", "we help", out, flags=re.IGNORECASE)
+        out = re.sub(r"\bfor\s+(?:business\s*owners|businesses|companies|teams)\b", "", out, flags=re.IGNORECASE)
+        return re.sub(r"\bhelp\s+(?:your|their)\s+(?:business|company)\b", "help", out, flags=re.IGNORECASE)
+    out = re.sub(r"\bwe\s+help\s+(?:business\s*owners|businesses|companies|teams)\b", f"we help {target}", out, flags=re.IGNORECASE)
+    out = re.sub(r"\bfor\s+(?:business\s*owners|businesses|companies|teams)\b", f"for {target}", out, flags=re.IGNORECASE)
+    return re.sub(r"\bhelp\s+(?:your|their)\s+(?:business|company)\b", f"help {target}", out, flags=re.IGNORECASE)
+
+
+def _legacy_light_smooth(text):
+    t = text
+    t = re.sub(r"\bHi\s*,\b", "Hi there,", t)
+    t = re.sub(r"\bHello\s*,\b", "Hello there,", t)
+    t = re.sub(r"\b(at|with|for)\s*\.(?=\s|$)", "", t, flags=re.IGNORECASE)
+    t = re.sub(r"\ba\s+(?=[aeiouAEIOU])", "an ", t)
+    t = re.sub(r"[ \t]{2,}", " ", t)
+    return t.strip()
+
+
+def legacy(sample):
+    subject, body, company, offer = sample
+    body = _legacy_specialize(body, company, offer)
+    subject, body = _legacy_finish(subject, body, company)
+    return subject, body, _legacy_light_smooth(body)
+
+
+def rules(sample):
+    subject, body, company, offer = sample
+    body = text_rules.specialize_generic_claims(body, company, offer)
+    subject, body = text_rules.clean_personalized_email(subject, body, company)
+    return subject, body, text_rules.light_smooth(body)
+
+
+# =============================
+# Corpus
+# =============================
+COMPANIES = ["Acme Co", "Globex", "Initech", "Northwind Traders", "Umbrella Labs", "Hooli", ""]
+OFFERS = ["We help dental clinics book more patients", "bookkeeping for agencies", "", "Call us today!"]
+SENTENCES = [
+    "I came across {company} while looking at teams in your space.",
+    "We help businesses automate the follow-up work that eats their week.",
+    "Most founders we talk to lose a few hours a day to manual outreach.",
+    "Would a short walkthrough be useful for {company}?",
+    "It usually takes less than a week to get running.",
+    "Happy to share a 60-second loom of the exact workflow.",
+    "We built a audit checklist for {company} like yours.",
+    "This could really resonate with .",
+    "Curious if this is a priority for .",
+    "[Insert case study] showed a 30% lift in replies.",
+    "No pressure either way , just thought it was relevant.",
+    "It could help your business reply faster<br><br>without extra hires.",
+]
+
+
+def build_corpus(n, seed=7):
+    rnd = random.Random(seed)
+    corpus = []
+    for _ in range(n):
+        company = rnd.choice(COMPANIES)
+        greeting = rnd.choice(["Hi {company},", "Hi ,", "Hello ,", "Hey there,"])
+        body = "\n\n".join([greeting] + rnd.sample(SENTENCES, rnd.randint(3, 6)) + ["Best,\nKevin"])
+        subject = rnd.choice(["Quick idea for {company}", "[Subject] a idea", "Question about your business", "Re: outreach"])
+        corpus.append((subject.format(company=company), body.format(company=company), company, rnd.choice(OFFERS)))
+    return corpus
+
+
+def bench(fn, corpus, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.process_time()
+        for sample in corpus:
+            fn(sample)
+        best = min(best, time.process_time() - t0)
+    return best / len(corpus) * 1e6  # µs per email
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Per-email CPU time of the LLM output post-processing rules.")
+    parser.add_argument("--samples", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    corpus = build_corpus(args.samples)
+    mismatches = [s for s in corpus if legacy(s) != rules(s)]
+    legacy_us = bench(legacy, corpus, args.repeat)
+    rules_us = bench(rules, corpus, args.repeat)
+
+    print(f"Corpus: {len(corpus)} sample outputs (best of {args.repeat})")
+    print(f"  legacy re.sub chain : {legacy_us:8.1f} µs/email")
+    print(f"  text_rules engine   : {rules_us:8.1f} µs/email  ({legacy_us / rules_us:.1f}x)")
+    print(f"  output mismatches   : {len(mismatches)}")
+    for s in mismatches[:3]:
+        print(f"    {s!r}\n      legacy: {legacy(s)!r}\n      rules:  {rules(s)!r}")
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Import-time budget for the CLI / cron entry points.
+
+Imports each module in a fresh interpreter under `python -X importtime` and checks:
+- cold import time (the module plus its parent packages, cumulative, best of --runs) against
+  its budget in ms
+- side effects: importing must not open data/credential files, create directories or replace
+  sys.stdout / sys.stderr (an audit hook records them; reading Python sources is ignored)
+
+Usage:
+  python3 scripts/import_time_budget.py
+  python3 scripts/import_time_budget.py --scale 2          # slower machine: double every budget
+  python3 scripts/import_time_budget.py --top 8            # also list the slowest imports
+  python3 scripts/import_time_budget.py --skip-missing     # skip modules whose deps are not installed
+
+Notes:
+- Exit code: 0 if every module is within budget and side-effect free, 1 otherwise.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import re
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+# Ensure repo root is on path when run from anywhere
+REPO_ROOT = Path(__file__).resolve().parents[1]
+
+# module -> budget in ms (cold import, this module and everything it pulls in)
+BUDGETS_MS: Dict[str, float] = {
+    "workflows.outreach_sender.sequence_runner": 250,
+    "workflows.outreach_sender.AI_Intergrations.batch_jobs": 200,
+    "workflows.outreach_sender.AI_Intergrations.personalizer": 120,
+    "workflows.outreach_sender.AI_Intergrations.opener_ai_writer": 80,
+    "workflows.outreach_sender.Email_Scripts.send_email": 40,
+    "workflows.followup_engine.sequence_runner": 250,
+    "workflows.universal_outreach_utils.llm_cache": 80,
+    "workflows.universal_outreach_utils.crm_sqlite": 80,
+}
+
+_CODE_SUFFIXES = (".py", ".pyc", ".so", ".pth", ".zip")
+
+# Runs in the child: records side effects of the import and reports them as JSON on stdout
+_PROBE = """
+import json, os, sys
+events = []
+def _hook(event, args):
+    if event == "open" and args and isinstance(args[0], (str, bytes, os.PathLike)):
+        path = os.fsdecode(args[0])
+        if not path.endswith({suffixes!r}) and not os.path.isdir(path):
+            events.append("open " + path)
+    elif event in ("os.mkdir", "os.makedirs"):
+        events.append("mkdir " + os.fsdecode(args[0]))
+sys.addaudithook(_hook)
+stdout, stderr = sys.stdout, sys.stderr
+error = None
+try:
+    import {module}
+except BaseException as e:
+    error = type(e).__name__ + ": " + str(e)
+if sys.stdout is not stdout or sys.stderr is not stderr:
+    events.append("replaced sys.stdout/sys.stderr")
+sys.__stdout__.write("\\n@@probe " + json.dumps({{"error": error, "events": events}}) + "\\n")
+"""
+
+_LINE_RE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def _parse_importtime(stderr: str) -> List[Tuple[int, int, int, str]]:
+    """(self_us, cumulative_us, depth, module) for every importtime line."""
+    rows = []
+    for line in stderr.splitlines():
+        m = _LINE_RE.match(line)
+        if m:
+            rows.append((int(m.group(1)), int(m.group(2)), (len(m.group(3)) - 1) // 2, m.group(4)))
+    return rows
+
+
+def measure(module: str) -> Tuple[Optional[float], List[Tuple[int, str]], Optional[str], List[str]]:
+    """(import ms, [(self_us, name)], import error, side effects) for one cold import."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _PROBE.format(module=module, suffixes=_CODE_SUFFIXES)],
+        cwd=str(REPO_ROOT),
+        capture_output=True,
+        text=True,
+    )
+    probe = {"error": f"interpreter exited with {proc.returncode}", "events": []}
+    for line in proc.stdout.splitlines():
+        if line.startswith("@@probe "):
+            probe = json.loads(line[len("@@probe "):])
+    rows = _parse_importtime(proc.stderr)
+    parts = module.split(".")
+    chain = {".".join(parts[:i]) for i in range(1, len(parts) + 1)}
+    # Top-level entries of the module's package chain: together they are the cost of `import module`
+    total_us = sum(cum for _, cum, depth, name in rows if depth == 0 and name in chain)
+    slowest = sorted(((self_us, name) for self_us, _, _, name in rows), reverse=True)
+    return (total_us / 1000.0 if total_us else None), slowest, probe["error"], probe["events"]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Check cold import time and import side effects of the entry points.")
+    parser.add_argument("modules", nargs="*", help="Modules to check (default: every module in BUDGETS_MS).")
+    parser.add_argument("--runs", type=int, default=3, help="Cold imports per module; the fastest counts.")
+    parser.add_argument("--scale", type=float, default=1.0, help="Multiply every budget (slow machines / CI).")
+    parser.add_argument("--top", type=int, default=0, help="Also print the N slowest imports (self time) per module.")
+    parser.add_argument("--skip-missing", action="store_true", help="Skip modules that fail with ModuleNotFoundError.")
+    args = parser.parse_args()
+
+    failures = 0
+    for module in args.modules or list(BUDGETS_MS):
+        budget = BUDGETS_MS.get(module, 100.0) * args.scale
+        results = [measure(module) for _ in range(max(1, args.runs))]
+        error = next((r[2] for r in results if r[2]), None)
+        if error:
+            if args.skip_missing and error.startswith("ModuleNotFoundError"):
+                print(f"⏭️  {module}: skipped ({error})")
+                continue
+            print(f"❌ {module}: import failed ({error})")
+            failures += 1
+            continue
+        ms, slowest, _, events = min(results, key=lambda r: r[0] if r[0] is not None else float("inf"))
+        ok = ms is not None and ms <= budget and not events
+        failures += 0 if ok else 1
+        shown = f"{ms:.1f}" if ms is not None else "?"
+        print(f"{'✅' if ok else '❌'} {module}: {shown} ms (budget {budget:.0f} ms)")
+        for event in events:
+            print(f"     side effect at import: {event}")
+        for self_us, name in slowest[:args.top]:
+            print(f"     {self_us / 1000.0:7.1f} ms  {name}")
+
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,6 +1,13 @@
 import os
+
+# Part of send_email's render cache key: bump PROMPT_VERSION whenever the prompt changes
+PROMPT_VERSION = "1"
+DEFAULT_MODEL = "gpt-4o-mini"
+
+
 def render_llm_email(template_name, lead, fallback_subject="", llm_opts=None, context=None):
     subj = fallback_subject or f"Follow-up for {lead.get('Company Name','your team')}"
     body = f"Hi there — demo follow-up for {lead.get('Company Name','your team')}."
     if os.getenv("OPENAI_API_KEY"): pass
-    return {"subject": subj, "body_one_paragraph": body}
+    # Static demo text, never an LLM completion: marked so send_email does not cache it
+    return {"subject": subj, "body_one_paragraph": body, "fallback": True}
@@ -18,7 +18,7 @@ import csv
 from datetime import datetime, UTC
 from pathlib import Path
 import sys
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterator, List, Optional
 
 # Ensure project root on path so `import workflows.*` works
 REPO_ROOT = Path(__file__).resolve().parents[2]
@@ -35,6 +35,10 @@ from workflows.followup_engine.steps.wait_until import WaitUntilStep
 from workflows.followup_engine.steps.update_crm import UpdateCRMStep
 
 from workflows.followup_engine.utils.send_window_status import check_send_window
+from workflows.universal_outreach_utils.crm_store import stream_rows
+from workflows.universal_outreach_utils.crm_sqlite import open_mirror
+from workflows.universal_outreach_utils.crm_shards import open_client_directory
+from workflows.universal_outreach_utils.lead_identity import open_identity_index
 
 
 def _parse_iso(dt_str: Optional[str]) -> Optional[datetime]:
@@ -50,56 +54,117 @@ def _norm(s: Optional[str]) -> str:
     return " ".join((s or "").split()).lower()
 
 
-def _load_leads(client_filter: str) -> List[Dict[str, str]]:
-    """Read rows from the canonical CRM CSV and filter by client name.
-    We match against one of the client columns in priority order:
-    'Client Name' > 'Client' > 'client'.
-    No deduping is performed; all matching rows are returned as-is.
+# Columns the steps actually read (send_email / update_crm / llm_client); everything else is not projected
+LEAD_COLUMNS = (
+    "Email", "id", "DM Link", "Client Name", "Client", "client",
+    "First Name", "FirstName", "Company Name", "Company", "Custom 2", "Sender",
+    "Owner / Assigned To",
+)
+
+CLIENT_KEY_OPTS = ("Client Name", "Client", "client")
+
+
+def _lead_identity(r: Dict[str, str]) -> str:
+    return (r.get("Email") or r.get("id") or r.get("DM Link") or "").strip().lower()
+
+
+def _iter_leads(client_filter: str, columns=LEAD_COLUMNS) -> Iterator[Dict[str, str]]:
+    """Stream rows for one client from the canonical CRM CSV, or its shard (merged with its journal).
+
+    - The client predicate is pushed down into the CSV reader, so other clients' rows never
+      become dicts; only `columns` are projected.
+    - Client column priority: 'Client Name' > 'Client' > 'client' (first present in the header).
+    - Rows are resolved through the persistent lead identity index: leads owned by another client
+      are skipped, and duplicate identities (Email / DM Link / id) keep the first row.
+    - Consumers may stop early (e.g. after --max actions); the rest of the file is never read.
     """
-    rows: List[Dict[str, str]] = []
+    wanted = _norm(client_filter)
+    emitted = 0
+    dropped: Dict[str, int] = {}
+    stopped_early = True
     try:
-        with open(crm.CRM_CSV, newline="", encoding="utf-8") as f:
-            reader = csv.DictReader(f)
-            all_rows = list(reader)
+        directory = open_client_directory(crm.CRM_CSV)
+        mirror = open_mirror(crm.CRM_CSV) if directory is None else None
+        if directory is not None:
+            # Sharded CRM: only this client's shard (+ its journal) is read
+            shard = directory.shard_path(client_filter)
+            if shard is None:
+                logger.warn(f"Client '{client_filter}' not in CRM client directory {directory.shard_dir}; no leads loaded.")
+                stopped_early = False
+                return
+            source = stream_rows(shard, columns=columns)
+        elif mirror is not None and "Client Name" in mirror.header:
+            # Indexed lookup in the SQLite mirror (CRM_SQLITE_PATH); journal deltas already applied
+            source = mirror.leads_for_client(client_filter)
+        else:
+            with open(crm.CRM_CSV, newline="", encoding="utf-8") as f:
+                header = next(csv.reader(f), None) or []
+            client_col = next((k for k in CLIENT_KEY_OPTS if k in header), None)
+            if client_col is None:
+                logger.warn(f"No client column ({', '.join(CLIENT_KEY_OPTS)}) in {crm.CRM_CSV}; no leads loaded.")
+                stopped_early = False
+                return
+            # Base CSV + pending CRM journal deltas, filtered while reading
+            source = stream_rows(
+                crm.CRM_CSV,
+                match={client_col: lambda v: _norm(v) == wanted},
+                columns=columns,
+            )
     except FileNotFoundError:
         logger.error(f"CRM file not found: {crm.CRM_CSV}")
-        return rows
+        stopped_early = False
+        return
+
+    # Persistent identity index: canonical lead per email / DM link across runs, clients and imports
+    identity = open_identity_index(crm.CRM_CSV)
+    if identity is not None and Path(crm.CRM_CSV).exists():
+        identity.ensure_seeded(crm.CRM_CSV)
+    other_client: Dict[str, str] = {}
+    seen = set()
+    try:
+        for r in source:
+            check = identity.observe(r, wanted) if identity is not None else None
+            ident = str(check["lead_key"]) if check is not None else _lead_identity(r)
+            if check is not None and check["cross_client"]:
+                # Lead already belongs to another client: never send it from this client's sequence
+                other_client[ident] = str(check["owner_client"])
+                continue
+            # Enforce one inbox per lead: keep the first row per identity
+            if ident and ident in seen:
+                dropped[ident] = dropped.get(ident, 0) + 1
+                continue
+            if ident:
+                seen.add(ident)
+            emitted += 1
+            yield r
+        stopped_early = False
+    except FileNotFoundError as e:
+        # stream_rows is lazy: a missing CSV / shard only surfaces on the first row
+        logger.error(f"CRM file not found: {e.filename or crm.CRM_CSV}")
+        stopped_early = False
+    finally:
+        if identity is not None:
+            identity.close()
+        if other_client:
+            logger.warn(f"Skipped {len(other_client)} lead(s) already owned by another client (identity index).")
+            for shown, (ident, owner) in enumerate(other_client.items()):
+                if shown >= 5:
+                    break
+                logger.warn(f"Lead '{ident}' belongs to client '{owner}'; not sending for '{client_filter}'.")
+        if dropped:
+            dup_count = sum(dropped.values())
+            logger.warn(f"Detected {dup_count} duplicate row(s) for the same lead identity; keeping first occurrence per lead.")
+            for shown, (ident, n) in enumerate(dropped.items()):
+                if shown >= 5:
+                    break
+                logger.warn(f"Lead '{ident}' had {n + 1} rows; kept the first.")
+        how = "stopped early" if stopped_early else "full scan"
+        logger.info(f"Streamed {emitted} unique lead rows for client '{client_filter}' ({how})")
 
-    key_opts = ("Client Name", "Client", "client")
-    wanted = _norm(client_filter)
 
-    for r in all_rows:
-        val = None
-        for k in key_opts:
-            if k in r and r[k] is not None:
-                val = r.get(k)
-                break
-        if val is None:
-            continue
-        if _norm(val) == wanted:
-            rows.append(r)
-
-    # Enforce one inbox per lead: dedupe by identity and drop duplicates (keep first)
-    try:
-        unique_rows, dups = crm.dedupe_leads_by_identity(rows)
-    except Exception as _e:
-        logger.warn(f"Deduplication helper error: {_e}; proceeding without dedupe (NOT RECOMMENDED)")
-        unique_rows, dups = rows, {}
-
-    if dups:
-        # Log concise summary of duplicates found
-        dup_count = sum(len(info["dropped"]) for info in dups.values())
-        logger.warn(f"Detected {dup_count} duplicate row(s) for the same lead identity; keeping first occurrence per lead.")
-        # Optionally, log a few examples
-        shown = 0
-        for ident, info in dups.items():
-            logger.warn(f"Lead '{ident}' had multiple rows; kept sender={info['kept_sender']}, dropped={info['dropped']}")
-            shown += 1
-            if shown >= 5:
-                break
-
-    logger.info(f"Loaded {len(unique_rows)} unique lead rows for client '{client_filter}' (from {len(rows)} raw)")
-    return unique_rows
+def _load_leads(client_filter: str) -> List[Dict[str, str]]:
+    """Materialised variant of _iter_leads for callers that need the whole list."""
+    return list(_iter_leads(client_filter, columns=None))
 
 
 def _step_factory(step_cfg: Dict[str, Any]):
@@ -183,11 +248,12 @@ def run_once(*, sequence_id: str, dry_run: bool, client: str, email_filter: Opti
 
     st = StateStore(client=client)
 
-    leads = _load_leads(client)
+    # Lazy: rows are read from the CRM only as fast as we consume them
+    leads = _iter_leads(client)
     now = datetime.now(UTC)
 
     # --- summary counters ---
-    total_loaded = len(leads)
+    total_loaded = 0
     ok_actions = 0
     skips_time = 0
     skips_quota = 0
@@ -201,6 +267,7 @@ def run_once(*, sequence_id: str, dry_run: bool, client: str, email_filter: Opti
     for lead in leads:
         if actions >= max_actions:
             break
+        total_loaded += 1
         lead_id = lead.get("Email") or lead.get("id") or lead.get("DM Link")
         if not lead_id:
             continue
@@ -267,7 +334,7 @@ def run_once(*, sequence_id: str, dry_run: bool, client: str, email_filter: Opti
 
     logger.info("Run finished. Actions attempted: %d", actions)
     logger.info("Summary for client '%s' / sequence '%s':", client, sequence_id)
-    logger.info("  Leads loaded: %d", total_loaded)
+    logger.info("  Leads read: %d", total_loaded)
     logger.info("  OK sends: %d", ok_actions)
     logger.info("  Skipped (time window): %d", skips_time)
     logger.info("  Skipped (quota limits): %d", skips_quota)
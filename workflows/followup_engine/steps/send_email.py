@@ -33,6 +33,16 @@ def render_template(template_name: str, lead: Dict[str, Any]) -> Dict[str, str]:
     return {"body": _one_paragraph(body)}
 
 
+def _is_llm_completion(tpl: Dict[str, str]) -> bool:
+    """Only real completions are cached: renderers mark their static fallback with "fallback": True,
+    and nothing is cached while no LLM is configured (a renderer that does not mark its fallback)."""
+    from workflows.universal_outreach_utils import llm_pool
+
+    if tpl.get("fallback") or not (tpl.get("body_one_paragraph") or tpl.get("body")):
+        return False
+    return llm_pool.available()
+
+
 class SendEmailStep:
     def __init__(
         self,
@@ -75,16 +85,43 @@ class SendEmailStep:
         if self.mode == "llm":
             try:
                 from workflows.followup_engine.AI_Integrations.llm_client import (
+                    DEFAULT_MODEL,
+                    PROMPT_VERSION,
                     render_llm_email,
                 )
 
-                tpl = render_llm_email(
-                    self.template,
-                    lead,
-                    fallback_subject=self.subject,
-                    llm_opts=self.llm_opts,
-                    context={},
+                from workflows.universal_outreach_utils.llm_cache import (
+                    lead_content,
+                    open_llm_cache,
                 )
+
+                def _render() -> Dict[str, str]:
+                    return render_llm_email(
+                        self.template,
+                        lead,
+                        fallback_subject=self.subject,
+                        llm_opts=self.llm_opts,
+                        context={},
+                    )
+
+                # Re-runs / retries reuse the rendered email while prompt, model, template, options and lead fields are unchanged
+                cache = open_llm_cache()
+                if cache is None:
+                    tpl = _render()
+                else:
+                    tpl = cache.memoize_json(
+                        "render_llm_email",
+                        {
+                            "prompt_version": PROMPT_VERSION,
+                            "model": self.llm_opts.get("model") or DEFAULT_MODEL,
+                            "template": self.template,
+                            "fallback_subject": self.subject,
+                            "llm_opts": self.llm_opts,
+                            "lead": lead_content(lead),
+                        },
+                        _render,
+                        accept=_is_llm_completion,
+                    )
                 body = tpl.get("body_one_paragraph") or tpl.get("body") or ""
                 subject_for_send = (tpl.get("subject") or self.subject).strip()
             except Exception as e:
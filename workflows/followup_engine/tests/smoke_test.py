@@ -1,59 +1,43 @@
 from __future__ import annotations
-import json
-from pathlib import Path
 from typing import Dict, Any
 
-from workflows.followup_engine.utils import logger
+from workflows.universal_outreach_utils import llm_pool
+from workflows.universal_outreach_utils.llm_pool import LLMUnavailable
+from workflows.universal_outreach_utils.llm_stream import FieldLimit, StreamRules, chat_text
 
-class LLMUnavailable(Exception):
-    pass
+# One paragraph of 3–6 sentences (the system prompt's rule); with LLM_STREAMING=on a longer body is
+# cut off mid-stream and a shorter one rejected, and the caller falls back to its static template
+FOLLOWUP_STREAM_RULES = StreamRules(
+    limits=(FieldLimit("body_one_paragraph", max_sentences=6, min_sentences=3),),
+)
 
 class LLMClient:
-    """Very small wrapper around an LLM provider.
-    - Tries OpenAI via key file at GPT_KEY_PATH; falls back to env var if you extend it later.
-    - If unavailable, raise LLMUnavailable so callers can gracefully fallback.
+    """Very small wrapper around the shared, pooled LLM client (universal_outreach_utils.llm_pool).
+    - The OpenAI key (OPENAI_API_KEY or the key file) is read once per process, on first use.
+    - If unavailable (or a streamed reply breaks FOLLOWUP_STREAM_RULES), raise LLMUnavailable so callers can gracefully fallback.
     """
-    def __init__(self):
-        # Path to your key file
-        GPT_KEY_PATH = Path("/Users/kevinnovanta/backend_for_ai_agency/Creds/gpt_key.json")
-
-        api_key = None
-        if GPT_KEY_PATH.exists():
-            with open(GPT_KEY_PATH, "r") as f:
-                data = json.load(f)
-                api_key = data.get("OPENAI_API_KEY") or data.get("api_key")
-
-        self.api_key = api_key
-        # Lazy import to avoid hard dependency if not installed
-        self._openai = None
-        try:
-            import openai  # type: ignore
-            if self.api_key:
-                openai.api_key = self.api_key
-            else:
-                logger.warn(f"⚠️ No OpenAI API key found at {GPT_KEY_PATH}")
-            self._openai = openai
-        except Exception:
-            # If the SDK isn't installed, treat as unavailable
-            self._openai = None
 
     def available(self) -> bool:
-        return bool(self._openai and self.api_key)
+        return llm_pool.available()
 
     def generate_email(self, *, system: str, prompt: str, temperature: float = 0.3, max_tokens: int = 220) -> Dict[str, str]:
         if not self.available():
             raise LLMUnavailable("No LLM provider available or API key not set.")
         try:
-            resp = self._openai.ChatCompletion.create(
-                model="gpt-4o-mini",
-                messages=[
-                    {"role": "system", "content": system},
-                    {"role": "user", "content": prompt},
-                ],
-                temperature=temperature,
-                max_tokens=max_tokens,
+            text, _ = chat_text(
+                "followup_email",
+                {
+                    "model": "gpt-4o-mini",
+                    "messages": [
+                        {"role": "system", "content": system},
+                        {"role": "user", "content": prompt},
+                    ],
+                    "temperature": temperature,
+                    "max_tokens": max_tokens,
+                },
+                FOLLOWUP_STREAM_RULES,
             )
-            text = resp["choices"][0]["message"]["content"].strip()
+            text = text.strip()
         except Exception as e:
             raise LLMUnavailable(f"LLM call failed: {e}")
 
@@ -69,6 +53,10 @@ class LLMClient:
         return {"subject": subject, "body_one_paragraph": " ".join(body.split())}
 
 
+# Stateless (the pooled client lives in llm_pool), so one instance serves every follow-up
+_CLIENT = LLMClient()
+
+
 def render_llm_email(template_name: str, lead: Dict[str, Any], *, fallback_subject: str = "", llm_opts: Dict[str, Any] | None = None, context: Dict[str, Any] | None = None) -> Dict[str, str]:
     llm_opts = llm_opts or {}
     context = context or {}
@@ -100,7 +88,7 @@ def render_llm_email(template_name: str, lead: Dict[str, Any], *, fallback_subje
         "Return JSON {\"subject\": \"...\", \"body_one_paragraph\": \"...\"}."
     )
 
-    client = LLMClient()
+    client = _CLIENT
     if not client.available():
         subj = fallback_subject or f"A quick win for {company}"
         body = (
@@ -108,6 +96,6 @@ def render_llm_email(template_name: str, lead: Dict[str, Any], *, fallback_subje
             f"{(': ' + desc) if desc else ''}, I can share a 60-sec loom showing the exact workflow."
             " If now isn't ideal, happy to circle back later or close the loop."
         )
-        return {"subject": subj, "body_one_paragraph": " ".join(body.split())}
+        return {"subject": subj, "body_one_paragraph": " ".join(body.split()), "fallback": True}
 
     return client.generate_email(system=system, prompt=prompt, temperature=temperature, max_tokens=max_tokens)
@@ -0,0 +1,386 @@
+"""
+Offline batch-job mode for overnight opener personalization.
+
+Large campaigns don't need real-time generation: every per-lead request of the opener chain is
+written to JSONL in the OpenAI Batch API request format, the results file is ingested later, and the
+finished drafts land in the draft store (draft_store.py) that the opener runner sends from.
+
+The chain has three dependent stages, each one request file -> one results file:
+
+    base     generic opener (opener_ai_writer) + generic subject, two requests per lead
+    email    personalize_email on the base opener
+    subject  personalize_subject on the personalized subject -> drafts go to the draft store
+
+Requests are built by the same helpers the live calls use (opener_request_body / subject_request_body
+in opener_ai_writer, email_request_body / subject_request_body in personalizer) and results are
+finished by the same parsers, so an offline draft matches what the live chain would have produced.
+A failed or missing result falls back exactly like a failed live call (base text); a lead whose
+opener failed gets no draft.
+
+Job directory: workflows/outreach_sender/state/batch_jobs/<job_id>/
+    job.json                          leads, prompts (loaded once at prepare), stage, intermediate drafts
+    <stage>.requests[.NNN].jsonl      upload to the Batch API (split at 50,000 requests per file)
+    <stage>.results.jsonl             downloaded output, or written by `run-local`
+
+    python3 -m workflows.outreach_sender.AI_Intergrations.batch_jobs prepare  --client "Acme" [--limit 500]
+    python3 -m workflows.outreach_sender.AI_Intergrations.batch_jobs run-local <job_dir> [--echo] [--ingest]
+    python3 -m workflows.outreach_sender.AI_Intergrations.batch_jobs ingest   <job_dir> <results.jsonl> [...]
+    python3 -m workflows.outreach_sender.AI_Intergrations.batch_jobs status   <job_dir>
+
+`run-local` is the stand-in for the Batch API: it answers the current stage's request file with the
+live client one request at a time (or, with --echo, offline by echoing the base text back) and
+writes a results file in the Batch API output format; with --ingest it runs every stage end to end.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import tempfile
+from datetime import datetime, UTC
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence
+
+from workflows.outreach_sender.AI_Intergrations import opener_ai_writer as opener
+from workflows.outreach_sender.AI_Intergrations import personalizer
+from workflows.outreach_sender.AI_Intergrations.draft_store import DraftStore
+from workflows.universal_outreach_utils import llm_pool, llm_resilience
+
+JOBS_DIR = Path(__file__).resolve().parents[1] / "state" / "batch_jobs"
+CONTROLS_PATH = Path(__file__).resolve().parents[1] / "Utils" / "opener_controls.json"
+DEFAULT_CRM_PATH = Path("/Users/kevinnovanta/backend_for_ai_agency/data/leads/CRM_Leads/CRM_leads_copy.csv")
+
+STAGES = ("base", "email", "subject")
+MAX_REQUESTS_PER_FILE = 50_000  # Batch API input limit
+BATCH_URL = "/v1/chat/completions"
+
+
+def _norm(s: str) -> str:
+    return " ".join((s or "").split()).lower()
+
+
+def _email_key(email: str) -> str:
+    return (email or "").strip().lower()
+
+
+# -----------------------------
+# JSONL / job file helpers
+# -----------------------------
+def _write_json_atomic(path: Path, data) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(prefix=f".{path.name}.", suffix=".tmp", dir=str(path.parent))
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+def _write_jsonl(path: Path, lines: Sequence[Dict]) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(prefix=f".{path.name}.", suffix=".tmp", dir=str(path.parent))
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        for line in lines:
+            f.write(json.dumps(line, ensure_ascii=False) + "\n")
+    os.replace(tmp, path)
+
+
+def _read_jsonl(path: Path) -> List[Dict]:
+    out = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                out.append(json.loads(line))
+    return out
+
+
+def _load_job(job_dir: Path) -> Dict:
+    with open(Path(job_dir) / "job.json", "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _save_job(job_dir: Path, job: Dict) -> None:
+    _write_json_atomic(Path(job_dir) / "job.json", job)
+
+
+def request_line(custom_id: str, body: Dict) -> Dict:
+    """One line of a Batch API request file."""
+    return {"custom_id": custom_id, "method": "POST", "url": BATCH_URL, "body": body}
+
+
+def result_content(result: Dict) -> Optional[str]:
+    """Assistant message content of one Batch API output line, or None if the request failed."""
+    response = result.get("response") or {}
+    if result.get("error") or response.get("status_code") != 200:
+        return None
+    try:
+        return response["body"]["choices"][0]["message"]["content"]
+    except (KeyError, IndexError, TypeError):
+        return None
+
+
+# -----------------------------
+# Stages
+# -----------------------------
+def _stage_requests(job: Dict) -> List[Dict]:
+    stage = job["stage"]
+    prompts = job["prompts"]
+    lines = []
+    if stage == "base":
+        opener_body = opener.opener_request_body(prompts["opener"])
+        subject_body = opener.subject_request_body(prompts["subject"])
+        for email in job["leads"]:
+            lines.append(request_line(f"base:opener:{email}", opener_body))
+            lines.append(request_line(f"base:subject:{email}", subject_body))
+    elif stage == "email":
+        for email, draft in job["drafts"].items():
+            body = personalizer.email_request_body(draft["subject"], draft["body_html"], job["leads"][email], prompts["personalizer"])
+            lines.append(request_line(f"email:body:{email}", body))
+    elif stage == "subject":
+        for email, draft in job["drafts"].items():
+            body = personalizer.subject_request_body(draft["subject"], job["leads"][email], prompts["subject_personalizer"])
+            lines.append(request_line(f"subject:subject:{email}", body))
+    return lines
+
+
+def write_requests(job_dir: Path) -> List[Path]:
+    """Write the current stage's request file(s); returns their paths (empty once the job is done)."""
+    job_dir = Path(job_dir)
+    job = _load_job(job_dir)
+    if job["stage"] not in STAGES:
+        return []
+    lines = _stage_requests(job)
+    paths = []
+    for n, start in enumerate(range(0, max(len(lines), 1), MAX_REQUESTS_PER_FILE)):
+        suffix = "" if n == 0 else f".{n + 1:03d}"
+        path = job_dir / f"{job['stage']}.requests{suffix}.jsonl"
+        _write_jsonl(path, lines[start:start + MAX_REQUESTS_PER_FILE])
+        paths.append(path)
+    print(f"[BatchJob] Wrote {len(lines)} '{job['stage']}' request(s) to {', '.join(p.name for p in paths)}.")
+    return paths
+
+
+def prepare_job(leads: Sequence[Dict], client: str = "", job_id: Optional[str] = None) -> Path:
+    """Create a job for `leads` (prompts are loaded once, here) and write its first request file."""
+    job_id = job_id or f"{_norm(client).replace(' ', '_') or 'job'}_{datetime.now(UTC).strftime('%Y%m%dT%H%M%S')}"
+    job_dir = JOBS_DIR / job_id
+    by_email = {}
+    for lead in leads:
+        key = _email_key(lead.get("Email"))
+        if key and key not in by_email:
+            by_email[key] = dict(lead)
+    job = {
+        "job_id": job_id,
+        "client": client,
+        "created": datetime.now(UTC).isoformat(timespec="seconds"),
+        "stage": "base",
+        "prompts": {
+            "opener": opener.build_prompt(),
+            "subject": opener._load_subject_prompt(),
+            "personalizer": personalizer._load_prompt_override(None),
+            "subject_personalizer": personalizer._load_subject_personalizer_prompt(None),
+        },
+        "leads": by_email,
+        "drafts": {},
+        "failed": {},
+        "history": [],
+    }
+    _save_job(job_dir, job)
+    print(f"[BatchJob] Prepared job {job_id} for {len(by_email)} lead(s) in {job_dir}.")
+    write_requests(job_dir)
+    return job_dir
+
+
+def ingest_results(job_dir: Path, results_paths: Sequence[Path], store: Optional[DraftStore] = None) -> Dict:
+    """
+    Ingest the current stage's results (one or more Batch API output files), advance the job and
+    write the next stage's requests. After the last stage the drafts are put into `store`.
+    """
+    job_dir = Path(job_dir)
+    job = _load_job(job_dir)
+    stage = job["stage"]
+    if stage not in STAGES:
+        raise ValueError(f"Job {job['job_id']} is already complete.")
+
+    contents: Dict[str, Optional[str]] = {}
+    for path in results_paths:
+        for result in _read_jsonl(Path(path)):
+            cid = result.get("custom_id") or ""
+            if cid.startswith(f"{stage}:"):
+                contents[cid] = result_content(result)
+    ok = sum(1 for c in contents.values() if c is not None)
+
+    if stage == "base":
+        for email in job["leads"]:
+            base = opener.opener_from_content(contents.get(f"base:opener:{email}"))
+            if not (base.get("body_html") or "").strip():
+                job["failed"][email] = "opener generation failed"
+                continue
+            subject = contents.get(f"base:subject:{email}")
+            base["subject"] = opener.subject_from_content(subject)["subject"] if subject is not None else "Quick question"
+            job["drafts"][email] = base
+        job["stage"] = "email"
+    elif stage == "email":
+        for email, draft in job["drafts"].items():
+            job["drafts"][email] = personalizer.email_from_output(
+                contents.get(f"email:body:{email}"), draft["subject"], draft["body_html"], job["leads"][email],
+                prompt=job["prompts"]["personalizer"],
+            )
+        job["stage"] = "subject"
+    else:
+        for email, draft in job["drafts"].items():
+            draft["subject"] = personalizer.subject_from_output(
+                contents.get(f"subject:subject:{email}"), draft["subject"], job["leads"][email],
+                prompt=job["prompts"]["subject_personalizer"],
+            )["subject"]
+        job["stage"] = "done"
+
+    expected = len(job["leads"]) * 2 if stage == "base" else len(job["drafts"])
+    job["history"].append({
+        "stage": stage,
+        "requests": expected,
+        "ok": ok,
+        "failed_or_missing": expected - ok,
+        "ingested_at": datetime.now(UTC).isoformat(timespec="seconds"),
+    })
+    _save_job(job_dir, job)
+    print(f"[BatchJob] Ingested '{stage}' results: {ok}/{expected} ok ({expected - ok} failed/missing fall back to base text).")
+
+    if job["stage"] == "done":
+        store = store if store is not None else DraftStore()
+        stored = store.put_many(job["drafts"].items(), job=job["job_id"])
+        print(f"[BatchJob] Job {job['job_id']} complete: {stored} draft(s) stored in {store.path} ({len(job['failed'])} lead(s) without a draft).")
+    else:
+        write_requests(job_dir)
+    return status(job_dir)
+
+
+def status(job_dir: Path) -> Dict:
+    job = _load_job(Path(job_dir))
+    return {
+        "job_id": job["job_id"],
+        "stage": job["stage"],
+        "leads": len(job["leads"]),
+        "drafts": len(job["drafts"]),
+        "failed": len(job["failed"]),
+        "history": job["history"],
+    }
+
+
+# -----------------------------
+# Local stand-in for the Batch API
+# -----------------------------
+def _live_responder(body: Dict) -> Dict:
+    resp = llm_resilience.run(
+        "batch_local", lambda timeout, _: llm_pool.chat(**body, **({"timeout": timeout} if timeout is not None else {}))
+    )
+    return resp.model_dump() if hasattr(resp, "model_dump") else {
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": resp.choices[0].message.content}}]
+    }
+
+
+def _echo_responder(body: Dict) -> Dict:
+    """Offline answer: personalizer requests get their base subject/body back as JSON, others their prompt."""
+    last = (body.get("messages") or [{}])[-1].get("content", "")
+    content = last
+    if "JSON:\n" in last:
+        payload = json.loads(last.split("JSON:\n", 1)[1])
+        content = json.dumps({k: payload[k] for k in ("base_subject", "base_body_html") if k in payload})
+        content = content.replace('"base_subject"', '"subject"').replace('"base_body_html"', '"body_html"')
+    return {
+        "object": "chat.completion",
+        "model": body.get("model", ""),
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+    }
+
+
+def run_local(requests_path: Path, results_path: Optional[Path] = None, responder: Callable[[Dict], Dict] = _live_responder) -> Path:
+    """Turn a Batch API request file into a results file in the Batch API output format."""
+    requests_path = Path(requests_path)
+    results_path = Path(results_path) if results_path else requests_path.with_name(requests_path.name.replace(".requests", ".results"))
+    out = []
+    errors = 0
+    for n, req in enumerate(_read_jsonl(requests_path), start=1):
+        try:
+            body = responder(req["body"])
+            out.append({
+                "id": f"batch_req_local_{n}",
+                "custom_id": req["custom_id"],
+                "response": {"status_code": 200, "request_id": f"local_{n}", "body": body},
+                "error": None,
+            })
+        except Exception as e:
+            errors += 1
+            out.append({"id": f"batch_req_local_{n}", "custom_id": req["custom_id"], "response": None,
+                        "error": {"code": "local_error", "message": str(e)}})
+    _write_jsonl(results_path, out)
+    print(f"[BatchJob] Local run answered {len(out)} request(s) ({errors} error(s)) -> {results_path}")
+    return results_path
+
+
+# -----------------------------
+# Lead selection (CLI prepare)
+# -----------------------------
+def select_leads(client: str, csv_path: Path = DEFAULT_CRM_PATH, limit: Optional[int] = None) -> List[Dict]:
+    """The client's leads that pass the opener preflight (same gates as the runner)."""
+    from workflows.outreach_sender.Utils.preflight import preflight_filter
+    from workflows.universal_outreach_utils.bulk_preflight import bulk_preflight
+    from workflows.universal_outreach_utils.crm_shards import resolve_client_path
+    from workflows.universal_outreach_utils.crm_store import open_store
+
+    with open(CONTROLS_PATH, "r") as f:
+        controls = json.load(f)
+    client_norm = _norm(client)
+    crm_store = open_store(resolve_client_path(Path(csv_path), client_norm))
+    client_col = next((c for c in crm_store.fieldnames if _norm(c) == "client name"), "Client Name")
+    preflight_fn = preflight_filter
+    if bool(controls.get("bulk_preflight", False)):
+        try:
+            import pandas  # noqa: F401
+            preflight_fn = bulk_preflight
+        except ImportError:
+            pass
+    leads, _, _ = preflight_fn(crm_store.snapshot(), controls, client_col_name=client_col, selected_client_norm=client_norm)
+    return leads[:limit] if limit else leads
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Offline batch jobs for opener personalization.")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    p = sub.add_parser("prepare", help="Select a client's leads and write the first request file")
+    p.add_argument("--client", required=True)
+    p.add_argument("--csv", default=str(DEFAULT_CRM_PATH))
+    p.add_argument("--limit", type=int, default=None)
+    p = sub.add_parser("run-local", help="Answer the current stage's request file(s) locally (Batch API stand-in)")
+    p.add_argument("job_dir")
+    p.add_argument("--echo", action="store_true", help="No LLM calls: echo the base text back")
+    p.add_argument("--ingest", action="store_true", help="Ingest each stage's results and run the next, until done")
+    p = sub.add_parser("ingest", help="Ingest the current stage's results file(s)")
+    p.add_argument("job_dir")
+    p.add_argument("results", nargs="+")
+    p = sub.add_parser("status")
+    p.add_argument("job_dir")
+    args = ap.parse_args()
+
+    if args.cmd == "prepare":
+        leads = select_leads(args.client, Path(args.csv), args.limit)
+        prepare_job(leads, client=args.client)
+        return 0
+    job_dir = Path(args.job_dir)
+    if args.cmd == "run-local":
+        responder = _echo_responder if args.echo else _live_responder
+        while True:
+            stage = _load_job(job_dir)["stage"]
+            if stage not in STAGES:
+                break
+            results = [run_local(path, responder=responder) for path in sorted(job_dir.glob(f"{stage}.requests*.jsonl"))]
+            if not args.ingest:
+                break
+            ingest_results(job_dir, results)
+    elif args.cmd == "ingest":
+        ingest_results(job_dir, [Path(p) for p in args.results])
+    print(json.dumps(status(job_dir), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
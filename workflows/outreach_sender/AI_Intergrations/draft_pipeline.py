@@ -0,0 +1,232 @@
+"""
+Asyncio generation stage that keeps personalized opener drafts ready ahead of send slots.
+
+In parallel dispatch every inbox worker used to run the full LLM chain (opener, subject, body and
+subject personalization) inside its send slot, so LLM latency was added on top of the jittered send
+interval. DraftPipeline runs that chain ahead of time:
+
+- An asyncio loop on a background thread walks the leads in send order
+- At most `concurrency` drafts are generated at once (the sync LLM chain runs in executor threads)
+- At most `buffer_depth` drafts are ready or in flight but not yet taken (backpressure)
+- With a `batch_fn` ("batch_personalization" in controls) up to `batch_size` leads share one generation
+  call (batched personalization requests)
+- A worker's `take(lead)` returns the ready draft; it only waits if that draft is still in flight,
+  and a lead the producer has not reached yet is generated immediately (priority over prefetch)
+
+Configure in opener_controls.json (all optional):
+
+    "draft_pipeline": {"enabled": true, "buffer_depth": 6, "concurrency": 3},
+    "batch_personalization": {"enabled": true, "batch_size": 5}
+
+    pipeline = DraftPipeline.from_controls(controls, build_opener_draft, build_opener_drafts)
+    pipeline.start(leads_to_send)
+    subject, body = pipeline.take(lead)        # in the send slot
+    pipeline.stop()
+"""
+from __future__ import annotations
+
+import asyncio
+import concurrent.futures
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+Draft = Tuple[str, str]
+
+
+def _lead_key(lead: Dict) -> str:
+    return (lead.get("Email") or "").strip().lower()
+
+
+class DraftPipeline:
+    """Bounded-concurrency, bounded-buffer draft prefetcher for the opener send loop."""
+
+    def __init__(
+        self,
+        build_fn: Callable[[Dict], Draft],
+        *,
+        buffer_depth: int = 6,
+        concurrency: int = 3,
+        batch_fn: Optional[Callable[[List[Dict]], List[object]]] = None,
+        batch_size: int = 1,
+    ):
+        self.build_fn = build_fn
+        self.batch_fn = batch_fn
+        self.batch_size = max(1, int(batch_size)) if batch_fn is not None else 1
+        self.buffer_depth = max(1, int(buffer_depth))
+        self.concurrency = max(1, min(int(concurrency), self.buffer_depth))
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._executor: Optional[concurrent.futures.ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._futures: Dict[str, concurrent.futures.Future] = {}
+        self._taken: set = set()
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._gen: Optional[asyncio.Semaphore] = None
+        self._producer: Optional[concurrent.futures.Future] = None
+        self.ready_hits = 0
+        self.waited = 0
+        self.promoted = 0
+        self.wait_seconds = 0.0
+
+    @classmethod
+    def from_controls(
+        cls,
+        controls: Dict,
+        build_fn: Callable[[Dict], Draft],
+        batch_fn: Optional[Callable[[List[Dict]], List[object]]] = None,
+    ) -> Optional["DraftPipeline"]:
+        cfg = controls.get("draft_pipeline") or {}
+        if not cfg.get("enabled", False):
+            return None
+        batch_cfg = controls.get("batch_personalization") or {}
+        batched = batch_fn is not None and bool(batch_cfg.get("enabled", False))
+        return cls(
+            build_fn,
+            buffer_depth=cfg.get("buffer_depth", 6),
+            concurrency=cfg.get("concurrency", 3),
+            batch_fn=batch_fn if batched else None,
+            batch_size=batch_cfg.get("batch_size", 5) if batched else 1,
+        )
+
+    # -----------------------------
+    # Lifecycle
+    # -----------------------------
+    def start(self, leads: Iterable[Dict]) -> "DraftPipeline":
+        leads = list(leads)
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="draft-gen")
+        self._loop = asyncio.new_event_loop()
+        ready = threading.Event()
+
+        def _run():
+            asyncio.set_event_loop(self._loop)
+            self._slots = asyncio.Semaphore(self.buffer_depth)
+            self._gen = asyncio.Semaphore(self.concurrency)
+            ready.set()
+            self._loop.run_forever()
+
+        self._thread = threading.Thread(target=_run, name="draft-pipeline", daemon=True)
+        self._thread.start()
+        ready.wait()
+        self._producer = asyncio.run_coroutine_threadsafe(self._produce(leads), self._loop)
+        print(f"[DraftPipeline] Prefetching drafts for {len(leads)} lead(s) (buffer_depth={self.buffer_depth}, concurrency={self.concurrency}).")
+        return self
+
+    def stop(self) -> None:
+        if self._loop is None:
+            return
+        if self._producer is not None:
+            self._producer.cancel()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self._loop = None
+        print(f"[DraftPipeline] Stats: {self.stats()}")
+
+    # -----------------------------
+    # Producer (event loop thread)
+    # -----------------------------
+    async def _produce(self, leads: List[Dict]) -> None:
+        group: List[Tuple[Dict, concurrent.futures.Future]] = []
+        for lead in leads:
+            key = _lead_key(lead)
+            with self._lock:
+                if not key or key in self._futures:
+                    continue  # already promoted by a worker
+            if group and self._slots.locked():
+                self._flush(group)  # don't hold a partial batch while waiting for buffer space
+                group = []
+            await self._slots.acquire()  # backpressure: wait for a worker to take a draft
+            with self._lock:
+                if key in self._futures:
+                    self._slots.release()
+                    continue
+                fut: concurrent.futures.Future = concurrent.futures.Future()
+                self._futures[key] = fut
+            group.append((lead, fut))
+            if len(group) >= self.batch_size:
+                self._flush(group)
+                group = []
+        if group:
+            self._flush(group)
+
+    def _flush(self, group: List[Tuple[Dict, concurrent.futures.Future]]) -> None:
+        if len(group) == 1 or self.batch_fn is None:
+            for lead, fut in group:
+                asyncio.ensure_future(self._generate(lead, fut))
+        else:
+            asyncio.ensure_future(self._generate_batch(group))
+
+    async def _generate(self, lead: Dict, fut: concurrent.futures.Future) -> None:
+        async with self._gen:
+            try:
+                draft = await self._loop.run_in_executor(self._executor, self.build_fn, lead)
+            except BaseException as e:
+                fut.set_exception(e)
+            else:
+                fut.set_result(draft)
+
+    async def _generate_batch(self, group: List[Tuple[Dict, concurrent.futures.Future]]) -> None:
+        """One batch_fn call for several leads; its list holds a draft or an exception per lead."""
+        async with self._gen:
+            try:
+                drafts = await self._loop.run_in_executor(self._executor, self.batch_fn, [lead for lead, _ in group])
+            except BaseException as e:
+                drafts = [e] * len(group)
+        drafts = list(drafts)
+        drafts += [RuntimeError("batch returned no draft for this lead")] * (len(group) - len(drafts))
+        for (_, fut), draft in zip(group, drafts):
+            if isinstance(draft, BaseException):
+                fut.set_exception(draft)
+            else:
+                fut.set_result(draft)
+
+    def _release_slot(self) -> None:
+        if self._loop is not None and self._slots is not None:
+            self._loop.call_soon_threadsafe(self._slots.release)
+
+    # -----------------------------
+    # Consumer (worker threads)
+    # -----------------------------
+    def take(self, lead: Dict, timeout: Optional[float] = None) -> Draft:
+        """The (subject, body) draft for `lead`; re-raises a generation error."""
+        key = _lead_key(lead)
+        if not key or self._loop is None:
+            return self.build_fn(lead)  # nothing to key a prefetched draft on
+        promoted = False
+        with self._lock:
+            first_take = key not in self._taken
+            self._taken.add(key)
+            fut = self._futures.get(key)
+            if fut is None:
+                # Producer has not reached this lead yet: generate it now, outside the buffer budget
+                fut = concurrent.futures.Future()
+                self._futures[key] = fut
+                promoted = True
+        if promoted:
+            # Run it on this worker's thread so it does not queue behind prefetch work
+            self.promoted += 1
+            try:
+                fut.set_result(self.build_fn(lead))
+            except BaseException as e:
+                fut.set_exception(e)
+        elif fut.done():
+            self.ready_hits += 1
+        else:
+            self.waited += 1
+        t0 = time.perf_counter()
+        try:
+            return fut.result(timeout)
+        finally:
+            self.wait_seconds += time.perf_counter() - t0
+            if first_take and not promoted:
+                self._release_slot()
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "ready_hits": self.ready_hits,
+            "waited": self.waited,
+            "promoted": self.promoted,
+            "wait_seconds": round(self.wait_seconds, 3),
+        }
@@ -0,0 +1,108 @@
+"""
+Draft store for opener drafts generated offline (see batch_jobs.py).
+
+An overnight batch job ingests its results here, keyed by normalized lead email; the opener runner
+then sends from the store instead of calling the LLM in (or ahead of) the send slot. A draft stays in
+the store until its email has actually been sent, so a failed send or an aborted run can reuse it.
+
+- Store file: workflows/outreach_sender/state/draft_store.json
+    {email: {"subject", "body_html", "job", "created"}}
+- Without `live_fallback`, a lead with no stored draft is not sent (no live generation at all)
+
+Configure in opener_controls.json (all optional):
+
+    "draft_store": {"enabled": true, "live_fallback": true}
+
+    store = DraftStore.from_controls(controls)
+    draft = store.get(lead["Email"]) if store else None   # {"subject", "body_html"} or None
+    store.discard(lead["Email"])                            # after a successful send
+"""
+from __future__ import annotations
+
+import json
+import os
+import tempfile
+import threading
+from datetime import datetime, UTC
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Tuple
+
+DEFAULT_STORE_PATH = Path(__file__).resolve().parents[1] / "state" / "draft_store.json"
+
+
+def _key(email: str) -> str:
+    return (email or "").strip().lower()
+
+
+class DraftStore:
+    """Persistent {lead email: personalized draft} map filled by offline batch jobs."""
+
+    def __init__(self, path: Path = DEFAULT_STORE_PATH, *, live_fallback: bool = True):
+        self.path = Path(path)
+        self.live_fallback = bool(live_fallback)
+        self._lock = threading.RLock()
+        self._drafts: Dict[str, Dict] = self._load()
+
+    @classmethod
+    def from_controls(cls, controls: Dict) -> Optional["DraftStore"]:
+        cfg = controls.get("draft_store") or {}
+        if not cfg.get("enabled", False):
+            return None
+        return cls(Path(cfg.get("path") or DEFAULT_STORE_PATH), live_fallback=cfg.get("live_fallback", True))
+
+    # -----------------------------
+    # Persistence
+    # -----------------------------
+    def _load(self) -> Dict[str, Dict]:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            return data if isinstance(data, dict) else {}
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def _save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(prefix=f".{self.path.name}.", suffix=".tmp", dir=str(self.path.parent))
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(self._drafts, f, indent=2, ensure_ascii=False)
+        os.replace(tmp, self.path)
+
+    # -----------------------------
+    # API
+    # -----------------------------
+    def put_many(self, drafts: Iterable[Tuple[str, Dict]], job: str = "") -> int:
+        """Store (email, {"subject", "body_html"}) pairs; a newer draft replaces an older one."""
+        created = datetime.now(UTC).isoformat(timespec="seconds")
+        stored = 0
+        with self._lock:
+            for email, draft in drafts:
+                key = _key(email)
+                if not key or not (draft.get("body_html") or "").strip():
+                    continue
+                self._drafts[key] = {
+                    "subject": draft.get("subject", ""),
+                    "body_html": draft["body_html"],
+                    "job": job,
+                    "created": created,
+                }
+                stored += 1
+            if stored:
+                self._save()
+        return stored
+
+    def get(self, email: str) -> Optional[Dict[str, str]]:
+        with self._lock:
+            draft = self._drafts.get(_key(email))
+        if draft is None:
+            return None
+        return {"subject": draft.get("subject", ""), "body_html": draft.get("body_html", "")}
+
+    def discard(self, email: str) -> None:
+        with self._lock:
+            if self._drafts.pop(_key(email), None) is not None:
+                self._save()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._drafts)
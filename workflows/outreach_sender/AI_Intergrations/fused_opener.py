@@ -0,0 +1,220 @@
+"""
+Fused single-call opener generation (opt-in).
+
+The multi-step chain makes four LLM calls per lead: generic opener (opener_ai_writer.generate_email),
+generic subject (generate_generic_subject), body personalization (personalizer.personalize_email) and
+subject personalization (personalize_subject), paying four round trips and re-sending overlapping
+context each time. Fused mode sends the same four prompts, as sections of one request, together with
+the lead's payload and asks for the final personalized {"subject", "body_html"} as structured output
+(JSON schema).
+
+- The result goes through the same clean-up as the chain: opener smoothing, the personalizer's
+  post-processing (brackets, '<Company> like yours', articles) and subject bracket removal; the
+  runner then applies its usual finalize/sanitize step
+- Output is validated (non-empty single-line subject, body length in words, no unrendered
+  placeholders); an invalid or failed call returns None and the runner falls back to the
+  multi-step chain for that lead
+- Requests go through the LLM cache (valid outputs only) and the token budget ("fused_opener");
+  with LLM_STREAMING=on a response over the subject / body limits is cut off mid-stream
+
+Configure in opener_controls.json (all optional except enabled):
+
+    "fused_generation": {"enabled": true, "temperature": 0.7, "max_tokens": 450,
+                         "min_body_words": 30, "max_body_words": 180, "max_subject_chars": 100}
+
+    fused = FusedOpener.from_controls(controls)
+    email = fused.generate(lead) if fused else None     # {"subject", "body_html"} or None -> chain
+
+Benchmark against the multi-step chain (per-lead latency):
+
+    python3 scripts/bench_fused_opener.py
+"""
+from __future__ import annotations
+
+import json
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from workflows.outreach_sender.AI_Intergrations import personalizer
+from workflows.outreach_sender.AI_Intergrations import text_rules
+from workflows.outreach_sender.AI_Intergrations.prompt_registry import get_prompt
+from workflows.universal_outreach_utils.llm_stream import FieldLimit, StreamRules
+
+NAMESPACE = "fused_opener"
+
+_SYSTEM = "You write short, personalized B2B cold emails: one subject line and one email body per lead."
+
+_INSTRUCTIONS = (
+    "Apply all of the instructions above in a single pass: write the opener, then personalize its body "
+    "and its subject for the lead below. There is no separate base email; where the instructions refer to "
+    "the base email or base subject, use the opener you are writing. Write the body as plain text with a "
+    "blank line between paragraphs. Return ONLY JSON: {\"subject\": \"...\", \"body_html\": \"...\"}"
+)
+
+_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "personalized_opener",
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "properties": {"subject": {"type": "string"}, "body_html": {"type": "string"}},
+            "required": ["subject", "body_html"],
+            "additionalProperties": False,
+        },
+    },
+}
+
+
+class FusedOpener:
+    """One structured-output call per lead for the personalized subject + body."""
+
+    def __init__(
+        self,
+        *,
+        temperature: float = 0.7,
+        max_tokens: int = 450,
+        min_body_words: int = 30,
+        max_body_words: int = 180,
+        max_subject_chars: int = 100,
+    ):
+        self.temperature = float(temperature)
+        self.max_tokens = int(max_tokens)
+        self.min_body_words = int(min_body_words)
+        self.max_body_words = int(max_body_words)
+        self.max_subject_chars = int(max_subject_chars)
+        # Streamed responses (LLM_STREAMING=on) are cut off once they clearly break the validation limits
+        self.stream_rules = StreamRules(
+            json_object=True,
+            limits=(
+                FieldLimit("subject", max_chars=self.max_subject_chars),
+                FieldLimit("body_html", max_words=self.max_body_words),
+            ),
+        )
+        self._lock = threading.Lock()
+        self.counters = {"generated": 0, "invalid": 0, "errors": 0}
+        self.latencies: List[float] = []
+
+    @classmethod
+    def from_controls(cls, controls: Dict) -> Optional["FusedOpener"]:
+        cfg = controls.get("fused_generation") or {}
+        if not cfg.get("enabled", False):
+            return None
+        return cls(
+            temperature=cfg.get("temperature", 0.7),
+            max_tokens=cfg.get("max_tokens", 450),
+            min_body_words=cfg.get("min_body_words", 30),
+            max_body_words=cfg.get("max_body_words", 180),
+            max_subject_chars=cfg.get("max_subject_chars", 100),
+        )
+
+    # -----------------------------
+    # Request
+    # -----------------------------
+    def request_body(self, lead: Dict) -> Tuple[Dict, Dict]:
+        """(chat-completions body, lead payload) for one lead, within the fused_opener token budget."""
+        def build(budgeted_lead):
+            payload, token_map = personalizer._prepare_email_payload("", "", budgeted_lead)
+            payload = {k: v for k, v in payload.items() if not k.startswith("base_")}
+            sections = [
+                ("Opener instructions", get_prompt("opener")),
+                ("Subject instructions", get_prompt("subject")),
+                ("Personalization instructions", personalizer._render_placeholders(get_prompt("personalizer"), token_map)),
+                ("Subject personalization instructions",
+                 personalizer._render_placeholders(get_prompt("subject_personalizer"), token_map)),
+            ]
+            prompt = "\n\n".join(f"### {title}\n{text.strip()}" for title, text in sections if (text or "").strip())
+            body = {
+                "model": "gpt-4o-mini",
+                "messages": [
+                    {"role": "system", "content": _SYSTEM},
+                    {"role": "user", "content": prompt},
+                    {"role": "user", "content": _INSTRUCTIONS},
+                    {"role": "user", "content": f"Lead JSON:\n{json.dumps(payload)}"},
+                ],
+                "temperature": self.temperature,
+                "max_tokens": self.max_tokens,
+                "response_format": _RESPONSE_FORMAT,
+            }
+            return body, payload
+        return personalizer._fit_request(NAMESPACE, lead, build)
+
+    # -----------------------------
+    # Validation / clean-up
+    # -----------------------------
+    def parse(self, content: str) -> Tuple[Optional[Dict], str]:
+        """({"subject", "body_html"} or None, reason) for a completion."""
+        try:
+            data = json.loads(content or "")
+        except ValueError:
+            return None, "not JSON"
+        if not isinstance(data, dict):
+            return None, "not a JSON object"
+        subject, body = data.get("subject"), data.get("body_html")
+        if not isinstance(subject, str) or not subject.strip():
+            return None, "empty subject"
+        if "\n" in subject.strip() or len(subject.strip()) > self.max_subject_chars:
+            return None, f"subject not a single line of <= {self.max_subject_chars} chars"
+        if not isinstance(body, str) or not body.strip():
+            return None, "empty body"
+        words = len(body.split())
+        if not self.min_body_words <= words <= self.max_body_words:
+            return None, f"body has {words} words (allowed {self.min_body_words}-{self.max_body_words})"
+        if "{{" in subject + body or "}}" in subject + body:
+            return None, "unrendered placeholder"
+        return {"subject": subject.strip(), "body_html": body.strip()}, ""
+
+    @staticmethod
+    def clean(email: Dict, payload: Dict) -> Dict:
+        """The multi-step chain's clean-up, applied to a fused result."""
+        # Opener writer: <br> / spacing normalization and light smoothing
+        subject = text_rules.light_smooth(email["subject"])
+        body = text_rules.light_smooth(text_rules.normalize_linebreaks(email["body_html"]))
+        # Personalizer: brackets, '<Company> like yours', articles
+        subject, body = text_rules.clean_personalized_email(subject, body, payload.get("company_name", ""))
+        # Subject personalizer: brackets
+        return {"subject": text_rules.remove_brackets(subject), "body_html": body}
+
+    # -----------------------------
+    # Generate
+    # -----------------------------
+    def generate(self, lead: Dict) -> Optional[Dict]:
+        """Personalized {"subject", "body_html"} for the lead, or None (use the multi-step chain)."""
+        started = time.monotonic()
+        email_addr = lead.get("Email", "[no email]")
+        try:
+            body, payload = self.request_body(lead)
+            content = personalizer._chat_content(
+                NAMESPACE, body, accept=lambda c: self.parse(c)[0] is not None, rules=self.stream_rules
+            )
+        except Exception as e:
+            self._count("errors")
+            print(f"⚠️ [FusedOpener] Request failed for {email_addr} ({e}); falling back to the multi-step chain.")
+            return None
+        email, reason = self.parse(content)
+        if email is None:
+            self._count("invalid")
+            print(f"⚠️ [FusedOpener] Invalid output for {email_addr} ({reason}); falling back to the multi-step chain.")
+            return None
+        email = self.clean(email, payload)
+        elapsed = time.monotonic() - started
+        with self._lock:
+            self.counters["generated"] += 1
+            self.latencies.append(elapsed)
+        print(f"[FusedOpener] Generated personalized opener for {email_addr} in one call ({elapsed * 1000:.0f} ms).")
+        return email
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self.counters[name] += 1
+
+    def summary(self) -> str:
+        with self._lock:
+            lat = sorted(self.latencies)
+            counters = dict(self.counters)
+        p50 = f"{lat[len(lat) // 2] * 1000:.0f} ms" if lat else "-"
+        return (
+            f"{counters['generated']} fused, {counters['invalid']} invalid and {counters['errors']} failed "
+            f"(fell back to the multi-step chain); p50 latency {p50}"
+        )
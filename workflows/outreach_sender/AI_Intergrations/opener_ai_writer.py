@@ -1,99 +1,47 @@
 import json
-import re
-import os
-from openai import OpenAI
 
-# Load your OpenAI API key from JSON file
-with open("/Users/kevinnovanta/backend_for_ai_agency/Creds/gpt_key.json") as f:
-    openai_key = json.load(f)["api_key"]
+from workflows.outreach_sender.AI_Intergrations import text_rules
+from workflows.outreach_sender.AI_Intergrations.prompt_registry import get_prompt
+from workflows.universal_outreach_utils import llm_pool
+from workflows.universal_outreach_utils.llm_stream import FieldLimit, StreamRules, chat_text
 
-client = OpenAI(api_key=openai_key)
+# The OpenAI client (and key) is shared process-wide and created on first use: see llm_pool
 
+# Length rules the prompts ask for; with LLM_STREAMING=on a response that clearly breaks them is
+# cut off mid-stream and the fallback is used
+OPENER_MAX_WORDS = 110
+SUBJECT_MAX_WORDS = 15
+OPENER_STREAM_RULES = StreamRules(limits=(FieldLimit(max_words=OPENER_MAX_WORDS, skip_subject_line=True),))
+SUBJECT_STREAM_RULES = StreamRules(json_object=True, limits=(FieldLimit("subject", max_words=SUBJECT_MAX_WORDS),))
 # === Prompt loader helpers ===
 def _load_opener_prompt():
-    """Load opener prompt from env or default txt file."""
-    p = os.environ.get("OPENER_PROMPT")
-    if p:
-        print("🔍 _load_opener_prompt: Loaded prompt from environment variable OPENER_PROMPT")
-        print(f"🔍 _load_opener_prompt: Prompt snippet: {p[:100]}{'...' if len(p) > 100 else ''}")
-        return p
-    path = os.environ.get("OPENER_PROMPT_PATH") or \
-           "/Users/kevinnovanta/backend_for_ai_agency/workflows/outreach_sender/Utils/opener_prompt.txt"
-    try:
-        with open(path, "r", encoding="utf-8") as f:
-            content = f.read()
-            print(f"🔍 _load_opener_prompt: Loaded prompt from file at path: {path}")
-            print(f"🔍 _load_opener_prompt: Prompt snippet: {content[:100]}{'...' if len(content) > 100 else ''}")
-            return content
-    except Exception as e:
-        print(f"❌ _load_opener_prompt: Failed to load prompt from file at path: {path}, error: {e}")
-        return ""
+    """Opener prompt (env OPENER_PROMPT / OPENER_PROMPT_PATH / default txt file) from the prompt registry."""
+    return get_prompt("opener")
 
 def _load_subject_prompt():
-    """Load generic subject prompt from env or default txt file."""
-    p = os.environ.get("SUBJECT_PROMPT")
-    if p:
-        print("🔍 _load_subject_prompt: Loaded prompt from environment variable SUBJECT_PROMPT")
-        print(f"🔍 _load_subject_prompt: Prompt snippet: {p[:100]}{'...' if len(p) > 100 else ''}")
-        return p
-    path = os.environ.get("SUBJECT_PROMPT_PATH") or \
-           "/Users/kevinnovanta/backend_for_ai_agency/workflows/outreach_sender/Utils/subject_prompt.txt"
-    try:
-        with open(path, "r", encoding="utf-8") as f:
-            content = f.read()
-            print(f"🔍 _load_subject_prompt: Loaded prompt from file at path: {path}")
-            print(f"🔍 _load_subject_prompt: Prompt snippet: {content[:100]}{'...' if len(content) > 100 else ''}")
-            return content
-    except Exception as e:
-        print(f"❌ _load_subject_prompt: Failed to load prompt from file at path: {path}, error: {e}")
-        return ""
+    """Generic subject prompt (env SUBJECT_PROMPT / SUBJECT_PROMPT_PATH / default txt file) from the prompt registry."""
+    return get_prompt("subject")
 
 def remove_brackets_only(subject, body_html):
     print(f"🔍 remove_brackets_only: Original subject: {subject}")
     print(f"🔍 remove_brackets_only: Original body_html: {body_html}")
-    subject_clean = re.sub(r"\[.*?\]", "", subject)
-    body_clean = re.sub(r"\[.*?\]", "", body_html)
+    subject_clean = text_rules.BRACKETS.apply(subject)
+    body_clean = text_rules.BRACKETS.apply(body_html)
     print(f"🔍 remove_brackets_only: Cleaned subject: {subject_clean}")
     print(f"🔍 remove_brackets_only: Cleaned body_html: {body_clean}")
     return subject_clean, body_clean
 
 def build_prompt():
-    print("🔍 build_prompt: Building opener prompt...")
-    prompt = _load_opener_prompt()
-    print(f"🔍 build_prompt: Loaded prompt length: {len(prompt)}")
-    print(f"🔍 build_prompt: Prompt snippet: {prompt[:100]}{'...' if len(prompt) > 100 else ''}")
-    return prompt
+    return _load_opener_prompt()
 
 def _normalize_linebreaks(text: str) -> str:
     """Convert any <br> pairs to \n\n and normalize spacing; keep \n\n intact."""
-    if not isinstance(text, str):
-        return ""
-    t = text.replace("\r\n", "\n")
-    # HTML <br> -> newlines
-    t = re.sub(r"(<br\s*/?>\s*){2,}", "\n\n", t, flags=re.IGNORECASE)
-    t = re.sub(r"<br\s*/?>", "\n", t, flags=re.IGNORECASE)
-    # Collapse 3+ newlines to exactly two
-    t = re.sub(r"\n{3,}", "\n\n", t)
-    # Trim trailing spaces per line
-    t = "\n".join(line.rstrip() for line in t.split("\n"))
-    return t.strip()
+    return text_rules.normalize_linebreaks(text)
 
 
 def _light_smooth(text: str) -> str:
     """Very light smoothing without removing content: fix 'Hi ,', extra spaces, common artifacts."""
-    if not isinstance(text, str):
-        return ""
-    t = text
-    # Hi , -> Hi there,
-    t = re.sub(r"\bHi\s*,\b", "Hi there,", t)
-    t = re.sub(r"\bHello\s*,\b", "Hello there,", t)
-    # Remove ' at .' / ' with .' / ' for .' fragments
-    t = re.sub(r"\b(at|with|for)\s*\.(?=\s|$)", "", t, flags=re.IGNORECASE)
-    # Article fix: a audit -> an audit
-    t = re.sub(r"\ba\s+(?=[aeiouAEIOU])", "an ", t)
-    # Collapse 2+ spaces
-    t = re.sub(r"[ \t]{2,}", " ", t)
-    return t.strip()
+    return text_rules.light_smooth(text)
 
 
 def _extract_subject_and_body_from_freeform(content: str):
@@ -119,88 +67,143 @@ def _extract_subject_and_body_from_freeform(content: str):
         subject = _light_smooth(subject)
     return subject, body_text
 
+def fallback_opener():
+    """Static opener for when the LLM call fails (or its circuit breaker is open): registry entry
+    "opener_fallback" (env OPENER_FALLBACK / OPENER_FALLBACK_PATH / default txt file, optional
+    'Subject:' first line). Without one the body is empty and the runner skips the lead."""
+    subj, body_text = _extract_subject_and_body_from_freeform(get_prompt("opener_fallback"))
+    return {"subject": subj or "Quick question", "body_html": body_text}
+
+def subject_request_body(prompt):
+    """Chat-completions request body for one generic subject (live call and offline batch job)."""
+    return {
+        "model": "gpt-4o-mini",
+        "messages": [
+            {"role": "system", "content": "You write concise, non-spammy email subjects."},
+            {"role": "user", "content": prompt or "Return ONLY JSON: {\"subject\": \"Quick question\"}"}
+        ],
+        "temperature": 0.5,
+    }
+
+def subject_from_content(content):
+    """Parse a generic-subject completion into {"subject"} (fallback: "Quick question")."""
+    try:
+        data = json.loads(content)
+        print(f"🔍 generate_generic_subject: Parsed JSON data: {data}")
+        subj = data.get("subject", "Quick question")
+    except Exception as e:
+        print(f"⚠️ generate_generic_subject: JSON parsing failed: {e}, using fallback subject")
+        subj = "Quick question"
+    subj = text_rules.BRACKETS.apply(str(subj))
+    print(f"🔍 generate_generic_subject: Final sanitized subject: {subj.strip() or 'Quick question'}")
+    return {"subject": subj.strip() or "Quick question"}
+
 def generate_generic_subject():
     """Generate a concise, generic subject using a configurable prompt file."""
     prompt = _load_subject_prompt() or "Return ONLY JSON: {\"subject\": \"Quick question\"}"
     print(f"🔍 generate_generic_subject: Sending prompt to OpenAI:\n{prompt}")
     try:
-        resp = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
+        content, _ = chat_text("generic_subject", subject_request_body(prompt), SUBJECT_STREAM_RULES)
+        print(f"🔍 generate_generic_subject: Raw AI content received:\n{content}")
+        return subject_from_content(content)
+    except Exception as e:
+        print(f"❌ Error generating generic subject: {e}")
+        return {"subject": "Quick question"}
+
+def generate_subject_batch(prompt, n=20):
+    """Generate up to `n` distinct generic subjects in one call (bulk fill for the subject bank)."""
+    instruction = (
+        f"Write {n} different subject lines that each follow the instructions above. "
+        f"Return ONLY JSON: {{\"subjects\": [\"...\", \"...\"]}}"
+    )
+    print(f"🔍 generate_subject_batch: Requesting {n} subjects in one call.")
+    try:
+        content, _ = chat_text("subject_batch", {
+            "model": "gpt-4o-mini",
+            "messages": [
                 {"role": "system", "content": "You write concise, non-spammy email subjects."},
-                {"role": "user", "content": prompt}
+                {"role": "user", "content": prompt},
+                {"role": "user", "content": instruction},
             ],
-            temperature=0.5
-        )
-        content = resp.choices[0].message.content
-        print(f"🔍 generate_generic_subject: Raw AI content received:\n{content}")
+            "temperature": 0.9
+        })
         try:
             data = json.loads(content)
-            print(f"🔍 generate_generic_subject: Parsed JSON data: {data}")
-            subj = data.get("subject", "Quick question")
+            subjects = data.get("subjects", []) if isinstance(data, dict) else data
         except Exception as e:
-            print(f"⚠️ generate_generic_subject: JSON parsing failed: {e}, using fallback subject")
-            subj = "Quick question"
-        subj = re.sub(r"\[.*?\]", "", subj)
-        print(f"🔍 generate_generic_subject: Final sanitized subject: {subj.strip() or 'Quick question'}")
-        return {"subject": subj.strip() or "Quick question"}
+            print(f"⚠️ generate_subject_batch: JSON parsing failed: {e}, using one subject per line")
+            subjects = [l.strip(" -*\t\"") for l in (content or "").splitlines()]
+        cleaned = []
+        for subj in subjects or []:
+            subj = text_rules.remove_brackets(str(subj))
+            if subj and subj.lower() not in {c.lower() for c in cleaned}:
+                cleaned.append(subj)
+        print(f"🔍 generate_subject_batch: Received {len(cleaned)} usable subject(s).")
+        return cleaned[:n]
     except Exception as e:
-        print(f"❌ Error generating generic subject: {e}")
-        return {"subject": "Quick question"}
+        print(f"❌ Error generating subject batch: {e}")
+        return []
 
 def generate_email(lead):
     """
     Sends a prompt to OpenAI and returns a generic subject and body_html for a cold outreach email.
+    The lead is not used: the opener is a generic draft (see opener_variant_pool for reuse across leads).
     """
-    prompt = build_prompt()
+    return generate_email_for_prompt(build_prompt())
+
+
+def opener_request_body(prompt):
+    """Chat-completions request body for one generic opener (live call and offline batch job)."""
+    return {
+        "model": "gpt-4o-mini",
+        "messages": [
+            {"role": "system", "content": "You are a B2B cold email generator."},
+            {"role": "user", "content": prompt}
+        ],
+        "temperature": 0.7,
+    }
+
+def opener_from_content(content):
+    """Freeform opener completion -> {"subject", "body_html"} (no JSON expectation: extract minimally)."""
+    subj, body_text = _extract_subject_and_body_from_freeform(content)
+    email = {
+        # Subject will be overridden by generate_generic_subject() later; keep None/empty safe
+        "subject": subj or "",
+        # Keep body as plain text with \n\n; runner/personalizer can convert if needed
+        "body_html": body_text
+    }
+    print(f"🔍 generate_email: Using freeform email (no JSON parsing). Subject: '{email['subject']}' | Body preview: {email['body_html'][:140]}{'...' if len(email['body_html'])>140 else ''}")
+    return email
+
+def generate_email_for_prompt(prompt):
+    """One generic opener for an already-loaded opener prompt (used by generate_email); the static
+    fallback opener if generation fails."""
+    return try_generate_email_for_prompt(prompt) or fallback_opener()
+
+def try_generate_email_for_prompt(prompt):
+    """One generic opener for an already-loaded opener prompt, or None if generation fails or comes
+    back empty. Callers that store drafts (the variant pool) use this so the fallback is never kept."""
     print(f"🔍 generate_email: Using prompt:\n{prompt}")
 
     try:
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": "You are a B2B cold email generator."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.7
-        )
-
-        content = response.choices[0].message.content
+        content, _ = chat_text("opener", opener_request_body(prompt), OPENER_STREAM_RULES)
         print(f"🔍 generate_email: Raw AI content received (freeform):\n{content}")
-
-        # No JSON expectation: extract minimally
-        subj, body_text = _extract_subject_and_body_from_freeform(content)
-        email = {
-            # Subject will be overridden by generate_generic_subject() later; keep None/empty safe
-            "subject": subj or "",
-            # Keep body as plain text with \n\n; runner/personalizer can convert if needed
-            "body_html": body_text
-        }
-        print(f"🔍 generate_email: Using freeform email (no JSON parsing). Subject: '{email['subject']}' | Body preview: {email['body_html'][:140]}{'...' if len(email['body_html'])>140 else ''}")
-        return email
+        email = opener_from_content(content)
+        return email if email["body_html"].strip() else None
 
     except Exception as e:
         print(f"❌ Error generating email: {e}")
-        return {"subject": "Quick question", "body_html": ""}
+        return None
 
 def generate_email_from_prompt(prompt, openai_key):
     """
     Sends a custom prompt to OpenAI and returns the subject and body_html.
     """
-    local_client = OpenAI(api_key=openai_key)
-
     try:
+        # Pooled client for this key (created once, reused across calls)
+        local_client = llm_pool.get_client(openai_key)
         print(f"🔍 generate_email_from_prompt: Prompt being sent:\n{prompt}")
-        response = local_client.chat.completions.create(
-           model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": "You are a B2B cold email generator."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.7
-        )
-
-        content = response.choices[0].message.content
+        content, _ = chat_text("opener", opener_request_body(prompt), OPENER_STREAM_RULES, client=local_client)
         print(f"🔍 generate_email_from_prompt: Raw AI content received (freeform):\n{content}")
 
         subj, body_text = _extract_subject_and_body_from_freeform(content)
@@ -210,4 +213,4 @@ def generate_email_from_prompt(prompt, openai_key):
 
     except Exception as e:
         print(f"❌ Error generating email from prompt: {e}")
-        return {"subject": "Quick question", "body_html": ""}
+        return fallback_opener()
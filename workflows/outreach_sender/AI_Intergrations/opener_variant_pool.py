@@ -0,0 +1,200 @@
+"""
+Variant pool for lead-independent opener drafts.
+
+`generate_email(lead)` never looks at the lead, so one LLM round trip per lead buys nothing but
+variety. The pool generates N base openers per opener prompt version, persists them keyed by a hash
+of the prompt text, and hands one out per lead (personalization still runs per lead afterwards).
+
+- Pool file: workflows/outreach_sender/state/opener_variants.json  {prompt_hash: {created, variants[]}}
+- Sampling prefers the least-used variants; variants retire after `max_uses` sends
+- When the live pool drops below `low_water` (or the prompt changes, which starts a new empty pool)
+  a background thread refills it to `size`; a caller only blocks if the pool is completely empty
+- Only real completions are pooled: a failed generation (e.g. during an LLM outage) adds nothing, and
+  an empty pool serves the static fallback opener for that send without persisting it
+
+Configure in opener_controls.json (all optional):
+
+    "opener_variant_pool": {"enabled": true, "size": 8, "low_water": 3, "max_uses": 25}
+
+    pool = OpenerVariantPool.from_controls(controls)
+    base_email = pool.sample() if pool else gen_opener_email(lead)
+"""
+from __future__ import annotations
+
+import json
+import os
+import random
+import tempfile
+import threading
+from datetime import datetime, UTC
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from workflows.outreach_sender.AI_Intergrations.opener_ai_writer import (
+    build_prompt,
+    fallback_opener,
+    try_generate_email_for_prompt,
+)
+from workflows.outreach_sender.AI_Intergrations.prompt_registry import text_version as prompt_hash
+
+DEFAULT_POOL_PATH = Path(__file__).resolve().parents[1] / "state" / "opener_variants.json"
+
+
+class OpenerVariantPool:
+    """Persistent, prompt-versioned pool of generic opener drafts with background refill."""
+
+    def __init__(
+        self,
+        path: Path = DEFAULT_POOL_PATH,
+        *,
+        size: int = 8,
+        low_water: int = 3,
+        max_uses: int = 25,
+        prompt_fn: Callable[[], str] = build_prompt,
+        generate_fn: Callable[[str], Optional[Dict[str, str]]] = try_generate_email_for_prompt,
+    ):
+        self.path = Path(path)
+        self.size = max(1, int(size))
+        self.low_water = max(0, min(int(low_water), self.size))
+        self.max_uses = max(1, int(max_uses))
+        self.prompt_fn = prompt_fn
+        self.generate_fn = generate_fn
+        self._lock = threading.RLock()
+        self._refilling = False
+        self._pools: Dict[str, Dict] = self._load()
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_controls(cls, controls: Dict) -> Optional["OpenerVariantPool"]:
+        cfg = controls.get("opener_variant_pool") or {}
+        if not cfg.get("enabled", False):
+            return None
+        return cls(
+            Path(cfg.get("path") or DEFAULT_POOL_PATH),
+            size=cfg.get("size", 8),
+            low_water=cfg.get("low_water", 3),
+            max_uses=cfg.get("max_uses", 25),
+        )
+
+    # -----------------------------
+    # Persistence
+    # -----------------------------
+    def _load(self) -> Dict[str, Dict]:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            return data if isinstance(data, dict) else {}
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def _save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(prefix=f".{self.path.name}.", suffix=".tmp", dir=str(self.path.parent))
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(self._pools, f, indent=2, ensure_ascii=False)
+        os.replace(tmp, self.path)
+
+    # -----------------------------
+    # Pool state
+    # -----------------------------
+    def _live(self, key: str) -> List[Dict]:
+        pool = self._pools.get(key) or {}
+        return [v for v in pool.get("variants", []) if v.get("uses", 0) < self.max_uses]
+
+    def _activate(self, key: str) -> None:
+        """Make `key` the current prompt version; drafts for older prompt versions are dropped."""
+        if key not in self._pools:
+            print(f"[VariantPool] Opener prompt changed (version {key}); starting a new pool.")
+        self._pools = {key: self._pools.get(key) or {"created": datetime.now(UTC).isoformat(timespec="seconds"), "variants": []}}
+
+    def _generate_one(self, prompt: str) -> Optional[Dict]:
+        email = self.generate_fn(prompt) or {}
+        body = (email.get("body_html") or "").strip()
+        if not body:
+            return None  # generation failed (try_generate_email_for_prompt returns None; never pool the fallback)
+        return {"subject": email.get("subject", ""), "body_html": body, "uses": 0}
+
+    def refill(self, prompt: Optional[str] = None) -> int:
+        """Top the current prompt's pool up to `size` (synchronously). Returns drafts added."""
+        prompt = self.prompt_fn() if prompt is None else prompt
+        key = prompt_hash(prompt)
+        added = 0
+        failures = 0
+        while failures < 3:
+            with self._lock:
+                self._activate(key)
+                missing = self.size - len(self._live(key))
+            if missing <= 0:
+                break
+            variant = self._generate_one(prompt)  # LLM call outside the lock
+            if variant is None:
+                failures += 1
+                continue
+            with self._lock:
+                self._pools.setdefault(key, {"variants": []})["variants"].append(variant)
+                self._pools[key]["variants"] = self._live(key)  # drop retired drafts
+                self._save()
+            added += 1
+        if added:
+            print(f"[VariantPool] Added {added} opener draft(s) for prompt version {key}.")
+        return added
+
+    def _refill_in_background(self, prompt: str) -> None:
+        with self._lock:
+            if self._refilling:
+                return
+            self._refilling = True
+
+        def _run():
+            try:
+                self.refill(prompt)
+            except Exception as e:
+                print(f"⚠️ [VariantPool] Background refill failed: {e}")
+            finally:
+                with self._lock:
+                    self._refilling = False
+
+        threading.Thread(target=_run, name="opener-variant-refill", daemon=True).start()
+
+    # -----------------------------
+    # Sampling
+    # -----------------------------
+    def sample(self) -> Dict[str, str]:
+        """A generic opener {"subject", "body_html"} for the current prompt version."""
+        prompt = self.prompt_fn()
+        key = prompt_hash(prompt)
+        with self._lock:
+            self._activate(key)
+            live = self._live(key)
+        if not live:
+            # Empty pool (first run / new prompt): generate one now, fill the rest in the background
+            self.misses += 1
+            variant = self._generate_one(prompt)
+            if variant is None:
+                # Serve the static fallback for this send only; it is never stored in the pool
+                print("⚠️ [VariantPool] Opener generation failed; using the fallback opener for this lead.")
+                return fallback_opener()
+            variant["uses"] = 1
+            with self._lock:
+                self._pools[key]["variants"].append(variant)
+                self._save()
+            self._refill_in_background(prompt)
+            return {"subject": variant["subject"], "body_html": variant["body_html"]}
+
+        with self._lock:
+            live = self._live(key) or live
+            least = min(v.get("uses", 0) for v in live)
+            variant = random.choice([v for v in live if v.get("uses", 0) == least])
+            variant["uses"] = variant.get("uses", 0) + 1
+            remaining = len(self._live(key))
+            self._save()
+        self.hits += 1
+        if remaining < self.low_water:
+            self._refill_in_background(prompt)
+        return {"subject": variant["subject"], "body_html": variant["body_html"]}
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            live = sum(len(self._live(k)) for k in self._pools)
+        return {"hits": self.hits, "misses": self.misses, "live_variants": live}
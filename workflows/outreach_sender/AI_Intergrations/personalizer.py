@@ -1,66 +1,30 @@
 # === Personalizer helpers ===
 def _load_subject_personalizer_prompt(prompt_override=None):
+    """Subject personalizer prompt: the override, else the prompt registry
+    (env SUBJECT_PERSONALIZER_PROMPT / SUBJECT_PERSONALIZER_PROMPT_PATH / default file)."""
     if prompt_override is not None:
-        print(f"[Personalizer] Using provided prompt override for subject personalizer.")
         return prompt_override
-    env_prompt = os.environ.get("SUBJECT_PERSONALIZER_PROMPT")
-    if env_prompt:
-        print(f"[Personalizer] Loaded subject personalizer prompt from environment variable SUBJECT_PERSONALIZER_PROMPT.")
-        return env_prompt
-    path = os.environ.get("SUBJECT_PERSONALIZER_PROMPT_PATH") or \
-           "/Users/kevinnovanta/backend_for_ai_agency/workflows/outreach_sender/Utils/subject_personalizer_prompt.txt"
-    if os.path.isfile(path):
-        with open(path, "r", encoding="utf-8") as f:
-            prompt_content = f.read()
-            print(f"[Personalizer] Loaded subject personalizer prompt from file: {path}")
-            return prompt_content
-    print(f"[Personalizer] No subject personalizer prompt found. Returning empty prompt.")
-    return ""
+    return get_prompt("subject_personalizer")
 # Deprecated: use personalize_email(base_subject, base_body_html, lead, prompt_override=None)
 def personalize_subject(base_subject, lead, prompt_override=None):
     """Personalize a subject line using lead data and a configurable prompt."""
     prompt = _load_subject_personalizer_prompt(prompt_override)
     print(f"[Personalizer] Loaded subject personalizer prompt. (First 300 chars): {prompt[:300]!r}")
-    token_map = _build_token_map(lead, base_subject, "")
     print(f"[Personalizer] Sample lead data: {dict(list(lead.items())[:3])}")
-    prompt = _render_placeholders(prompt, token_map)
-
-    # Specialize generic phrasing in the base subject before sending
-    company_name = token_map.get("company_name", "")
-    offer_summary = token_map.get("custom_2", "") or token_map.get("industry", "")
-    base_subject = _specialize_subject(base_subject or "", company_name, offer_summary)
-
-    payload = json.dumps({
-        "base_subject": base_subject,
-        "company_name": company_name,
-        "offer_summary": offer_summary,
-        "overview": token_map.get("overview", ""),
-        "custom_1": token_map.get("custom_1", "")
-    })
+    # Specialize generic phrasing in the base subject, render the prompt and fit the token budget
+    body, subject_payload, _ = _subject_request(base_subject, lead, prompt)
+    base_subject = subject_payload["base_subject"]
+    prompt = body["messages"][1]["content"]
 
-    model_name = "gpt-4o-mini"
-    prompt_tokens = len(prompt.split())
+    model_name = body["model"]
+    prompt_tokens = count_tokens(prompt, model_name)
     print(f"[Personalizer] Preparing to send request to AI API. Model: {model_name}, Prompt tokens: {prompt_tokens}")
     print(f"[Personalizer] Prompt preview (first 300 chars): {prompt[:300]!r}")
     try:
-        response = client.chat.completions.create(
-            model=model_name,
-            messages=[
-                {"role": "system", "content": "You write concise, non-spammy subject lines for B2B cold emails."},
-                {"role": "user", "content": prompt.strip()},
-                {"role": "user", "content": f"Lead and base subject JSON:\n{payload}"}
-            ],
-            temperature=0.5,
-            max_tokens=80,
-        )
-        output = response.choices[0].message.content.strip()
+        output = _chat_content("personalize_subject", body, accept=_subject_output_ok, rules=SUBJECT_STREAM_RULES)
         print(f"[Personalizer] Raw AI output: {output!r}")
         print("[Personalizer] Starting sanitation of AI output...")
-        try:
-            parsed = json.loads(output)
-            subject = parsed.get("subject", base_subject)
-        except Exception:
-            subject = base_subject
+        subject = _parse_subject_output(output, base_subject)
     except Exception as e:
         print(f"[Personalizer] Exception during AI request: {e}")
         subject = base_subject
@@ -79,14 +43,37 @@ if PROJECT_ROOT not in sys.path:
     sys.path.append(PROJECT_ROOT)
 
 import json
-from openai import OpenAI
+from functools import lru_cache
+
+from workflows.outreach_sender.AI_Intergrations import text_rules
+from workflows.outreach_sender.AI_Intergrations.opener_ai_writer import OPENER_MAX_WORDS, SUBJECT_MAX_WORDS
+from workflows.outreach_sender.AI_Intergrations.prompt_registry import get_prompt
+from workflows.universal_outreach_utils.llm_cache import open_llm_cache
+from workflows.universal_outreach_utils.llm_stream import FieldLimit, StreamRules, chat_text
+from workflows.universal_outreach_utils.token_budget import count_tokens, open_token_budget
+
+# Cut-off rules for streamed responses (LLM_STREAMING=on): invalid JSON or a runaway body/subject
+# aborts the request and the base subject/body is used
+EMAIL_STREAM_RULES = StreamRules(
+    json_object=True,
+    limits=(FieldLimit("body_html", max_words=OPENER_MAX_WORDS), FieldLimit("subject", max_words=SUBJECT_MAX_WORDS)),
+)
+SUBJECT_STREAM_RULES = StreamRules(json_object=True, limits=(FieldLimit("subject", max_words=SUBJECT_MAX_WORDS),))
 
 def remove_brackets_only(text):
-    return re.sub(r"\[.*?\]", "", text).strip()
+    return text_rules.remove_brackets(text)
+
+# === Placeholder rendering ===
+# Every lead of a campaign shares the same CSV header, and prompts only change when the registry
+# reloads them, so alias generation and template parsing run once per header / template (lru_cache)
+# and rendering a prompt for a lead is dict lookups plus one join.
+_PLACEHOLDER_RE = re.compile(r"\{\{\s*([\w\s\-]+)\s*\}\}")
 
-def _aliases_for_key(key) -> list:
+
+@lru_cache(maxsize=1024)
+def _aliases_for_key(key) -> tuple:
     """
-    Given a key, return a list of aliases:
+    Given a key, return its aliases:
     - original key (as string)
     - lowercase
     - snake_case version
@@ -101,22 +88,22 @@ def _aliases_for_key(key) -> list:
 
     if key is None:
         print("[Personalizer] Warning: encountered None key in lead; skipping alias generation.")
-        return []
+        return ()
     try:
         key_str = str(key)
     except Exception:
         print(f"[Personalizer] Warning: could not stringify key {key!r}; skipping.")
-        return []
+        return ()
 
-    aliases = [key_str, key_str.lower(), to_snake_case(key_str)]
     # Deduplicate while preserving order
-    seen = set()
-    result = []
-    for a in aliases:
-        if a not in seen:
-            seen.add(a)
-            result.append(a)
-    return result
+    return tuple(dict.fromkeys([key_str, key_str.lower(), to_snake_case(key_str)]))
+
+
+@lru_cache(maxsize=64)
+def _alias_table(keys: tuple) -> tuple:
+    """(alias, key) pairs for a lead header, in the order _build_token_map assigns them."""
+    return tuple((alias, key) for key in keys for alias in _aliases_for_key(key))
+
 
 def _build_token_map(lead, base_subject, base_body_html):
     """
@@ -126,16 +113,11 @@ def _build_token_map(lead, base_subject, base_body_html):
     - convenience keys: company_name, custom_2, industry, overview, custom_1, email
     - base_subject, base_body_html
     """
+    # Original keys and their aliases (a later key wins an alias it shares with an earlier one)
     token_map = {}
-
-    # Add original keys and their aliases (robust to None / non-strings)
-    for key, value in lead.items():
-        alias_list = _aliases_for_key(key)
-        if not alias_list:
-            continue
-        safe_val = "" if value is None else value
-        for alias in alias_list:
-            token_map[alias] = safe_val
+    for alias, key in _alias_table(tuple(lead)):
+        value = lead[key]
+        token_map[alias] = "" if value is None else value
 
     # Convenience keys with fallback to empty string if missing
     token_map['company_name'] = lead.get("Company Name", "") or ""
@@ -150,66 +132,61 @@ def _build_token_map(lead, base_subject, base_body_html):
 
     return token_map
 
+
+@lru_cache(maxsize=64)
+def _compile_template(template: str) -> tuple:
+    """
+    Split a template into segments: (parts, slots). `parts` alternates literal text and empty slot
+    placeholders; each slot is (index in parts, lookup names) where the names are the raw token,
+    the stripped token and its snake_case form, in lookup order.
+    """
+    parts, slots, pos = [], [], 0
+    for match in _PLACEHOLDER_RE.finditer(template):
+        token = match.group(1)
+        snake = re.sub(r'[\s\-]+', '_', token.strip()).lower()
+        parts.append(template[pos:match.start()])
+        slots.append((len(parts), tuple(dict.fromkeys((token, token.strip(), snake)))))
+        parts.append("")
+        pos = match.end()
+    parts.append(template[pos:])
+    return tuple(parts), tuple(slots)
+
+
 def _render_placeholders(template: str, token_map: dict) -> str:
     """
     Replace {{token}} placeholders in template with values from token_map.
     Unknown tokens replaced with empty string.
-    Lookup tries raw token, then snake_case and stripped variants.
+    Lookup tries raw token, then stripped and snake_case variants.
     """
-    def to_snake_case(s):
-        s = s.strip()
-        s = re.sub(r'[\s\-]+', '_', s)
-        s = s.lower()
-        return s
-
-    pattern = re.compile(r"\{\{\s*([\w\s\-]+)\s*\}\}")
-
-    def replacer(match):
-        token = match.group(1)
-        # Try raw token
-        if token in token_map:
-            return str(token_map[token])
-        # Try stripped token
-        stripped = token.strip()
-        if stripped in token_map:
-            return str(token_map[stripped])
-        # Try snake_case token
-        snake = to_snake_case(token)
-        if snake in token_map:
-            return str(token_map[snake])
-        # Not found, replace with empty string
-        return ""
-
-    return pattern.sub(replacer, template)
+    parts, slots = _compile_template(template)
+    if not slots:
+        return template
+    out = list(parts)
+    for index, names in slots:
+        for name in names:
+            if name in token_map:
+                out[index] = str(token_map[name])
+                break
+    return "".join(out)
+
+
+def _placeholder_values(template: str, token_map: dict) -> dict:
+    """{placeholder as written in the template: the value _render_placeholders substitutes for it}.
+    Batched requests send the template once and these values per lead."""
+    values = {}
+    for _, names in _compile_template(template)[1]:
+        values[names[0].strip()] = next((str(token_map[n]) for n in names if n in token_map), "")
+    return values
 
 # === Personalizer helpers ===
 def _load_prompt_override(prompt_override=None):
     """
-    Loads a prompt override from argument, env var PERSONALIZER_PROMPT, env var PERSONALIZER_PROMPT_PATH,
-    or from default file path. Returns a string.
+    Email personalizer prompt: the override argument, else the prompt registry
+    (env PERSONALIZER_PROMPT / PERSONALIZER_PROMPT_PATH / default file; "" if none).
     """
     if prompt_override is not None:
-        print(f"[Personalizer] Using provided prompt override for email personalizer.")
         return prompt_override
-    env_prompt = os.environ.get("PERSONALIZER_PROMPT")
-    if env_prompt:
-        print(f"[Personalizer] Loaded personalizer prompt from environment variable PERSONALIZER_PROMPT.")
-        return env_prompt
-    prompt_path = os.environ.get("PERSONALIZER_PROMPT_PATH")
-    if prompt_path and os.path.isfile(prompt_path):
-        with open(prompt_path, "r", encoding="utf-8") as f:
-            prompt_content = f.read()
-            print(f"[Personalizer] Loaded personalizer prompt from file: {prompt_path}")
-            return prompt_content
-    # fallback to default file path
-    default_path = "/Users/kevinnovanta/backend_for_ai_agency/workflows/outreach_sender/Utils/personalizer_prompt.txt"
-    if os.path.isfile(default_path):
-        with open(default_path, "r", encoding="utf-8") as f:
-            prompt_content = f.read()
-            print(f"[Personalizer] Loaded personalizer prompt from default file: {default_path}")
-            return prompt_content
-    print(f"[Personalizer] No personalizer prompt found. Returning empty prompt.")
-    return ""  # If all else fails, return empty string
+    return get_prompt("personalizer")
 
 def _clean_pair(subj, body):
     """
@@ -231,118 +208,76 @@ def _ensure_sentence_linebreaks(text: str) -> str:
     return t.strip()
 
 def _fix_company_like_yours(text: str, company_name: str) -> str:
-    """Replace awkward patterns like '<Company> like yours' with 'companies like yours'."""
-    if not text:
-        return ""
-    cn = (company_name or "").strip()
-    out = text
-    if cn:
-        # Case-insensitive replace of '<Company> like yours' → 'companies like yours'
-        pattern = re.compile(re.escape(cn) + r"\s+like\s+yours", re.IGNORECASE)
-        out = pattern.sub("companies like yours", out)
-    # Also guard more generic accidental constructions
-    out = re.sub(r"\b[a-zA-Z0-9&\-\s]+\s+like\s+yours\b", "companies like yours", out)
-
-    # --- NEW: handle dangling patterns when company_name is missing ---
-    # Fix greetings like 'Hi ,' or 'Hi  ,' -> 'Hi there,'
-    out = re.sub(r'\bHi\s*,', 'Hi there,', out)
-    out = re.sub(r'\bHi\s{2,},', 'Hi there,', out)
-    # Remove incomplete phrases like 'resonate with .' or 'for .'
-    out = re.sub(r'\bresonate with\s*\.', '', out, flags=re.IGNORECASE)
-    out = re.sub(r'\bfor\s*\.', '', out, flags=re.IGNORECASE)
-    # Remove any 'with .' at sentence end
-    out = re.sub(r'with\s*\.', '', out, flags=re.IGNORECASE)
-    # Remove multiple spaces left after removals
-    out = re.sub(r' {2,}', ' ', out)
-    # Remove double commas or stray spaces before commas
-    out = re.sub(r'\s+,', ',', out)
-    out = re.sub(r',\s+,', ',', out)
-    return out
+    """Replace awkward patterns like '<Company> like yours' with 'companies like yours'
+    and clean fragments left by a missing company name (precompiled rules in text_rules)."""
+    return text_rules.fix_company_like_yours(text, company_name)
 
 def _offer_hint(offer_summary: str) -> str:
     """Derive a short, neutral hint from messy offer text (drops first-person fluff)."""
-    if not offer_summary:
-        return ""
-    t = offer_summary.strip()
-    # Remove leading first-person phrases
-    t = re.sub(r"^\s*(we|our|i)\s+(specialize\s+in|love\s+to|love\s+doing|help|offer)\b[:\s-]*", "", t, flags=re.IGNORECASE)
-    # Remove trailing calls to action or exclamations
-    t = re.sub(r"\b(contact|book|schedule|call|click)\b.*$", "", t, flags=re.IGNORECASE)
-    # Keep it short and noun/verb heavy
-    t = re.sub(r"[^\w\s&/-]", "", t)
-    t = re.sub(r"\s{2,}", " ", t).strip()
-    # Limit to ~12 words
-    words = t.split()
-    if len(words) > 12:
-        t = " ".join(words[:12])
-    return t
+    return text_rules.offer_hint(offer_summary)
 
 
 def _specialize_generic_claims(text: str, company_name: str, offer_summary: str) -> str:
     """Replace generic phrases (businesses/companies/business owners/teams) with a specific company name or offer summary."""
-    if not text:
-        return text or ""
-    cn = (company_name or "").strip()
-    osum = (offer_summary or "").strip()
-    target = cn or osum
-    out = text
-    # If both company_name and offer_summary are missing, fallback to offer_hint or remove/smooth phrases
-    if not target:
-        # Try to use offer_hint if possible
-        offer_hint = _offer_hint(offer_summary)
-        if offer_hint:
-            # Replace generic recipient phrases with offer_hint
-            out = re.sub(r"\bwe\s+help\s+(?:business\s*owners|businesses|companies|teams)\b", f"we help {offer_hint}", out, flags=re.IGNORECASE)
-            out = re.sub(r"\bfor\s+(?:business\s*owners|businesses|companies|teams)\b", f"for {offer_hint}", out, flags=re.IGNORECASE)
-            out = re.sub(r"\bhelp\s+(?:your|their)\s+(?:business|company)\b", f"help {offer_hint}", out, flags=re.IGNORECASE)
-        else:
-            # Remove or smooth dangling placeholders
-            out = re.sub(r"\bwe\s+help\s+(?:business\s*owners|businesses|companies|teams)\b", "we help", out, flags=re.IGNORECASE)
-            out = re.sub(r"\bfor\s+(?:business\s*owners|businesses|companies|teams)\b", "", out, flags=re.IGNORECASE)
-            out = re.sub(r"\bhelp\s+(?:your|their)\s+(?:business|company)\b", "help", out, flags=re.IGNORECASE)
-        return out
-    # If we have a target, proceed as before
-    out = re.sub(r"\bwe\s+help\s+(?:business\s*owners|businesses|companies|teams)\b", f"we help {target}", out, flags=re.IGNORECASE)
-    out = re.sub(r"\bfor\s+(?:business\s*owners|businesses|companies|teams)\b", f"for {target}", out, flags=re.IGNORECASE)
-    out = re.sub(r"\bhelp\s+(?:your|their)\s+(?:business|company)\b", f"help {target}", out, flags=re.IGNORECASE)
-    return out
+    return text_rules.specialize_generic_claims(text, company_name, offer_summary)
 
 
 def _specialize_subject(subject: str, company_name: str, offer_summary: str) -> str:
     """Lightly specialize generic subject phrasing using company name or offer summary."""
-    subj = subject or ""
-    cn = (company_name or "").strip()
-    osum = (offer_summary or "").strip()
-    target = cn or osum
-    if not target:
-        return subj
-    subj = re.sub(r"\byour\s+business\b", target, subj, flags=re.IGNORECASE)
-    return subj
-
-
-with open("/Users/kevinnovanta/backend_for_ai_agency/Creds/gpt_key.json") as f:
-    secrets = json.load(f)
-_api_key = secrets.get("api_key") or secrets.get("OPENAI_API_KEY")
-if _api_key:
-    os.environ.setdefault("OPENAI_API_KEY", _api_key)
-client = OpenAI()
-
-def personalize_email(base_subject, base_body_html, lead, prompt_override=None):
-    """
-    Personalizes a base email subject/body_html for a given lead using OpenAI.
-    Loads a prompt override from argument/env/file, builds JSON context, and expects only JSON response.
-    If parsing fails, returns base subject/body unchanged.
-    Removes bracketed placeholders before returning.
-    """
-    # 1. Load prompt
-    prompt = _load_prompt_override(prompt_override)
-    print(f"[Personalizer] Loaded email personalizer prompt. (First 300 chars): {prompt[:300]!r}")
-
+    return text_rules.specialize_subject(subject, company_name, offer_summary)
+
+
+# Process-wide helpers, opened on first use (importing this module does no I/O):
+# - content-addressed response cache (LLM_CACHE_DB): re-runs and retries skip unchanged requests
+# - per-stage input token budgets (PROMPT_TOKEN_BUDGETS): long lead fields are trimmed to fit
+# - streamed responses with early cut-off (LLM_STREAMING)
+def _chat_content(namespace, body, accept=None, rules=None):
+    """Completion text for a chat-completions request body, served from the LLM cache when enabled.
+    Streamed responses are checked against `rules` as they arrive (llm_stream.StreamAborted)."""
+    def _create(request):
+        return _chat_and_report(namespace, request, rules)
+    cache = open_llm_cache()
+    if cache is None:
+        return _create(body)
+    return cache.completion(namespace, body, _create, accept=accept)
+
+
+def _chat_and_report(namespace, request, rules=None):
+    """One (uncached) completion under `rules`, with its billed prompt tokens reported to the budget."""
+    content, usage = chat_text(namespace, request, rules)
+    budget = open_token_budget()
+    if budget is not None:
+        budget.report_usage(namespace, request["messages"], usage, request["model"])
+    return content.strip()
+
+
+def _cached_content(namespace, body, accept):
+    """A cached, still-valid completion for `body`, or None."""
+    cache = open_llm_cache()
+    if cache is None:
+        return None
+    content = cache.get(namespace, body)
+    return content if content is not None and accept(content) else None
+
+
+def _cached_single_or_batched(namespace, body, accept):
+    """A cached result for a lead's single-lead request body: a real single-lead completion first,
+    else one taken from a batched response (stored under "<namespace>_batch", never the single key)."""
+    content = _cached_content(namespace, body, accept)
+    return content if content is not None else _cached_content(f"{namespace}_batch", body, accept)
+
+
+def _store_content(namespace, body, content):
+    cache = open_llm_cache()
+    if cache is not None:
+        cache.put(namespace, body, content)
+
+def _prepare_email_payload(base_subject, base_body_html, lead):
+    """Specialize the base subject/body for a lead and build its JSON payload.
+    Returns (payload, token_map); shared by the single and batched personalizers."""
     token_map = _build_token_map(lead, base_subject, base_body_html)
-    print(f"[Personalizer] Sample lead data: {dict(list(lead.items())[:3])}")
-    prompt = _render_placeholders(prompt, token_map)
 
-    # 1a. Specialize generic claims in the base subject/body using company/offer
+    # Specialize generic claims in the base subject/body using company/offer
     company_name = token_map.get("company_name", "")
     offer_summary = token_map.get("custom_2", "") or token_map.get("industry", "")
     offer_hint = _offer_hint(offer_summary)
@@ -352,7 +287,6 @@ def personalize_email(base_subject, base_body_html, lead, prompt_override=None):
     token_map["base_subject"] = base_subject
     token_map["base_body_html"] = base_body_html
 
-    # 2. Build payload with relevant lead fields
     lead_payload = {
         "base_subject": base_subject,
         "base_body_html": base_body_html,
@@ -362,53 +296,356 @@ def personalize_email(base_subject, base_body_html, lead, prompt_override=None):
         "overview": lead.get("Overview", ""),
         "custom_1": lead.get("Custom 1", "")
     }
-    payload_json = json.dumps(lead_payload)
+    return lead_payload, token_map
 
-    model_name = "gpt-4o-mini"
-    prompt_tokens = len(prompt.split())
+
+def _finish_email(subject, body_html, company_name, lead):
+    """Post-process a personalized subject/body (brackets, awkward phrasing, articles)."""
+    # Brackets, awkward '<Company> like yours' phrasing and 'a audit' -> 'an audit' (line breaks are kept)
+    subject, body_html = text_rules.clean_personalized_email(subject, body_html, company_name)
+    print(f"[Personalizer] Sanitized subject: {subject!r}")
+    print(f"[Personalizer] Sanitized body_html preview (first 300 chars): {body_html[:300]!r}")
+    print(f"[Personalizer] Personalization complete for lead: {lead.get('Email', '[no email]')}")
+    return {"subject": subject, "body_html": body_html}
+
+
+def _email_messages(prompt, payload_json):
+    return [
+        {"role": "system", "content": "You rewrite emails with subtle, high-signal personalization."},
+        {"role": "user", "content": prompt.strip()},
+        {"role": "user", "content": f"Lead and base email JSON:\n{payload_json}"}
+    ]
+
+
+def _parse_email_output(output, base_subject, base_body_html):
+    """(subject, body_html) from a JSON completion; falls back to the base subject/body."""
+    try:
+        parsed = json.loads(output)
+        return parsed.get("subject", base_subject), parsed.get("body_html", base_body_html)
+    except Exception:
+        return base_subject, base_body_html
+
+
+def _email_output_ok(output):
+    """Only parseable outputs with a subject and body are cached (a fallback result is retried)."""
+    subject, body_html = _parse_email_output(output, None, None)
+    return bool(isinstance(subject, str) and subject.strip() and isinstance(body_html, str) and body_html.strip())
+
+
+def _prepare_subject_payload(base_subject, lead):
+    """Specialize the base subject for a lead and build its JSON payload. Returns (payload, token_map)."""
+    token_map = _build_token_map(lead, base_subject, "")
+    company_name = token_map.get("company_name", "")
+    offer_summary = token_map.get("custom_2", "") or token_map.get("industry", "")
+    payload = {
+        "base_subject": _specialize_subject(base_subject or "", company_name, offer_summary),
+        "company_name": company_name,
+        "offer_summary": offer_summary,
+        "overview": token_map.get("overview", ""),
+        "custom_1": token_map.get("custom_1", "")
+    }
+    return payload, token_map
+
+
+def _subject_messages(prompt, payload_json):
+    return [
+        {"role": "system", "content": "You write concise, non-spammy subject lines for B2B cold emails."},
+        {"role": "user", "content": prompt.strip()},
+        {"role": "user", "content": f"Lead and base subject JSON:\n{payload_json}"}
+    ]
+
+
+def _parse_subject_output(output, base_subject):
+    try:
+        return json.loads(output).get("subject", base_subject)
+    except Exception:
+        return base_subject
+
+
+def _subject_output_ok(output):
+    subject = _parse_subject_output(output, None)
+    return bool(isinstance(subject, str) and subject.strip())
+
+
+def _fit_request(stage, lead, build):
+    """build(lead), with the lead's long fields trimmed to the stage's token budget (if enabled)."""
+    budget = open_token_budget()
+    if budget is None:
+        return build(lead)
+    return budget.fit(stage, lead, build, messages_of=lambda r: r[0]["messages"], model="gpt-4o-mini")
+
+
+def _email_request(base_subject, base_body_html, lead, template):
+    """(request body, payload, token_map) personalize_email sends for this lead, within its token budget."""
+    def build(budgeted_lead):
+        lead_payload, token_map = _prepare_email_payload(base_subject, base_body_html, budgeted_lead)
+        body = {
+            "model": "gpt-4o-mini",
+            "messages": _email_messages(_render_placeholders(template, token_map), json.dumps(lead_payload)),
+            "temperature": 0.7,
+            "max_tokens": 350,
+        }
+        return body, lead_payload, token_map
+    return _fit_request("personalize_email", lead, build)
+
+
+def _subject_request(base_subject, lead, template):
+    """(request body, payload, token_map) personalize_subject sends for this lead, within its token budget."""
+    def build(budgeted_lead):
+        payload, token_map = _prepare_subject_payload(base_subject, budgeted_lead)
+        body = {
+            "model": "gpt-4o-mini",
+            "messages": _subject_messages(_render_placeholders(template, token_map), json.dumps(payload)),
+            "temperature": 0.5,
+            "max_tokens": 80,
+        }
+        return body, payload, token_map
+    return _fit_request("personalize_subject", lead, build)
+
+
+def personalize_email(base_subject, base_body_html, lead, prompt_override=None):
+    """
+    Personalizes a base email subject/body_html for a given lead using OpenAI.
+    Loads a prompt override from argument/env/file, builds JSON context, and expects only JSON response.
+    If parsing fails, returns base subject/body unchanged.
+    Removes bracketed placeholders before returning.
+    """
+    # 1. Load prompt
+    prompt = _load_prompt_override(prompt_override)
+    print(f"[Personalizer] Loaded email personalizer prompt. (First 300 chars): {prompt[:300]!r}")
+
+    # 1a. Specialize the base email, build the payload with relevant lead fields and render the prompt
+    print(f"[Personalizer] Sample lead data: {dict(list(lead.items())[:3])}")
+    # 2. Build the request, trimming long lead fields to the token budget
+    body, lead_payload, token_map = _email_request(base_subject, base_body_html, lead, prompt)
+    prompt = body["messages"][1]["content"]
+    base_subject = lead_payload["base_subject"]
+    base_body_html = lead_payload["base_body_html"]
+    company_name = token_map.get("company_name", "")
+
+    model_name = body["model"]
+    prompt_tokens = count_tokens(prompt, model_name)
     print(f"[Personalizer] Preparing to send request to AI API. Model: {model_name}, Prompt tokens: {prompt_tokens}")
     print(f"[Personalizer] Prompt preview (first 300 chars): {prompt[:300]!r}")
     try:
-        response = client.chat.completions.create(
-            model=model_name,
-            messages=[
-                {"role": "system", "content": "You rewrite emails with subtle, high-signal personalization."},
-                {"role": "user", "content": prompt.strip()},
-                {"role": "user", "content": f"Lead and base email JSON:\n{payload_json}"}
-            ],
-            temperature=0.7,
-            max_tokens=350,
-        )
-        output = response.choices[0].message.content.strip()
+        output = _chat_content("personalize_email", body, accept=_email_output_ok, rules=EMAIL_STREAM_RULES)
         print(f"[Personalizer] Raw AI output: {output!r}")
         print("[Personalizer] Starting sanitation of AI output...")
-        try:
-            parsed = json.loads(output)
-            subject = parsed.get("subject", base_subject)
-            body_html = parsed.get("body_html", base_body_html)
-        except Exception:
-            # fallback: return base subject/body
-            subject = base_subject
-            body_html = base_body_html
+        subject, body_html = _parse_email_output(output, base_subject, base_body_html)
     except Exception as e:
         print(f"[Personalizer] Exception during AI request: {e}")
         # On any error, return base subject/body
         subject = base_subject
         body_html = base_body_html
 
-    subject, body_html = _clean_pair(subject, body_html)
-    # --- Remove linebreak normalization so line breaks are preserved as generated by the AI ---
-    body_html = _fix_company_like_yours(body_html, company_name)
-    # --- NEW: Fix articles before vowel-starting words (e.g., 'a audit' -> 'an audit') ---
-    def fix_articles(text):
-        # Replace 'a <vowel>' with 'an <vowel>', case-insensitive, word boundary
-        return re.sub(r'\ba\s+([aeiouAEIOU])', r'an \1', text)
-    body_html = fix_articles(body_html)
-    subject = fix_articles(subject)
-    print(f"[Personalizer] Sanitized subject: {subject!r}")
-    print(f"[Personalizer] Sanitized body_html preview (first 300 chars): {body_html[:300]!r}")
-    print(f"[Personalizer] Personalization complete for lead: {lead.get('Email', '[no email]')}")
-    return {"subject": subject, "body_html": body_html}
+    return _finish_email(subject, body_html, company_name, lead)
+
+
+# === Batched personalization (K leads per request) ===
+_BATCH_EMAIL_INSTRUCTIONS = (
+    "You will receive a JSON array of leads, each with an \"id\" and its base email. Apply the instructions "
+    "above to every lead independently; each {{placeholder}} in them takes the value given for it in that "
+    "lead's \"placeholders\" object. "
+    "Return ONLY JSON: {\"results\": [{\"id\": <id>, \"subject\": \"...\", \"body_html\": \"...\"}, ...]} "
+    "with exactly one entry per input id."
+)
+
+_BATCH_SUBJECT_INSTRUCTIONS = (
+    "You will receive a JSON array of leads, each with an \"id\" and its base subject. Apply the instructions "
+    "above to every lead independently; each {{placeholder}} in them takes the value given for it in that "
+    "lead's \"placeholders\" object. "
+    "Return ONLY JSON: {\"results\": [{\"id\": <id>, \"subject\": \"...\"}, ...]} with exactly one entry per input id."
+)
+
+
+def _parse_batch_results(output, ids, fields):
+    """Map id -> entry for entries that carry every field as a non-empty string.
+    Leads missing from the map failed validation and are retried individually."""
+    try:
+        parsed = json.loads(output)
+    except Exception:
+        return {}
+    entries = parsed.get("results", []) if isinstance(parsed, dict) else parsed
+    valid = {}
+    for entry in entries if isinstance(entries, list) else []:
+        if not isinstance(entry, dict) or entry.get("id") not in ids or entry["id"] in valid:
+            continue
+        if all(isinstance(entry.get(f), str) and entry[f].strip() and "{{" not in entry[f] for f in fields):
+            valid[entry["id"]] = entry
+    return valid
+
+
+def _batch_rules(words_per_lead, n):
+    """Stream rules for a {"results": [...]} response: valid JSON and a whole-output word cap
+    (the per-field limits of the single-lead rules, plus the JSON keys, times the batch size)."""
+    return StreamRules(json_object=True, limits=(FieldLimit(max_words=(words_per_lead + 6) * n),))
+
+
+def _chunks(items, size):
+    size = max(1, int(size))
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def personalize_emails_batch(items, prompt_override=None, batch_size=5):
+    """
+    Batched personalize_email: `items` is a list of (base_subject, base_body_html, lead).
+    Packs up to `batch_size` leads into one request (the prompt is sent once per batch instead of once
+    per lead, with each lead's placeholder values), validates the returned array per lead and retries
+    failed leads with personalize_email. Batch results are cached per lead under "personalize_email_batch"
+    (keyed by the lead's single-lead request), apart from real single-lead completions. Returns results
+    in input order.
+    """
+    template = _load_prompt_override(prompt_override)
+    results = [None] * len(items)
+    requests = retried = cached = 0
+    # Leads whose single-lead request is already cached skip the batch entirely
+    prepared = {}
+    pending = []
+    for idx, (base_subject, base_body_html, lead) in enumerate(items):
+        # Each lead's single-lead request (fields trimmed to its token budget) doubles as its cache key
+        prepared[idx] = _email_request(base_subject, base_body_html, lead, template)
+        content = _cached_single_or_batched("personalize_email", prepared[idx][0], _email_output_ok)
+        if content is None:
+            pending.append((idx, (base_subject, base_body_html, lead)))
+        else:
+            cached += 1
+            results[idx] = _email_result(content, prepared[idx][1], prepared[idx][2], lead)
+    for chunk in _chunks(pending, batch_size):
+        payloads = {}
+        companies = {}
+        for idx, (base_subject, base_body_html, lead) in chunk:
+            _, payload, token_map = prepared[idx]
+            payloads[idx] = dict(payload, id=idx, placeholders=_placeholder_values(template, token_map))
+            companies[idx] = token_map.get("company_name", "")
+        valid = {}
+        if len(chunk) > 1:
+            requests += 1
+            print(f"[Personalizer] Batched request for {len(chunk)} lead(s). Prompt tokens: {count_tokens(template)}")
+            try:
+                content = _chat_and_report("personalize_email_batch", {
+                    "model": "gpt-4o-mini",
+                    "messages": [
+                        {"role": "system", "content": "You rewrite emails with subtle, high-signal personalization."},
+                        {"role": "user", "content": template.strip()},
+                        {"role": "user", "content": _BATCH_EMAIL_INSTRUCTIONS},
+                        {"role": "user", "content": f"Leads and base emails JSON:\n{json.dumps(list(payloads.values()))}"}
+                    ],
+                    "temperature": 0.7,
+                    "max_tokens": 350 * len(chunk),
+                }, _batch_rules(OPENER_MAX_WORDS + SUBJECT_MAX_WORDS, len(chunk)))
+                valid = _parse_batch_results(content, set(payloads), ("subject", "body_html"))
+            except Exception as e:
+                print(f"[Personalizer] Exception during batched AI request: {e}")
+        for idx, (base_subject, base_body_html, lead) in chunk:
+            entry = valid.get(idx)
+            if entry is None:
+                # Missing/invalid entry (or a single-lead chunk): personalize this lead on its own
+                retried += 1
+                results[idx] = personalize_email(base_subject, base_body_html, lead, prompt_override=template)
+            else:
+                _store_content("personalize_email_batch", prepared[idx][0], json.dumps({"subject": entry["subject"], "body_html": entry["body_html"]}))
+                results[idx] = _finish_email(entry["subject"], entry["body_html"], companies[idx], lead)
+    print(f"[Personalizer] Batched personalization: {len(items)} lead(s), {cached} cached, {requests} batched request(s), {retried} individual retr{'y' if retried == 1 else 'ies'}.")
+    return results
+
+
+def personalize_subjects_batch(items, prompt_override=None, batch_size=5):
+    """
+    Batched personalize_subject: `items` is a list of (base_subject, lead). Same packing, per-lead
+    validation and individual retry as personalize_emails_batch. Returns results in input order.
+    """
+    template = _load_subject_personalizer_prompt(prompt_override)
+    results = [None] * len(items)
+    requests = retried = cached = 0
+    prepared = {}
+    pending = []
+    for idx, (base_subject, lead) in enumerate(items):
+        prepared[idx] = _subject_request(base_subject, lead, template)
+        content = _cached_single_or_batched("personalize_subject", prepared[idx][0], _subject_output_ok)
+        if content is None:
+            pending.append((idx, (base_subject, lead)))
+        else:
+            cached += 1
+            results[idx] = _subject_result(content, prepared[idx][1], base_subject)
+    for chunk in _chunks(pending, batch_size):
+        payloads = {}
+        for idx, (base_subject, lead) in chunk:
+            _, payload, token_map = prepared[idx]
+            payloads[idx] = dict(payload, id=idx, placeholders=_placeholder_values(template, token_map))
+        valid = {}
+        if len(chunk) > 1:
+            requests += 1
+            print(f"[Personalizer] Batched subject request for {len(chunk)} lead(s).")
+            try:
+                content = _chat_and_report("personalize_subject_batch", {
+                    "model": "gpt-4o-mini",
+                    "messages": [
+                        {"role": "system", "content": "You write concise, non-spammy subject lines for B2B cold emails."},
+                        {"role": "user", "content": template.strip()},
+                        {"role": "user", "content": _BATCH_SUBJECT_INSTRUCTIONS},
+                        {"role": "user", "content": f"Leads and base subjects JSON:\n{json.dumps(list(payloads.values()))}"}
+                    ],
+                    "temperature": 0.5,
+                    "max_tokens": 80 * len(chunk),
+                }, _batch_rules(SUBJECT_MAX_WORDS, len(chunk)))
+                valid = _parse_batch_results(content, set(payloads), ("subject",))
+            except Exception as e:
+                print(f"[Personalizer] Exception during batched subject request: {e}")
+        for idx, (base_subject, lead) in chunk:
+            entry = valid.get(idx)
+            if entry is None:
+                retried += 1
+                results[idx] = personalize_subject(base_subject, lead, prompt_override=template)
+            else:
+                _store_content("personalize_subject_batch", prepared[idx][0], json.dumps({"subject": entry["subject"]}))
+                subject = remove_brackets_only(entry["subject"])
+                results[idx] = {"subject": subject or (base_subject or "Quick question")}
+    print(f"[Personalizer] Batched subject personalization: {len(items)} lead(s), {cached} cached, {requests} batched request(s), {retried} individual retr{'y' if retried == 1 else 'ies'}.")
+    return results
+
+
+# === Offline batch jobs (see batch_jobs.py) ===
+def _email_result(output, lead_payload, token_map, lead):
+    subject, body_html = _parse_email_output((output or "").strip(), lead_payload["base_subject"], lead_payload["base_body_html"])
+    return _finish_email(subject, body_html, token_map.get("company_name", ""), lead)
+
+
+def _subject_result(output, payload, base_subject):
+    subject = remove_brackets_only(_parse_subject_output((output or "").strip(), payload["base_subject"]))
+    return {"subject": subject or (base_subject or "Quick question")}
+
+
+def email_request_body(base_subject, base_body_html, lead, prompt):
+    """The chat-completions body personalize_email would send for this lead, for a batch job file.
+    `prompt` is the already-loaded personalizer prompt (placeholders are rendered per lead)."""
+    return _email_request(base_subject, base_body_html, lead, prompt)[0]
+
+
+def email_from_output(output, base_subject, base_body_html, lead, prompt=None):
+    """Finish a batch-job result for email_request_body exactly like personalize_email does.
+    `output` is None when the request failed (the specialized base email is used). Pass the request's
+    `prompt` so lead fields are trimmed to the token budget the same way the request trimmed them."""
+    if prompt is None:
+        lead_payload, token_map = _prepare_email_payload(base_subject, base_body_html, lead)
+    else:
+        _, lead_payload, token_map = _email_request(base_subject, base_body_html, lead, prompt)
+    return _email_result(output, lead_payload, token_map, lead)
+
+
+def subject_request_body(base_subject, lead, prompt):
+    """The chat-completions body personalize_subject would send for this lead, for a batch job file."""
+    return _subject_request(base_subject, lead, prompt)[0]
+
+
+def subject_from_output(output, base_subject, lead, prompt=None):
+    """Finish a batch-job result for subject_request_body exactly like personalize_subject does
+    (pass the request's `prompt` to apply the same token-budget trimming)."""
+    if prompt is None:
+        payload, _ = _prepare_subject_payload(base_subject, lead)
+    else:
+        _, payload, _ = _subject_request(base_subject, lead, prompt)
+    return _subject_result(output, payload, base_subject)
 
 
 # Deprecated: use personalize_email(base_subject, base_body_html, lead, prompt_override=None)
@@ -436,17 +673,17 @@ def generate_personalized_email(lead):
     )
 
     model_name = "gpt-4o-mini"
-    prompt_tokens = len(prompt.split())
+    prompt_tokens = count_tokens(prompt)
     print(f"[Personalizer] Preparing to send request to AI API. Model: {model_name}, Prompt tokens: {prompt_tokens}")
     print(f"[Personalizer] Prompt preview (first 300 chars): {prompt[:300]!r}")
     try:
-        response = client.chat.completions.create(
-            model=model_name,
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0.7,
-            max_tokens=300,
-        )
-        output = response.choices[0].message.content.strip()
+        output, _ = chat_text("personalize_email", {
+            "model": model_name,
+            "messages": [{"role": "user", "content": prompt}],
+            "temperature": 0.7,
+            "max_tokens": 300,
+        })
+        output = output.strip()
         print(f"[Personalizer] Raw AI output: {output!r}")
         print("[Personalizer] Starting sanitation of AI output...")
         try:
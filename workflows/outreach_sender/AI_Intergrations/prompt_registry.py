@@ -0,0 +1,167 @@
+"""
+Shared prompt registry for the opener / subject / personalizer prompts.
+
+The prompt loaders used to check their env vars and re-read the prompt file on every call (once or
+twice per lead), printing a snippet each time. The registry loads each prompt once, keeps it in
+memory and revalidates cheaply:
+
+- Env overrides (OPENER_PROMPT, ...) are looked up on every call (a dict lookup)
+- Files are re-read only when their mtime / size changes (stat at most every `check_interval` s)
+- Every prompt has a stable version hash (sha256 of the text, 16 hex chars) that caches and pools
+  key on; it changes exactly when the text changes
+- Editing a prompt file (or changing its env var) hot-reloads it in a long-running process;
+  `reload()` forces a re-read of everything
+- One log line per load or change, not per call
+
+Sources per prompt, first match wins: <NAME> env var, existing file at <NAME>_PATH, default file.
+
+    from workflows.outreach_sender.AI_Intergrations.prompt_registry import get_prompt, prompt_version
+    prompt = get_prompt("opener")          # "" if no source is available
+    version = prompt_version("opener")
+"""
+from __future__ import annotations
+
+import hashlib
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+_UTILS_DIR = "/Users/kevinnovanta/backend_for_ai_agency/workflows/outreach_sender/Utils"
+
+
+def text_version(text: str) -> str:
+    """Stable version hash of a prompt text."""
+    return hashlib.sha256((text or "").encode("utf-8")).hexdigest()[:16]
+
+
+@dataclass(frozen=True)
+class PromptSource:
+    env_var: str
+    path_env_var: str
+    default_path: str
+
+
+# Registered prompts (name -> where it comes from)
+PROMPTS: Dict[str, PromptSource] = {
+    "opener": PromptSource("OPENER_PROMPT", "OPENER_PROMPT_PATH", f"{_UTILS_DIR}/opener_prompt.txt"),
+    "subject": PromptSource("SUBJECT_PROMPT", "SUBJECT_PROMPT_PATH", f"{_UTILS_DIR}/subject_prompt.txt"),
+    # Not a prompt: the static opener sent when the LLM fails or its circuit breaker is open
+    "opener_fallback": PromptSource("OPENER_FALLBACK", "OPENER_FALLBACK_PATH", f"{_UTILS_DIR}/opener_fallback.txt"),
+    "personalizer": PromptSource("PERSONALIZER_PROMPT", "PERSONALIZER_PROMPT_PATH", f"{_UTILS_DIR}/personalizer_prompt.txt"),
+    "subject_personalizer": PromptSource(
+        "SUBJECT_PERSONALIZER_PROMPT", "SUBJECT_PERSONALIZER_PROMPT_PATH", f"{_UTILS_DIR}/subject_personalizer_prompt.txt"
+    ),
+}
+
+
+class _Entry:
+    __slots__ = ("origin", "stat", "text", "version", "checked_at")
+
+    def __init__(self, origin: str, stat: Optional[Tuple[int, int]], text: str):
+        self.origin = origin
+        self.stat = stat
+        self.text = text
+        self.version = text_version(text)
+        self.checked_at = time.monotonic()
+
+
+class PromptRegistry:
+    """In-memory prompts, revalidated by env value and file mtime/size."""
+
+    def __init__(self, sources: Dict[str, PromptSource], *, check_interval: float = 1.0):
+        self.sources = dict(sources)
+        self.check_interval = float(check_interval)
+        self._lock = threading.Lock()
+        self._entries: Dict[str, _Entry] = {}
+        self.loads = 0
+
+    def _resolve(self, name: str) -> Tuple[str, Optional[str]]:
+        """(origin, file path or None for an env prompt) for the current environment."""
+        src = self.sources[name]
+        if os.environ.get(src.env_var):
+            return f"env:{src.env_var}", None
+        path = os.environ.get(src.path_env_var)
+        if not (path and os.path.isfile(path)):
+            path = src.default_path
+        return f"file:{path}", path
+
+    @staticmethod
+    def _stat(path: str) -> Optional[Tuple[int, int]]:
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def _load(self, name: str, origin: str, path: Optional[str], stat) -> _Entry:
+        src = self.sources[name]
+        if path is None:
+            text = os.environ.get(src.env_var, "")
+        elif stat is None:
+            print(f"❌ [PromptRegistry] No '{name}' prompt at {path}; using an empty prompt.")
+            text = ""
+        else:
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    text = f.read()
+            except OSError as e:
+                print(f"❌ [PromptRegistry] Failed to load '{name}' prompt from {path}: {e}")
+                text = ""
+        entry = _Entry(origin, stat, text)
+        if text:
+            print(f"🔍 [PromptRegistry] Loaded '{name}' prompt from {origin} (version {entry.version}, {len(text)} chars): {text[:100]!r}")
+        self.loads += 1
+        return entry
+
+    def entry(self, name: str) -> _Entry:
+        with self._lock:
+            cached = self._entries.get(name)
+            now = time.monotonic()
+            origin, path = self._resolve(name)
+            if cached is not None and cached.origin == origin:
+                if path is None:
+                    if cached.text == os.environ.get(self.sources[name].env_var, ""):
+                        return cached
+                elif now - cached.checked_at < self.check_interval:
+                    return cached
+                else:
+                    stat = self._stat(path)
+                    if stat == cached.stat:
+                        cached.checked_at = now
+                        return cached
+            stat = self._stat(path) if path is not None else None
+            entry = self._load(name, origin, path, stat)
+            if cached is not None and cached.version != entry.version:
+                print(f"🔄 [PromptRegistry] '{name}' prompt changed: version {cached.version} -> {entry.version}.")
+            self._entries[name] = entry
+            return entry
+
+    def get(self, name: str) -> str:
+        return self.entry(name).text
+
+    def version(self, name: str) -> str:
+        return self.entry(name).version
+
+    def reload(self, name: Optional[str] = None) -> None:
+        """Drop cached prompts so the next get() re-reads them."""
+        with self._lock:
+            if name is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(name, None)
+
+    def versions(self) -> Dict[str, str]:
+        return {name: self.version(name) for name in self.sources}
+
+
+REGISTRY = PromptRegistry(PROMPTS)
+
+
+def get_prompt(name: str) -> str:
+    return REGISTRY.get(name)
+
+
+def prompt_version(name: str) -> str:
+    return REGISTRY.version(name)
@@ -0,0 +1,175 @@
+"""
+Persistent subject bank for generic opener subjects.
+
+`generate_generic_subject()` sent the same subject prompt once per lead, right before
+`personalize_subject` made a second call. The bank keeps a pool of generic subjects per subject-prompt
+version (hash of the prompt text), fills it in bulk (one call returns a batch of subjects) and hands
+them out with a no-repeat policy per campaign, tracking how often each subject has been used.
+
+- Bank file: workflows/outreach_sender/state/subject_bank.json
+    {prompt_hash: {"subjects": {subject: {"uses": n}}, "campaigns": {campaign: [used subjects]}}}
+- A campaign never gets the same generic subject twice until the bank is exhausted; then the bank is
+  refilled in bulk, and only if the model returns nothing new does the campaign start a new cycle
+- Below `low_water` unused subjects for the campaign, a background bulk fill tops the bank up
+
+Configure in opener_controls.json (all optional):
+
+    "subject_bank": {"enabled": true, "batch_size": 20, "low_water": 5}
+
+    bank = SubjectBank.from_controls(controls)
+    subject = bank.sample(campaign=client_name_norm) if bank else generate_generic_subject()["subject"]
+"""
+from __future__ import annotations
+
+import json
+import os
+import random
+import tempfile
+import threading
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from workflows.outreach_sender.AI_Intergrations.opener_ai_writer import _load_subject_prompt, generate_subject_batch
+from workflows.outreach_sender.AI_Intergrations.prompt_registry import text_version as prompt_hash
+
+DEFAULT_BANK_PATH = Path(__file__).resolve().parents[1] / "state" / "subject_bank.json"
+FALLBACK_SUBJECT = "Quick question"
+
+
+class SubjectBank:
+    """Prompt-versioned bank of generic subjects with per-campaign no-repeat sampling."""
+
+    def __init__(
+        self,
+        path: Path = DEFAULT_BANK_PATH,
+        *,
+        batch_size: int = 20,
+        low_water: int = 5,
+        prompt_fn: Callable[[], str] = _load_subject_prompt,
+        batch_fn: Callable[[str, int], List[str]] = generate_subject_batch,
+    ):
+        self.path = Path(path)
+        self.batch_size = max(1, int(batch_size))
+        self.low_water = max(0, int(low_water))
+        self.prompt_fn = prompt_fn
+        self.batch_fn = batch_fn
+        self._lock = threading.RLock()
+        self._filling = False
+        self._banks: Dict[str, Dict] = self._load()
+
+    @classmethod
+    def from_controls(cls, controls: Dict) -> Optional["SubjectBank"]:
+        cfg = controls.get("subject_bank") or {}
+        if not cfg.get("enabled", False):
+            return None
+        return cls(
+            Path(cfg.get("path") or DEFAULT_BANK_PATH),
+            batch_size=cfg.get("batch_size", 20),
+            low_water=cfg.get("low_water", 5),
+        )
+
+    # -----------------------------
+    # Persistence
+    # -----------------------------
+    def _load(self) -> Dict[str, Dict]:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            return data if isinstance(data, dict) else {}
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def _save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(prefix=f".{self.path.name}.", suffix=".tmp", dir=str(self.path.parent))
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(self._banks, f, indent=2, ensure_ascii=False)
+        os.replace(tmp, self.path)
+
+    def _bank(self, key: str) -> Dict:
+        return self._banks.setdefault(key, {"subjects": {}, "campaigns": {}})
+
+    def _unused(self, key: str, campaign: str) -> List[str]:
+        bank = self._bank(key)
+        used = set(bank["campaigns"].get(campaign, []))
+        return [s for s in bank["subjects"] if s not in used]
+
+    # -----------------------------
+    # Bulk fill
+    # -----------------------------
+    def fill(self, prompt: Optional[str] = None) -> int:
+        """One bulk call; new subjects (case-insensitive) are added to the bank. Returns how many."""
+        prompt = self.prompt_fn() if prompt is None else prompt
+        key = prompt_hash(prompt)
+        subjects = self.batch_fn(prompt or f'Return ONLY JSON: {{"subject": "{FALLBACK_SUBJECT}"}}', self.batch_size)
+        added = 0
+        with self._lock:
+            bank = self._bank(key)
+            known = {s.lower() for s in bank["subjects"]}
+            for subj in subjects:
+                subj = (subj or "").strip()
+                if subj and subj.lower() not in known:
+                    bank["subjects"][subj] = {"uses": 0}
+                    known.add(subj.lower())
+                    added += 1
+            if added:
+                self._save()
+        print(f"[SubjectBank] Bulk fill added {added} subject(s) for prompt version {key}.")
+        return added
+
+    def _fill_in_background(self, prompt: str) -> None:
+        with self._lock:
+            if self._filling:
+                return
+            self._filling = True
+
+        def _run():
+            try:
+                self.fill(prompt)
+            except Exception as e:
+                print(f"⚠️ [SubjectBank] Background fill failed: {e}")
+            finally:
+                with self._lock:
+                    self._filling = False
+
+        threading.Thread(target=_run, name="subject-bank-fill", daemon=True).start()
+
+    # -----------------------------
+    # Sampling
+    # -----------------------------
+    def sample(self, campaign: str = "default") -> str:
+        """A generic subject this campaign has not used yet (least-used first)."""
+        prompt = self.prompt_fn()
+        key = prompt_hash(prompt)
+        with self._lock:
+            unused = self._unused(key, campaign)
+        if not unused:
+            self.fill(prompt)
+            with self._lock:
+                unused = self._unused(key, campaign)
+                if not unused and self._bank(key)["subjects"]:
+                    # Model had nothing new: start a new no-repeat cycle for this campaign
+                    print(f"[SubjectBank] Campaign '{campaign}' used every subject; starting a new cycle.")
+                    self._bank(key)["campaigns"][campaign] = []
+                    unused = self._unused(key, campaign)
+            if not unused:
+                return FALLBACK_SUBJECT
+
+        with self._lock:
+            bank = self._bank(key)
+            unused = self._unused(key, campaign) or unused
+            least = min(bank["subjects"].get(s, {}).get("uses", 0) for s in unused)
+            subject = random.choice([s for s in unused if bank["subjects"].get(s, {}).get("uses", 0) == least])
+            bank["subjects"].setdefault(subject, {"uses": 0})["uses"] += 1
+            bank["campaigns"].setdefault(campaign, []).append(subject)
+            remaining = len(unused) - 1
+            self._save()
+        if remaining < self.low_water:
+            self._fill_in_background(prompt)
+        return subject
+
+    def usage(self, prompt: Optional[str] = None) -> Dict[str, int]:
+        """{subject: uses} for the current (or given) subject prompt version."""
+        key = prompt_hash(self.prompt_fn() if prompt is None else prompt)
+        with self._lock:
+            return {s: meta.get("uses", 0) for s, meta in self._bank(key)["subjects"].items()}
@@ -0,0 +1,224 @@
+"""
+Precompiled rule engine for post-processing LLM output (personalizer + opener_ai_writer).
+
+The clean-up chain used to run a dozen `re.sub` calls per lead with patterns built on every call
+(`fix_articles` was redefined inside the personalizer, the company-name pattern recompiled per
+lead), and `opener_ai_writer._light_smooth` kept its own copy of the same kind of rules. Here every
+rule is declared once in a table and compiled at import:
+
+- A RuleSet applies its rules in order (the order is part of the behaviour, as before)
+- Each rule may carry a precheck: a cheap regex with a literal prefix (a necessary condition for a
+  match) searched first; when it finds nothing the rule is skipped entirely. Most rules target
+  artifacts that are absent from most emails, and patterns that start with `\b` or a character
+  class (e.g. the backtracking '<words> like yours') cannot use the fast literal scan themselves
+- Deletion rules that target the same kind of fragment are fused into one alternation (one scan)
+- Per-lead rules (`{target}` replacements, the company-name pattern) format / compile once per
+  distinct value (lru_cache), never per call
+
+    from workflows.outreach_sender.AI_Intergrations import text_rules
+    subject, body = text_rules.clean_personalized_email(subject, body, company_name)
+    body = text_rules.light_smooth(body)
+
+Benchmark (per-email CPU time vs. the previous chain, over a corpus of sample outputs):
+
+    python3 scripts/bench_text_rules.py
+"""
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, Sequence, Tuple
+
+IGNORECASE = re.IGNORECASE
+
+
+@dataclass(frozen=True)
+class Rule:
+    """One substitution. `repl` is a re template, or a str.format template over the ctx if `dynamic`."""
+    name: str
+    pattern: str
+    repl: str = ""
+    flags: int = 0
+    precheck: str = ""              # skip the rule unless this (cheaper) regex is found
+    dynamic: bool = False
+
+
+def fused(name: str, patterns: Sequence[str], repl: str = "", flags: int = 0, precheck: str = "") -> Rule:
+    """One rule (one scan) for several alternatives with the same literal replacement."""
+    return Rule(name, "|".join(f"(?:{p})" for p in patterns), repl, flags, precheck)
+
+
+class RuleSet:
+    """An ordered, compiled list of rules."""
+
+    def __init__(self, name: str, rules: Sequence[Rule]):
+        self.name = name
+        self.rules = tuple(rules)
+        self._compiled = tuple(
+            (
+                re.compile(r.pattern, r.flags),
+                r.repl,
+                r.dynamic,
+                re.compile(r.precheck, r.flags) if r.precheck else None,
+            )
+            for r in self.rules
+        )
+
+    def apply(self, text: str, **ctx: str) -> str:
+        for regex, repl, dynamic, precheck in self._compiled:
+            if precheck is not None and precheck.search(text) is None:
+                continue
+            if dynamic:
+                value = repl.format(**ctx)
+                new = regex.sub(lambda _m: value, text)
+            else:
+                new = regex.sub(repl, text)
+            text = new
+        return text
+
+
+# =============================
+# Rule tables
+# =============================
+_GENERIC_AUDIENCE = r"(?:business\s*owners|businesses|companies|teams)"
+
+BRACKETS = RuleSet("brackets", [
+    Rule("bracketed_placeholder", r"\[.*?\]", "", precheck=r"\["),
+])
+
+ARTICLES = RuleSet("articles", [
+    Rule("a_before_vowel", r"\ba\s+([aeiouAEIOU])", r"an \1", precheck=r"a\s+[aeiouAEIOU]"),
+])
+
+# '<Company> like yours' and dangling fragments left by an empty company name (personalizer)
+COMPANY_LIKE_YOURS = RuleSet("company_like_yours", [
+    Rule("generic_like_yours", r"\b[a-zA-Z0-9&\-\s]+\s+like\s+yours\b", "companies like yours", precheck=r"like\s+yours\b"),
+    Rule("empty_greeting", r"\bHi\s*,", "Hi there,", precheck=r"Hi\s*,"),
+    # All three are deleted, so one scan finds them (they only interact on degenerate input like 'with for. .')
+    fused("dangling_preposition", [r"\bresonate with\s*\.", r"\bfor\s*\.", r"with\s*\."], "", IGNORECASE,
+          precheck=r"(?:with|for)\s*\."),
+    Rule("double_spaces", r" {2,}", " ", precheck="  "),
+    Rule("space_before_comma", r"\s+,", ",", precheck=r"\s,"),
+    Rule("double_comma", r",\s+,", ",", precheck=r",\s+,"),
+])
+
+# Generic audience phrases -> the lead's company (or offer); removed when neither is known
+SPECIALIZE_CLAIMS = RuleSet("specialize_claims", [
+    Rule("we_help_generic", rf"\bwe\s+help\s+{_GENERIC_AUDIENCE}\b", "we help {target}", IGNORECASE, rf"help\s+{_GENERIC_AUDIENCE}", True),
+    Rule("for_generic", rf"\bfor\s+{_GENERIC_AUDIENCE}\b", "for {target}", IGNORECASE, rf"for\s+{_GENERIC_AUDIENCE}", True),
+    Rule("help_your_business", r"\bhelp\s+(?:your|their)\s+(?:business|company)\b", "help {target}", IGNORECASE, r"help\s+(?:your|their)", True),
+])
+STRIP_GENERIC_CLAIMS = RuleSet("strip_generic_claims", [
+    Rule("we_help_generic", rf"\bwe\s+help\s+{_GENERIC_AUDIENCE}\b", "we help", IGNORECASE, rf"help\s+{_GENERIC_AUDIENCE}"),
+    Rule("for_generic", rf"\bfor\s+{_GENERIC_AUDIENCE}\b", "", IGNORECASE, rf"for\s+{_GENERIC_AUDIENCE}"),
+    Rule("help_your_business", r"\bhelp\s+(?:your|their)\s+(?:business|company)\b", "help", IGNORECASE, r"help\s+(?:your|their)"),
+])
+
+SPECIALIZE_SUBJECT = RuleSet("specialize_subject", [
+    Rule("your_business", r"\byour\s+business\b", "{target}", IGNORECASE, r"your\s+business", True),
+])
+
+# Messy offer text -> short neutral hint (drops first-person fluff and calls to action)
+OFFER_HINT = RuleSet("offer_hint", [
+    Rule("first_person_lead_in", r"^\s*(we|our|i)\s+(specialize\s+in|love\s+to|love\s+doing|help|offer)\b[:\s-]*", "", IGNORECASE),
+    Rule("call_to_action", r"\b(contact|book|schedule|call|click)\b.*$", "", IGNORECASE,
+         r"contact|book|schedule|call|click"),
+    Rule("punctuation", r"[^\w\s&/-]", ""),
+    Rule("spaces", r"\s{2,}", " "),
+])
+
+# Freeform opener smoothing (opener_ai_writer._light_smooth): content is never removed
+LIGHT_SMOOTH = RuleSet("light_smooth", [
+    Rule("empty_hi", r"\bHi\s*,\b", "Hi there,", precheck=r"Hi\s*,"),
+    Rule("empty_hello", r"\bHello\s*,\b", "Hello there,", precheck=r"Hello\s*,"),
+    Rule("dangling_preposition", r"\b(at|with|for)\s*\.(?=\s|$)", "", IGNORECASE,
+         precheck=r"(?:at|with|for)\s*\."),
+    Rule("a_before_vowel", r"\ba\s+(?=[aeiouAEIOU])", "an ", precheck=r"a\s+[aeiouAEIOU]"),
+    Rule("double_spaces", r"[ \t]{2,}", " ", precheck=r"[ \t]{2}"),
+])
+
+BR_TO_NEWLINES = RuleSet("br_to_newlines", [
+    Rule("double_br", r"(<br\s*/?>\s*){2,}", "\n\n", IGNORECASE, precheck="<br"),
+    Rule("single_br", r"<br\s*/?>", "\n", IGNORECASE, precheck="<br"),
+    Rule("blank_lines", r"\n{3,}", "\n\n", precheck="\n\n\n"),
+])
+
+RULESETS: Dict[str, RuleSet] = {
+    rs.name: rs for rs in (
+        BRACKETS, ARTICLES, COMPANY_LIKE_YOURS, SPECIALIZE_CLAIMS, STRIP_GENERIC_CLAIMS,
+        SPECIALIZE_SUBJECT, OFFER_HINT, LIGHT_SMOOTH, BR_TO_NEWLINES,
+    )
+}
+
+
+@lru_cache(maxsize=4096)
+def _company_like_yours(company_name: str) -> re.Pattern:
+    return re.compile(re.escape(company_name) + r"\s+like\s+yours", re.IGNORECASE)
+
+
+# =============================
+# Entry points
+# =============================
+def remove_brackets(text: str) -> str:
+    return BRACKETS.apply(text or "").strip()
+
+
+def fix_articles(text: str) -> str:
+    return ARTICLES.apply(text)
+
+
+def fix_company_like_yours(text: str, company_name: str) -> str:
+    """Replace awkward '<Company> like yours' and clean fragments left by a missing company name."""
+    if not text:
+        return ""
+    cn = (company_name or "").strip()
+    if cn and "like" in text.lower():
+        text = _company_like_yours(cn).sub("companies like yours", text)
+    return COMPANY_LIKE_YOURS.apply(text)
+
+
+def clean_personalized_email(subject: str, body_html: str, company_name: str) -> Tuple[str, str]:
+    """The personalizer's full post-processing of a (subject, body_html) pair."""
+    subject = remove_brackets(subject)
+    body_html = remove_brackets(body_html)
+    body_html = fix_company_like_yours(body_html, company_name)
+    return ARTICLES.apply(subject), ARTICLES.apply(body_html)
+
+
+def offer_hint(offer_summary: str) -> str:
+    if not offer_summary:
+        return ""
+    t = OFFER_HINT.apply(offer_summary.strip()).strip()
+    words = t.split()
+    return " ".join(words[:12]) if len(words) > 12 else t
+
+
+def specialize_generic_claims(text: str, company_name: str, offer_summary: str) -> str:
+    if not text:
+        return text or ""
+    target = (company_name or "").strip() or (offer_summary or "").strip()
+    if not target:
+        return STRIP_GENERIC_CLAIMS.apply(text)
+    return SPECIALIZE_CLAIMS.apply(text, target=target)
+
+
+def specialize_subject(subject: str, company_name: str, offer_summary: str) -> str:
+    subj = subject or ""
+    target = (company_name or "").strip() or (offer_summary or "").strip()
+    if not target:
+        return subj
+    return SPECIALIZE_SUBJECT.apply(subj, target=target)
+
+
+def light_smooth(text: str) -> str:
+    if not isinstance(text, str):
+        return ""
+    return LIGHT_SMOOTH.apply(text).strip()
+
+
+def normalize_linebreaks(text: str) -> str:
+    if not isinstance(text, str):
+        return ""
+    t = BR_TO_NEWLINES.apply(text.replace("\r\n", "\n"))
+    return "\n".join(line.rstrip() for line in t.split("\n")).strip()
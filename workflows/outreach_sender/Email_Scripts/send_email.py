@@ -1,47 +1,68 @@
-import smtplib
-import ssl
 import json
 import random
 import re
+import threading
 from pathlib import Path
-from email.mime.text import MIMEText 
 from datetime import datetime
 
 def remove_brackets(text):
     """Remove [] and anything between them."""
     return re.sub(r"\[[^\]]*\]", "", text)
 
-# Load email accounts and limits
+# Email accounts, the per-inbox daily limit and today's send counts are loaded on first use
+# (see _state): importing this module reads no files and works without the credentials present.
 credentials_path = "/Users/kevinnovanta/backend_for_ai_agency/Creds/email_accounts.json"
-with open(credentials_path, "r") as f:
-    email_accounts = json.load(f)
-
-# Track how many emails each inbox has sent today
-sent_counts = {acc["email"]: 0 for acc in email_accounts}
-
-# Load per-inbox daily limit from controls (fallback to 40)
 controls_path = "/Users/kevinnovanta/backend_for_ai_agency/workflows/outreach_sender/Utils/opener_controls.json"
-try:
-    with open(controls_path, "r") as cf:
-        controls = json.load(cf)
-    DAILY_LIMIT = int(controls.get("per_inbox_limit", 40))
-except Exception:
-    DAILY_LIMIT = 40
-
-# Reset tracking if needed (new day)
-today = datetime.now().strftime("%Y-%m-%d")
 tracking_path = Path(__file__).parent / "email_send_tracking.json"
 
-if tracking_path.exists():
-    with open(tracking_path, "r") as f:
-        tracking_data = json.load(f)
-    if tracking_data.get("date") != today:
+_state_lock = threading.Lock()
+_loaded = None
+
+
+def _load_state():
+    # Load email accounts and limits
+    with open(credentials_path, "r") as f:
+        email_accounts = json.load(f)
+
+    # Track how many emails each inbox has sent today
+    sent_counts = {acc["email"]: 0 for acc in email_accounts}
+
+    # Load per-inbox daily limit from controls (fallback to 40)
+    try:
+        with open(controls_path, "r") as cf:
+            controls = json.load(cf)
+        daily_limit = int(controls.get("per_inbox_limit", 40))
+    except Exception:
+        daily_limit = 40
+
+    # Reset tracking if needed (new day)
+    today = datetime.now().strftime("%Y-%m-%d")
+    if tracking_path.exists():
+        with open(tracking_path, "r") as f:
+            tracking_data = json.load(f)
+        if tracking_data.get("date") != today:
+            tracking_data = {"date": today, "sent_counts": sent_counts}
+    else:
         tracking_data = {"date": today, "sent_counts": sent_counts}
-else:
-    tracking_data = {"date": today, "sent_counts": sent_counts}
 
-# Update local reference
-sent_counts.update(tracking_data["sent_counts"])
+    # Update local reference
+    sent_counts.update(tracking_data["sent_counts"])
+    return {
+        "email_accounts": email_accounts,
+        "sent_counts": sent_counts,
+        "daily_limit": daily_limit,
+        "tracking_data": tracking_data,
+    }
+
+
+def _state():
+    """Accounts / limit / send counts, loaded once on first use."""
+    global _loaded
+    if _loaded is None:
+        with _state_lock:
+            if _loaded is None:
+                _loaded = _load_state()
+    return _loaded
 
 def get_available_sender(sender_override=None):
     """
@@ -49,6 +70,9 @@ def get_available_sender(sender_override=None):
     If sender_override is provided, try to use it (if it exists and is under limit),
     otherwise fall back to normal rotation.
     """
+    state = _state()
+    email_accounts, sent_counts, DAILY_LIMIT = state["email_accounts"], state["sent_counts"], state["daily_limit"]
+
     # Try explicit override first
     if sender_override:
         for acc in email_accounts:
@@ -68,6 +92,11 @@ def get_available_sender(sender_override=None):
     return random.choice(available_accounts)
 
 def send_email(to_email, subject, body, sender_override=None):
+    # SMTP / TLS / MIME modules are only needed to actually send (kept out of import time)
+    import smtplib
+    import ssl
+    from email.mime.text import MIMEText
+
     sender = get_available_sender(sender_override=sender_override)
     sender_email = sender["email"]
     sender_password = sender["app_password"]
@@ -92,6 +121,8 @@ def send_email(to_email, subject, body, sender_override=None):
             server.login(sender_email, sender_password)
             server.sendmail(sender_email, to_email, msg.as_string())
 
+        state = _state()
+        sent_counts, tracking_data = state["sent_counts"], state["tracking_data"]
         sent_counts[sender_email] += 1
         tracking_data["sent_counts"] = sent_counts
         with open(tracking_path, "w") as f:
@@ -1,23 +1,35 @@
-import requests
 import os
 
 import re
 from workflows.outreach_sender.AI_Intergrations.opener_ai_writer import generate_email as gen_opener_email
 from workflows.outreach_sender.AI_Intergrations.opener_ai_writer import generate_generic_subject
+from workflows.outreach_sender.AI_Intergrations.opener_variant_pool import OpenerVariantPool
+from workflows.outreach_sender.AI_Intergrations.subject_bank import SubjectBank
+from workflows.outreach_sender.AI_Intergrations.draft_pipeline import DraftPipeline
+from workflows.outreach_sender.AI_Intergrations.draft_store import DraftStore
+from workflows.outreach_sender.AI_Intergrations.fused_opener import FusedOpener
 from workflows.outreach_sender.AI_Intergrations.personalizer import personalize_email
 from workflows.outreach_sender.AI_Intergrations.personalizer import personalize_subject
+from workflows.outreach_sender.AI_Intergrations.personalizer import personalize_emails_batch, personalize_subjects_batch
 from workflows.outreach_sender.Email_Scripts.send_email import send_email as gmail_send_email
 from workflows.outreach_sender.Utils.opener_utils import sanitize_email_fields
 from workflows.outreach_sender.Utils.preflight import preflight_filter
 from workflows.outreach_sender.Utils.parallel_dispatcher import run_parallel_dispatch
+from workflows.universal_outreach_utils.crm_store import normalize_email, open_store
+from workflows.universal_outreach_utils.crm_journal import start_background_compaction
+from workflows.universal_outreach_utils.crm_writer import CRMWriter
+from workflows.universal_outreach_utils.crm_sqlite import MirrorBackedStore, open_mirror
+from workflows.universal_outreach_utils.crm_shards import open_client_directory, resolve_client_path
+from workflows.universal_outreach_utils.bulk_preflight import bulk_preflight
+from workflows.universal_outreach_utils.lead_identity import open_identity_index
 
-import csv
 import json
 from datetime import datetime
 from pathlib import Path
 import time
 import random
 import sys
+import threading
 
 from datetime import datetime
 
@@ -28,13 +40,9 @@ from pathlib import Path as _PathForLog
 import atexit as _atexit_for_log
 import datetime as _dt_for_log
 
-_LOG_DIR = _PathForLog(__file__).replace("sequence_runner.py", "logs") if hasattr(_PathForLog(__file__), 'replace') else _PathForLog(__file__).parent / "logs"
-try:
-    # Fallback to normal path logic
-    _LOG_DIR = _PathForLog(__file__).parent / "logs"
-except Exception:
-    pass
-_LOG_DIR.mkdir(parents=True, exist_ok=True)
+# Installed when a run starts (install_teelog), not at import: importing this module creates no
+# directories and leaves sys.stdout / sys.stderr alone.
+_LOG_DIR = _PathForLog(__file__).parent / "logs"
 _LOG_FILE = _LOG_DIR / "outreach.log"
 
 class _Tee:
@@ -79,28 +87,36 @@ class _Tee:
         except Exception:
             return False
 
-# Install tee for stdout and stderr
-_orig_stdout = sys.stdout
-_orig_stderr = sys.stderr
-_tee_out = _Tee(_orig_stdout, _LOG_FILE)
-_tee_err = _Tee(_orig_stderr, _LOG_FILE)
-sys.stdout = _tee_out
-sys.stderr = _tee_err
+_orig_stdout = None
+_orig_stderr = None
+_tee_out = None
+_tee_err = None
 
-# Ensure files close on exit
-def _close_teelog():
-    try:
-        _tee_out.file.close()
-    except Exception:
-        pass
-    try:
-        _tee_err.file.close()
-    except Exception:
-        pass
 
-_atexit_for_log.register(_close_teelog)
+def install_teelog():
+    """Mirror stdout/stderr to logs/outreach.log with timestamps (once per process)."""
+    global _orig_stdout, _orig_stderr, _tee_out, _tee_err
+    if _tee_out is not None:
+        return
+    _LOG_DIR.mkdir(parents=True, exist_ok=True)
+    # Install tee for stdout and stderr
+    _orig_stdout = sys.stdout
+    _orig_stderr = sys.stderr
+    _tee_out = _Tee(_orig_stdout, _LOG_FILE)
+    _tee_err = _Tee(_orig_stderr, _LOG_FILE)
+    sys.stdout = _tee_out
+    sys.stderr = _tee_err
+    # Ensure files close on exit
+    _atexit_for_log.register(_close_teelog)
+    print(f"🧾 Logging to {_LOG_FILE} (console + file). Session start.")
+
 
-print(f"🧾 Logging to {_LOG_FILE} (console + file). Session start.")
+def _close_teelog():
+    for tee in (_tee_out, _tee_err):
+        try:
+            tee.file.close()
+        except Exception:
+            pass
 
 
 # Simple logger helper for step-wise logging
@@ -133,22 +149,24 @@ def _find_col(fieldnames, target_label: str) -> str:
     return target_label  # fallback if not found
 
 
-# Helper to persist owner assignment to the CRM for a specific lead email, preserving headers and quoting.
-def _persist_owner_assignment(crm_path: Path, lead_email: str, owner_email: str) -> None:
-    """Write Owner / Assigned To to CSV for a specific lead email, preserving headers and quoting."""
+# Opener columns that must exist in the CRM header before we write them
+OPENER_REQUIRED_COLS = [
+    "Opener Sender Used", "Opener Subject Sent", "Opener Body Sent",
+    "Opener Time Sent", "Opener Date Sent", "Bounce Status for Opener"
+]
+
+# Every lead field the opener flow persists after a successful send
+OPENER_PERSIST_COLS = [
+    "Messaging Status", "Campaign Type", "Sequence Stage", "Lead Stage",
+    "Last Contacted Date", "Campaign Assigned", "Outreach Channel", "Owner / Assigned To",
+] + OPENER_REQUIRED_COLS
+
+
+# Helper to persist owner assignment to the CRM for a specific lead email (row-level, no file rewrite).
+def _persist_owner_assignment(crm_writer: CRMWriter, lead_email: str, owner_email: str) -> None:
+    """Write Owner / Assigned To for a specific lead email via the single CRM writer (waits for the ack)."""
     try:
-        with open(crm_path, "r", newline="", encoding="utf-8") as f:
-            rows = list(csv.DictReader(f))
-        if not rows:
-            return
-        fieldnames = rows[0].keys()
-        with open(crm_path, "w", newline="", encoding="utf-8") as f:
-            writer = csv.DictWriter(f, fieldnames=fieldnames, quoting=csv.QUOTE_ALL)
-            writer.writeheader()
-            for r in rows:
-                if (r.get("Email") or "") == (lead_email or ""):
-                    r["Owner / Assigned To"] = owner_email
-                writer.writerow(r)
+        crm_writer.update(lead_email, {"Owner / Assigned To": owner_email})
     except Exception as e:
         print(f"⚠️ Failed to persist owner assignment for {lead_email}: {e}")
 
@@ -159,6 +177,7 @@ def send_email(recipient_email, subject, body, sender_override=None):
     return success, sender_email
 
 def run_opener_sequence():
+    install_teelog()
     # Load config
     control_path = Path(__file__).parent / "Utils" / "opener_controls.json"
     with open(control_path, "r") as f:
@@ -188,21 +207,37 @@ def run_opener_sequence():
         return
     log_step(f"Day/time check passed. Allowed days: {allowed_days}, Window: {start_hour:02d}:00-{end_hour:02d}:00")
 
-    # Preload CRM once, detect the actual Client Name column, and build lookup
+    # Resolve the client lookup first; the CRM rows are loaded only for the selected client
     crm_path = Path("/Users/kevinnovanta/backend_for_ai_agency/data/leads/CRM_Leads/CRM_leads_copy.csv")
-    with open(crm_path, newline="", encoding="utf-8") as csvfile:
-        reader = csv.DictReader(csvfile)
-        fieldnames = reader.fieldnames or []
-        client_col = _find_col(fieldnames, "Client Name")
-        rows = list(reader)
+    # Per-client shards (crm_shards build): clients.json answers the lookup without touching any rows
+    client_dir = open_client_directory(crm_path)
+    # Optional SQLite mirror (CRM_SQLITE_PATH): indexed client lookup / untouched-lead query instead of scans
+    crm_mirror = open_mirror(crm_path) if client_dir is None else None
+    crm_store = None
+    if client_dir is not None:
+        rows = []
+        client_col = _find_col(client_dir.header, "Client Name")
+        clients_present = client_dir.clients_present()
+        log_step(f"Loaded CRM client directory from {client_dir.shard_dir}. Clients: {len(clients_present)} | Client column: {client_col}")
+    elif crm_mirror is not None and "Client Name" in crm_mirror.header:
+        rows = []
+        client_col = "Client Name"
+        clients_present = crm_mirror.clients()
+        log_step(f"Loaded CRM index from SQLite mirror {crm_mirror.db_path}. Clients: {len(clients_present)}")
+    else:
+        crm_mirror = None
+        crm_store = open_store(crm_path)
+        client_col = _find_col(crm_store.fieldnames, "Client Name")
+        # Detached copies: leads are mutated in memory during dispatch and persisted via crm_writer
+        rows = crm_store.snapshot()
         log_step(f"Loaded CRM leads from {crm_path}. Total rows: {len(rows)} | Client column: {client_col}")
 
-    # Build normalized set/map of client names present
-    clients_present = {}
-    for r in rows:
-        val = (r.get(client_col, "") or "").strip()
-        if val:
-            clients_present[_norm(val)] = val  # preserve original casing
+        # Build normalized set/map of client names present
+        clients_present = {}
+        for r in rows:
+            val = (r.get(client_col, "") or "").strip()
+            if val:
+                clients_present[_norm(val)] = val  # preserve original casing
 
     # Pitch message: explain what this sequence does and why
     print("🚀 Outreach Sequence Initiator")
@@ -222,6 +257,34 @@ def run_opener_sequence():
 
     log_step(f"Selected client: {client_name_display}")
 
+    # Open the store that holds this client's rows: its shard when sharded, else the whole CRM
+    crm_store_path = resolve_client_path(crm_path, client_name_norm)
+    if crm_store is None and crm_mirror is not None:
+        # The mirror serves the reads: journal + mirror writes, the CSV is never loaded whole
+        crm_store = MirrorBackedStore(
+            crm_mirror, crm_path, compact_min_entries=int(controls.get("crm_compact_min_entries", 500))
+        )
+        log_step("CRM writes go to the journal and the SQLite mirror (no full CSV load).")
+    elif crm_store is None:
+        crm_store = open_store(crm_store_path)
+        if client_dir is not None:
+            rows = crm_store.snapshot()
+            client_dir.record_rows(client_name_norm, len(rows))
+            log_step(f"Loaded {len(rows)} lead(s) for {client_name_display} from shard {crm_store_path.name}.")
+    # Single writer thread owns the CRM: workers queue updates, it group-commits them to the journal
+    crm_writer = CRMWriter(
+        crm_store,
+        batch_size=int(controls.get("crm_writer_batch_size", 64)),
+        linger_seconds=float(controls.get("crm_writer_linger_ms", 20)) / 1000.0,
+    ).start()
+    # Row updates are journaled immediately and compacted into the CSV once per run (or on interrupt)
+    _atexit_for_log.register(crm_store.flush)
+    _atexit_for_log.register(crm_writer.stop)
+    # Optional periodic compaction of the CRM journal into the CSV during long runs
+    compact_every = int(controls.get("crm_compact_interval_seconds", 0) or 0)
+    if compact_every > 0:
+        start_background_compaction(crm_store_path, compact_every)
+
     # Optional interactive testing mode
     interactive_mode = input("🧪 Interactive test mode? (y/N): ").strip().lower().startswith("y")
     sender_override = None
@@ -234,7 +297,17 @@ def run_opener_sequence():
     log_step("Interactive mode evaluated; proceeding to lead filtering.")
 
     # Use centralized preflight (verification + allow-list + basic gates)
-    leads_to_send, skip_logs, settings_logs = preflight_filter(
+    if crm_mirror is not None:
+        rows = crm_mirror.untouched_leads(client_name_norm)
+        log_step(f"SQLite mirror returned {len(rows)} untouched lead(s) for {client_name_display}.")
+    preflight_fn = preflight_filter
+    if bool(controls.get("bulk_preflight", False)):
+        try:
+            import pandas  # noqa: F401  (bulk preflight needs pandas/numpy)
+            preflight_fn = bulk_preflight
+        except ImportError:
+            log_step("bulk_preflight requested but pandas/numpy are not installed; using row-by-row preflight.")
+    leads_to_send, skip_logs, settings_logs = preflight_fn(
         rows,
         controls,
         client_col_name=client_col,
@@ -247,6 +320,25 @@ def run_opener_sequence():
     for msg in skip_logs:
         print(msg)
 
+    # Cross-client duplicates: drop leads whose email / DM link is already owned by another client
+    identity = open_identity_index(crm_path)
+    if identity is not None:
+        identity.ensure_seeded(crm_path)
+        owned_elsewhere = []
+        kept = []
+        for lead in leads_to_send:
+            check = identity.observe(lead, client_name_norm)
+            if check is not None and check["cross_client"]:
+                owned_elsewhere.append((lead.get("Email", ""), check["owner_client"]))
+            else:
+                kept.append(lead)
+        identity.close()
+        if owned_elsewhere:
+            print(f"⏭️ Skipped {len(owned_elsewhere)} lead(s) already owned by another client (identity index).")
+            for email, owner in owned_elsewhere[:5]:
+                print(f"   • {email} → client '{owner}'")
+        leads_to_send = kept
+
     # Enforce daily limit
     if len(leads_to_send) > daily_limit:
         leads_to_send = leads_to_send[:daily_limit]
@@ -315,6 +407,31 @@ def run_opener_sequence():
     #
     # Build a deterministic rotation count to help choose_inbox_cb:
     rr_index = 0
+    rr_lock = threading.Lock()
+
+    # Leads mutated in memory during dispatch, keyed by normalized email; only these are reconciled
+    dirty_leads = {}
+
+    def _mark_dirty(lead: dict) -> None:
+        dirty_leads[normalize_email(lead.get("Email"))] = lead
+
+    draft_pipeline = None  # enabled for parallel dispatch below ("draft_pipeline" in controls)
+
+    # Lead-independent opener drafts: reuse a pool per prompt version instead of one LLM call per lead
+    opener_pool = OpenerVariantPool.from_controls(controls)
+    if opener_pool is not None:
+        log_step(f"Opener variant pool enabled (size={opener_pool.size}, low_water={opener_pool.low_water}).")
+    subject_bank = SubjectBank.from_controls(controls)
+    if subject_bank is not None:
+        log_step(f"Subject bank enabled (batch_size={subject_bank.batch_size}, low_water={subject_bank.low_water}).")
+    # Drafts generated overnight by an offline batch job (batch_jobs.py), keyed by lead email
+    draft_store = DraftStore.from_controls(controls)
+    if draft_store is not None:
+        log_step(f"Offline draft store enabled ({len(draft_store)} draft(s) ready, live_fallback={draft_store.live_fallback}).")
+    # Personalized subject + body in one structured-output call; invalid output falls back to the chain below
+    fused_opener = FusedOpener.from_controls(controls)
+    if fused_opener is not None:
+        log_step("Fused opener generation enabled (one LLM call per lead, multi-step chain as fallback).")
 
     # Helper to pick/remember an inbox for a lead, and persist that owner to the CRM immediately.
     def choose_inbox_cb(lead: dict, senders: list[str]) -> str:
@@ -323,28 +440,99 @@ def run_opener_sequence():
         current_owner = (lead.get("Owner / Assigned To", "") or "").strip()
         if current_owner in senders:
             return current_owner
-        # Otherwise choose round-robin
-        inbox = senders[rr_index % len(senders)]
-        rr_index += 1
+        # Otherwise choose round-robin (workers call this concurrently)
+        with rr_lock:
+            inbox = senders[rr_index % len(senders)]
+            rr_index += 1
         # Persist the owner so other processes won't double-assign
-        _persist_owner_assignment(crm_path, lead.get("Email", ""), inbox)
+        _persist_owner_assignment(crm_writer, lead.get("Email", ""), inbox)
         lead["Owner / Assigned To"] = inbox
+        _mark_dirty(lead)
         print(f"📌 Assigned inbox for {lead.get('Email')} → '{inbox}' (persisted to CRM)")
         return inbox
 
-    # The core "send one opener" operation used by both modes.
-    # It mirrors your previous per-lead logic, but receives the chosen inbox explicitly.
-    def send_one_opener(inbox_email: str, lead: dict) -> dict:
+    # Generic opener + subject for one lead (before personalization)
+    def base_opener_email(lead: dict) -> dict:
+        # === Generate a generic opener (sampled from the variant pool when enabled) ===
+        if opener_pool is not None:
+            base_email = opener_pool.sample()
+            log_step("Sampled generic opener email from the opener variant pool.")
+        else:
+            base_email = gen_opener_email(lead)  # {"subject": "...", "body_html": "..."}
+            log_step("Generated generic opener email via opener_ai_writer.")
+
+        # === Generate generic subject (no-repeat sample from the subject bank when enabled) ===
+        if subject_bank is not None:
+            base_email["subject"] = subject_bank.sample(campaign=client_name_norm)
+            log_step("Sampled generic subject from the subject bank.")
+        else:
+            subj_data = generate_generic_subject()
+            base_email["subject"] = subj_data.get("subject", base_email.get("subject", "Quick question"))
+            log_step("Generated generic subject via subject_prompt.")
+        return base_email
+
+    # Empty-subject guards + sanitizing of a personalized email; returns (subject, body)
+    def finalize_opener_draft(lead: dict, final_email: dict) -> tuple:
         email = lead.get("Email")
 
-        # === Generate a generic opener ===
-        base_email = gen_opener_email(lead)  # {"subject": "...", "body_html": "..."}
-        log_step("Generated generic opener email via opener_ai_writer.")
+        print("\n=== RAW AI OUTPUT (after personalization) ===")
+        print("SUBJECT:", final_email.get("subject", ""))
+        print("BODY_HTML:", final_email.get("body_html", ""))
+        print("============================================\n")
 
-        # === Generate generic subject ===
-        subj_data = generate_generic_subject()
-        base_email["subject"] = subj_data.get("subject", base_email.get("subject", "Quick question"))
-        log_step("Generated generic subject via subject_prompt.")
+        subject = final_email.get("subject", "")
+        body = final_email.get("body_html", "")
+
+        if not (subject or "").strip():
+            raise RuntimeError(f"Empty subject generated for {email}")
+
+        clean_subject, clean_body = sanitize_email_fields(subject, body)
+        log_step(f"Sanitized subject/body. Final subject: {clean_subject}")
+
+        if not (clean_subject or "").strip():
+            raise RuntimeError(f"Subject became empty after sanitization for {email}")
+        # LLM down and no opener_fallback template: fail this lead rather than send an empty email
+        if not (clean_body or "").strip():
+            raise RuntimeError(f"Empty body generated for {email}")
+        return clean_subject, clean_body
+
+    # Offline draft for this lead from the draft store (None -> generate live)
+    def stored_opener_draft(lead: dict):
+        if draft_store is None:
+            return None
+        stored = draft_store.get(lead.get("Email"))
+        if stored is not None:
+            log_step(f"Using offline batch draft for {lead.get('Email')}.")
+            return finalize_opener_draft(lead, stored)
+        if not draft_store.live_fallback:
+            raise RuntimeError(f"No offline draft for {lead.get('Email')} and draft_store live_fallback is off")
+        return None
+
+    # Fused single-call draft for this lead (None -> run the multi-step chain)
+    def fused_opener_draft(lead: dict):
+        if fused_opener is None:
+            return None
+        final_email = fused_opener.generate(lead)
+        if final_email is None:
+            return None
+        try:
+            draft = finalize_opener_draft(lead, final_email)
+        except Exception as e:
+            log_step(f"Fused draft rejected for {lead.get('Email')} ({e}); using the multi-step chain.")
+            return None
+        log_step(f"Generated personalized opener for {lead.get('Email')} via fused single call.")
+        return draft
+
+    # LLM chain for one lead: generic opener + subject, then body/subject personalization and sanitizing.
+    # Runs inside the send slot, or ahead of it in the draft pipeline (parallel mode).
+    def build_opener_draft(lead: dict) -> tuple:
+        stored = stored_opener_draft(lead)
+        if stored is not None:
+            return stored
+        fused = fused_opener_draft(lead)
+        if fused is not None:
+            return fused
+        base_email = base_opener_email(lead)
 
         # === Personalize body ===
         final_email = personalize_email(
@@ -360,22 +548,54 @@ def run_opener_sequence():
         final_email["subject"] = subj_final.get("subject", final_email.get("subject", ""))
         log_step("Personalized subject via subject_personalizer.")
 
-        print("\n=== RAW AI OUTPUT (after personalization) ===")
-        print("SUBJECT:", final_email.get("subject", ""))
-        print("BODY_HTML:", final_email.get("body_html", ""))
-        print("============================================\n")
-
-        subject = final_email.get("subject", "")
-        body = final_email.get("body_html", "")
-
-        if not (subject or "").strip():
-            raise RuntimeError(f"Empty subject generated for {email}")
+        return finalize_opener_draft(lead, final_email)
+
+    # Same chain for several leads, with K leads per personalization request ("batch_personalization").
+    # Returns one (subject, body) draft or the exception raised for that lead, in input order.
+    def build_opener_drafts(leads: list) -> list:
+        drafts = []
+        for lead in leads:
+            try:
+                drafts.append(stored_opener_draft(lead))
+            except Exception as e:
+                drafts.append(e)
+        for i, lead in enumerate(leads):
+            if drafts[i] is None:
+                drafts[i] = fused_opener_draft(lead)
+        live = [i for i, d in enumerate(drafts) if d is None]
+        if not live:
+            return drafts
+        leads = [leads[i] for i in live]
+        batch_size = int((controls.get("batch_personalization") or {}).get("batch_size", 5))
+        bases = [base_opener_email(lead) for lead in leads]
+        emails = personalize_emails_batch(
+            [(b.get("subject", ""), b.get("body_html", ""), lead) for b, lead in zip(bases, leads)],
+            batch_size=batch_size,
+        )
+        log_step(f"Personalized {len(leads)} email bodies via batched personalizer.")
+        subjects = personalize_subjects_batch(
+            [(e.get("subject", ""), lead) for e, lead in zip(emails, leads)],
+            batch_size=batch_size,
+        )
+        log_step(f"Personalized {len(leads)} subjects via batched subject personalizer.")
+        for i, lead, final_email, subj_final in zip(live, leads, emails, subjects):
+            final_email["subject"] = subj_final.get("subject", final_email.get("subject", ""))
+            try:
+                drafts[i] = finalize_opener_draft(lead, final_email)
+            except Exception as e:
+                drafts[i] = e
+        return drafts
 
-        clean_subject, clean_body = sanitize_email_fields(subject, body)
-        log_step(f"Sanitized subject/body. Final subject: {clean_subject}")
+    # The core "send one opener" operation used by both modes.
+    # It mirrors your previous per-lead logic, but receives the chosen inbox explicitly.
+    def send_one_opener(inbox_email: str, lead: dict) -> dict:
+        email = lead.get("Email")
 
-        if not (clean_subject or "").strip():
-            raise RuntimeError(f"Subject became empty after sanitization for {email}")
+        if draft_pipeline is not None:
+            clean_subject, clean_body = draft_pipeline.take(lead)
+            log_step(f"Took prefetched draft for {email}. Final subject: {clean_subject}")
+        else:
+            clean_subject, clean_body = build_opener_draft(lead)
 
         # In interactive mode, preview and require explicit confirmation
         if interactive_mode:
@@ -420,40 +640,13 @@ def run_opener_sequence():
         lead["Opener Body Sent"] = clean_body
         lead["Opener Time Sent"] = _now.strftime("%H:%M:%S")
         lead["Opener Date Sent"] = _now.strftime("%Y-%m-%d")
+        _mark_dirty(lead)
+        if draft_store is not None:
+            draft_store.discard(email)  # sent: the offline draft must not be reused
 
-        # Persist the opener fields to CSV immediately
+        # Persist the opener fields for this lead only (queued to the CRM writer; compacted at end of run)
         try:
-            with open(crm_path, "r", newline="", encoding="utf-8") as f:
-                csv_rows = list(csv.DictReader(f))
-            required_cols = [
-                "Opener Sender Used", "Opener Subject Sent", "Opener Body Sent",
-                "Opener Time Sent", "Opener Date Sent", "Bounce Status for Opener"
-            ]
-            existing_cols = list(csv_rows[0].keys()) if csv_rows else []
-            fieldnames_local = list(dict.fromkeys(existing_cols + required_cols))
-            with open(crm_path, "w", newline="", encoding="utf-8") as f:
-                writer = csv.DictWriter(f, fieldnames=fieldnames_local, quoting=csv.QUOTE_ALL)
-                writer.writeheader()
-                for row in csv_rows:
-                    if row.get("Email") == lead.get("Email"):
-                        row["Messaging Status"] = lead.get("Messaging Status", row.get("Messaging Status", ""))
-                        row["Campaign Type"] = lead.get("Campaign Type", row.get("Campaign Type", ""))
-                        row["Sequence Stage"] = lead.get("Sequence Stage", row.get("Sequence Stage", ""))
-                        row["Lead Stage"] = lead.get("Lead Stage", row.get("Lead Stage", ""))
-                        row["Last Contacted Date"] = lead.get("Last Contacted Date", row.get("Last Contacted Date", ""))
-                        row["Campaign Assigned"] = lead.get("Campaign Assigned", row.get("Campaign Assigned", ""))
-                        row["Outreach Channel"] = lead.get("Outreach Channel", row.get("Outreach Channel", ""))
-                        row["Owner / Assigned To"] = lead.get("Owner / Assigned To", row.get("Owner / Assigned To", ""))
-                        row["Bounce Status for Opener"] = lead.get("Bounce Status for Opener", row.get("Bounce Status for Opener", ""))
-                        row["Opener Sender Used"] = lead.get("Opener Sender Used", row.get("Opener Sender Used", ""))
-                        row["Opener Subject Sent"] = lead.get("Opener Subject Sent", row.get("Opener Subject Sent", ""))
-                        row["Opener Body Sent"] = lead.get("Opener Body Sent", row.get("Opener Body Sent", ""))
-                        row["Opener Time Sent"] = lead.get("Opener Time Sent", row.get("Opener Time Sent", ""))
-                        row["Opener Date Sent"] = lead.get("Opener Date Sent", row.get("Opener Date Sent", ""))
-                    for col in fieldnames_local:
-                        if col not in row:
-                            row[col] = ""
-                    writer.writerow(row)
+            crm_writer.update(email, {col: lead.get(col, "") for col in OPENER_PERSIST_COLS})
         except Exception as e:
             print(f"⚠️ Failed to persist opener fields for {email}: {e}")
 
@@ -497,8 +690,9 @@ def run_opener_sequence():
                 print(f"⏭️  Skipping {lead.get('Email')}: already assigned to '{assigned_owner}', not '{chosen_inbox}'.")
                 continue
             if not assigned_owner:
-                _persist_owner_assignment(crm_path, lead.get("Email", ""), chosen_inbox)
+                _persist_owner_assignment(crm_writer, lead.get("Email", ""), chosen_inbox)
                 lead["Owner / Assigned To"] = chosen_inbox
+                _mark_dirty(lead)
                 print(f"📌 Assigned inbox for {lead.get('Email')} → '{chosen_inbox}' (persisted to CRM)")
                 log_step(f"Assigning inbox '{chosen_inbox}' to lead {lead.get('Email')}")
 
@@ -522,6 +716,13 @@ def run_opener_sequence():
         max_j = send_interval_seconds + send_jitter_seconds
         print(f"[DISPATCH] Parallel mode ON. Jitter window: {min_j}-{max_j}s | per-inbox cap: {per_inbox_limit} | global cap: {daily_limit}")
 
+        # Keep personalized drafts ready ahead of the send slots (bounded async prefetch)
+        draft_pipeline = DraftPipeline.from_controls(controls, build_opener_draft, build_opener_drafts)
+        if draft_pipeline is not None:
+            draft_pipeline.start(leads_to_send)
+        elif (controls.get("batch_personalization") or {}).get("enabled"):
+            log_step("batch_personalization requires draft_pipeline; personalizing one lead per request.")
+
         run_parallel_dispatch(
             leads=leads_to_send,
             sender_pool=sender_pool if sender_pool else [sender_override] if sender_override else [],
@@ -533,51 +734,28 @@ def run_opener_sequence():
             global_daily_limit=daily_limit,
             max_inboxes=None,  # or set a cap
         )
+        if draft_pipeline is not None:
+            draft_pipeline.stop()
+
+    # All workers are done: drain the writer so the store is quiescent before reconciling
+    crm_writer.stop()
+    log_step(f"CRM writer stats: {crm_writer.stats()}")
+    if opener_pool is not None:
+        log_step(f"Opener variant pool stats: {opener_pool.stats()}")
+    if fused_opener is not None:
+        log_step(f"Fused opener stats: {fused_opener.summary()}")
+
+    log_step(f"Starting final reconciliation pass for {len(dirty_leads)} lead(s) mutated during dispatch.")
+    # Diff only the dirty leads against their CRM rows (hash-index lookups) and persist changed fields
+    crm_store.ensure_columns(OPENER_REQUIRED_COLS)
+    stats = crm_store.reconcile(
+        dirty_leads.values(),
+        OPENER_PERSIST_COLS,
+        row_filter=lambda row: _norm(row.get(client_col, "")) == client_name_norm,
+    )
+    crm_store.flush()
 
-    log_step("Starting final reconciliation pass for untouched/new leads.")
-    # Reload full CRM data and update relevant rows
-    with open(crm_path, "r", newline="", encoding="utf-8") as csvfile:
-        csvfile_data = list(csv.DictReader(csvfile))
-
-    # Reopen CRM for rewriting
-    required_cols = [
-        "Opener Sender Used", "Opener Subject Sent", "Opener Body Sent",
-        "Opener Time Sent", "Opener Date Sent", "Bounce Status for Opener"
-    ]
-    existing_cols = list(csvfile_data[0].keys()) if csvfile_data else []
-    fieldnames = list(dict.fromkeys(existing_cols + required_cols))
-    with open(crm_path, "w", newline="", encoding="utf-8") as csvfile:
-        writer = csv.DictWriter(csvfile, fieldnames=fieldnames, quoting=csv.QUOTE_ALL)
-        writer.writeheader()
-
-        for row in csvfile_data:
-            if _norm(row.get(client_col, "")) == client_name_norm and row.get("Messaging Status", "").strip().lower() in ("", "untouched", "new"):
-                # Find the updated status in leads_to_send
-                matching = next((lead for lead in leads_to_send if lead["Email"] == row["Email"]), None)
-                if matching:
-                    row["Messaging Status"] = matching.get("Messaging Status", row.get("Messaging Status", ""))
-                    row["Campaign Type"] = matching.get("Campaign Type", row.get("Campaign Type", ""))
-                    row["Sequence Stage"] = matching.get("Sequence Stage", row.get("Sequence Stage", ""))
-                    row["Lead Stage"] = matching.get("Lead Stage", row.get("Lead Stage", ""))
-                    row["Last Contacted Date"] = matching.get("Last Contacted Date", row.get("Last Contacted Date", ""))
-                    row["Campaign Assigned"] = matching.get("Campaign Assigned", row.get("Campaign Assigned", ""))
-                    row["Outreach Channel"] = matching.get("Outreach Channel", row.get("Outreach Channel", ""))
-                    row["Owner / Assigned To"] = matching.get("Owner / Assigned To", row.get("Owner / Assigned To", ""))
-                    if "Bounce Status for Opener" in matching:
-                        row["Bounce Status for Opener"] = matching.get("Bounce Status for Opener", row.get("Bounce Status for Opener", ""))
-                    # Update opener NEW columns
-                    row["Opener Sender Used"] = matching.get("Opener Sender Used", row.get("Opener Sender Used", ""))
-                    row["Opener Subject Sent"] = matching.get("Opener Subject Sent", row.get("Opener Subject Sent", ""))
-                    row["Opener Body Sent"] = matching.get("Opener Body Sent", row.get("Opener Body Sent", ""))
-                    row["Opener Time Sent"] = matching.get("Opener Time Sent", row.get("Opener Time Sent", ""))
-                    row["Opener Date Sent"] = matching.get("Opener Date Sent", row.get("Opener Date Sent", ""))
-            # Ensure all required columns exist for DictWriter
-            for col in fieldnames:
-                if col not in row:
-                    row[col] = ""
-            writer.writerow(row)
-
-    log_step("Final reconciliation complete. Script finished.")
+    log_step(f"Final reconciliation complete: {stats['changed']} row(s) changed ({stats['checked']} checked) in {stats['elapsed_ms']:.1f} ms. Script finished.")
 
 
 if __name__ == "__main__":
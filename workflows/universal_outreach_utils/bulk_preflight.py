@@ -0,0 +1,160 @@
+"""
+Vectorised bulk preflight for the opener runner.
+
+Centralizes:
+- Loading only the gate columns (client, email, status, deliverability) into pandas/NumPy arrays
+- Deliverability normalisation through a categorical mapping (each distinct raw value normalised once)
+- Every gate evaluated as a boolean mask over the whole CRM, with per-gate skip counts
+- The same (leads_to_send, skip_logs, settings_logs) contract as Utils/preflight.preflight_filter
+
+Gates, in order (a lead is counted under the first gate it fails):
+- client         Client column does not match the selected client
+- email          missing / malformed Email
+- status         Messaging Status is not blank / untouched / new
+- deliverability normalised Deliverability not in allowed_deliverability_statuses
+                 (only when use_deliverability_filter is on)
+- duplicate      same Email already eligible earlier in the file (first row wins)
+
+Enable with "bulk_preflight": true in opener_controls.json. pandas/numpy are imported lazily;
+if they are not installed `bulk_preflight` raises ImportError and the runner falls back to
+the row-by-row preflight_filter.
+
+    leads, skip_logs, settings_logs = bulk_preflight(rows, controls,
+                                                     client_col_name="Client Name",
+                                                     selected_client_norm="acme co")
+
+Path suggestion: workflows/universal_outreach_utils/bulk_preflight.py
+"""
+from __future__ import annotations
+
+import time
+from typing import TYPE_CHECKING, Dict, List, Sequence, Tuple
+
+from workflows.universal_outreach_utils.crm_schema import allowed_deliverability_set, normalize_deliverability
+from workflows.universal_outreach_utils.crm_sqlite import UNTOUCHED_STATUSES
+
+if TYPE_CHECKING:  # numpy is imported lazily at runtime (optional dependency)
+    import numpy as np
+
+GATES = ("client", "email", "status", "deliverability", "duplicate")
+
+_GATE_LABELS = {
+    "client": "client does not match",
+    "email": "missing or invalid email",
+    "status": "already contacted (Messaging Status set)",
+    "deliverability": "deliverability not allowed",
+    "duplicate": "duplicate email (kept first row)",
+}
+
+_EXAMPLES_PER_GATE = 5
+
+_EMAIL_RE = r"^[^@\s]+@[^@\s]+\.[^@\s]+$"
+
+
+def _norm(s: str) -> str:
+    return " ".join((s or "").split()).lower()
+
+
+def _category_mask(values: List[str], test) -> "np.ndarray":
+    """Evaluate `test(raw value)` once per distinct value and broadcast it through categorical codes."""
+    import numpy as np
+    import pandas as pd
+
+    cat = pd.Categorical(values)
+    ok = np.fromiter((bool(test(v)) for v in cat.categories), dtype=bool, count=len(cat.categories))
+    # codes == -1 only for NaN, which column() never produces
+    return ok[cat.codes]
+
+
+def bulk_masks(rows: Sequence[Dict[str, str]], controls: Dict, *, client_col_name: str, selected_client_norm: str):
+    """Evaluate every gate over `rows`. Returns (normalized emails, {gate: pass_mask}) as NumPy arrays.
+
+    Client, status and deliverability are low-cardinality columns, so each is mapped through a
+    categorical (one normalisation per distinct value). Email checks only run on the selected client's rows."""
+    import numpy as np
+    import pandas as pd
+
+    def column(name: str) -> List[str]:
+        return [(r.get(name) or "") for r in rows]
+
+    n = len(rows)
+    client_ok = _category_mask(column(client_col_name), lambda v: _norm(v) == selected_client_norm)
+    untouched = frozenset(UNTOUCHED_STATUSES)
+    masks = {
+        "client": client_ok,
+        "status": _category_mask(column("Messaging Status"), lambda v: _norm(v) in untouched),
+    }
+    if bool(controls.get("use_deliverability_filter", False)):
+        allowed = allowed_deliverability_set(controls.get("allowed_deliverability_statuses", []))
+        masks["deliverability"] = _category_mask(column("Deliverability"), lambda v: normalize_deliverability(v) in allowed)
+    else:
+        masks["deliverability"] = np.ones(n, dtype=bool)
+
+    # Email gates on the client's rows only (other clients are dropped by the first gate anyway)
+    idx = np.flatnonzero(client_ok)
+    emails = np.full(n, "", dtype=object)
+    email_ok = np.zeros(n, dtype=bool)
+    dup = np.zeros(n, dtype=bool)
+    if len(idx):
+        sub = pd.Series([(rows[i].get("Email") or "") for i in idx], dtype=object).str.strip().str.lower()
+        emails[idx] = sub.to_numpy()
+        email_ok[idx] = sub.str.match(_EMAIL_RE).to_numpy()
+        eligible = masks["status"][idx] & masks["deliverability"][idx] & email_ok[idx]
+        if eligible.any():
+            dup[idx[eligible]] = sub[eligible].duplicated(keep="first").to_numpy()
+    masks["email"] = email_ok | ~client_ok
+    masks["duplicate"] = ~dup
+    return emails, {gate: masks[gate] for gate in GATES}
+
+
+def bulk_preflight(
+    rows: Sequence[Dict[str, str]],
+    controls: Dict,
+    *,
+    client_col_name: str,
+    selected_client_norm: str,
+) -> Tuple[List[Dict[str, str]], List[str], List[str]]:
+    """Vectorised preflight_filter. Returns (leads_to_send, skip_logs, settings_logs)."""
+    import numpy as np
+
+    t0 = time.perf_counter()
+    settings_logs: List[str] = []
+    skip_logs: List[str] = []
+    if not rows:
+        settings_logs.append("Bulk preflight: no rows to evaluate.")
+        return [], skip_logs, settings_logs
+
+    emails, masks = bulk_masks(
+        rows, controls, client_col_name=client_col_name, selected_client_norm=selected_client_norm
+    )
+
+    use_deliv = bool(controls.get("use_deliverability_filter", False))
+    if use_deliv:
+        allowed = sorted(allowed_deliverability_set(controls.get("allowed_deliverability_statuses", [])))
+        settings_logs.append(f"Deliverability filter ON. Allowed: {allowed}")
+    else:
+        settings_logs.append("Deliverability filter OFF.")
+
+    # Attribute each skipped row to the first gate it fails
+    remaining = np.ones(len(rows), dtype=bool)
+    other_clients = 0
+    for gate in GATES:
+        failed = remaining & ~masks[gate]
+        n = int(failed.sum())
+        remaining &= masks[gate]
+        if not n:
+            continue
+        if gate == "client":
+            other_clients = n  # not a skip for this client's run; reported in the summary only
+            continue
+        examples = [e or "<blank>" for e in emails[np.flatnonzero(failed)[:_EXAMPLES_PER_GATE]]]
+        more = f" (+{n - len(examples)} more)" if n > len(examples) else ""
+        skip_logs.append(f"⏭️ Skipped {n} lead(s): {_GATE_LABELS[gate]} — e.g. {', '.join(examples)}{more}")
+
+    leads = [rows[i] for i in np.flatnonzero(remaining)]
+    elapsed_ms = (time.perf_counter() - t0) * 1000.0
+    settings_logs.append(
+        f"Bulk preflight: {len(rows)} row(s) → {len(leads)} eligible "
+        f"({other_clients} other-client row(s) ignored) in {elapsed_ms:.0f} ms."
+    )
+    return leads, skip_logs, settings_logs
@@ -0,0 +1,203 @@
+"""
+Append-only CRM mutation journal.
+
+Every CRM write becomes one JSON line of per-lead field deltas:
+
+    {"email": "lead@example.com", "column": "Messaging Status", "value": "Opener Sent", "ts": "2025-08-13T14:02:11+00:00"}
+
+- Writers append in O(1) (no read-modify-write of the CSV, nothing to truncate on crash)
+- Readers (CRMStore) load the base CSV and replay the journal on top of it
+- Compaction rotates the journal aside, folds it into the canonical CSV (atomic replace), then deletes it
+- Appends and loads hold an inter-process file lock (<journal>.lock, fcntl.flock) shared, compaction
+  holds it exclusively: an append waits out a running compaction and then lands in the fresh journal
+  (never in the rotated file about to be deleted), and the compactor re-reads the base CSV + journal
+  under the lock, so two processes compacting the same CRM never overwrite each other's deltas.
+  Where fcntl is unavailable (Windows) there is no lock: run writers and compaction from a single
+  owner process only
+- Until compacted, the journal doubles as a replayable change history
+
+Compact from cron / by hand:
+
+    python3 -m workflows.universal_outreach_utils.crm_journal /path/to/CRM_leads_copy.csv [--min-entries 500]
+
+Path suggestion: workflows/universal_outreach_utils/crm_journal.py
+"""
+from __future__ import annotations
+
+import argparse
+import contextlib
+import json
+import os
+import threading
+from datetime import datetime, UTC
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, Optional, Tuple, Union
+
+try:
+    import fcntl
+except ImportError:  # Windows: no inter-process lock, compaction must have a single owner process
+    fcntl = None
+
+PathLike = Union[str, Path]
+
+JOURNAL_SUFFIX = ".journal.jsonl"
+COMPACTING_SUFFIX = ".compacting"
+LOCK_SUFFIX = ".lock"
+
+
+def journal_path_for(csv_path: PathLike) -> Path:
+    """CRM_leads_copy.csv -> CRM_leads_copy.csv.journal.jsonl (same directory)."""
+    p = Path(csv_path)
+    return p.with_name(p.name + JOURNAL_SUFFIX)
+
+
+class CRMJournal:
+    """JSONL journal of (email, column, value, ts) deltas for one CRM file."""
+
+    def __init__(self, path: PathLike, *, fsync: bool = True):
+        self.path = Path(path)
+        self.fsync = fsync
+        self._lock = threading.Lock()
+
+    def append(self, email: str, column: str, value: str, ts: Optional[str] = None) -> None:
+        self.append_many([(email, column, value)], ts=ts)
+
+    def append_many(self, deltas: Iterable[Tuple[str, str, str]], ts: Optional[str] = None) -> int:
+        """Append several deltas with a single write (+fsync). Returns how many were written."""
+        stamp = ts or datetime.now(UTC).isoformat(timespec="seconds")
+        lines = [
+            json.dumps({"email": email, "column": column, "value": value, "ts": stamp}, ensure_ascii=False) + "\n"
+            for email, column, value in deltas
+        ]
+        if not lines:
+            return 0
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._lock, self.file_lock(shared=True):
+            # Under the shared lock a compactor cannot rotate `path` between our open and our write
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write("".join(lines))
+                f.flush()
+                if self.fsync:
+                    os.fsync(f.fileno())
+        return len(lines)
+
+    @property
+    def compacting_path(self) -> Path:
+        return self.path.with_name(self.path.name + COMPACTING_SUFFIX)
+
+    @property
+    def lock_path(self) -> Path:
+        return self.path.with_name(self.path.name + LOCK_SUFFIX)
+
+    @contextlib.contextmanager
+    def file_lock(self, *, shared: bool = False) -> Iterator[None]:
+        """Inter-process lock for this CRM file: exclusive while compacting, shared while appending or loading.
+        Not re-entrant across calls in one process (each call opens its own lock file handle)."""
+        if fcntl is None:
+            yield
+            return
+        self.lock_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.lock_path, "a") as f:
+            fcntl.flock(f.fileno(), fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+    def replay(self) -> Iterator[Dict[str, str]]:
+        """Yield entries in write order: a pending compaction file first, then the live journal.
+        A torn last line (crash mid-append) is skipped."""
+        for path in (self.compacting_path, self.path):
+            yield from _read_entries(path)
+
+    def replay_file(self, path: PathLike) -> Iterator[Dict[str, str]]:
+        """Yield entries from a single journal file (e.g. the one returned by rotate())."""
+        yield from _read_entries(Path(path))
+
+    def overlay(self) -> Dict[str, Dict[str, str]]:
+        """Latest value per (normalized email, column), for readers that stream the base CSV."""
+        merged: Dict[str, Dict[str, str]] = {}
+        for e in self.replay():
+            key = (e.get("email") or "").strip().lower()
+            merged.setdefault(key, {})[e["column"]] = "" if e.get("value") is None else str(e["value"])
+        return merged
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self.replay())
+
+    def rotate(self) -> Optional[Path]:
+        """Move the live journal aside for compaction and return the file to fold in (call under file_lock()).
+        If a previous compaction crashed, its file is returned as-is (the live journal stays put;
+        replaying it again later is harmless because deltas are plain assignments)."""
+        with self._lock:
+            if self.compacting_path.exists():
+                return self.compacting_path
+            if not self.path.exists() or self.path.stat().st_size == 0:
+                return None
+            os.replace(self.path, self.compacting_path)
+            return self.compacting_path
+
+    def finish_compaction(self) -> None:
+        """Drop the rotated file once its deltas are in the CSV."""
+        with self._lock:
+            try:
+                self.compacting_path.unlink()
+            except FileNotFoundError:
+                pass
+
+
+def _read_entries(path: Path) -> Iterator[Dict[str, str]]:
+    if not path.exists():
+        return
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if isinstance(entry, dict) and "email" in entry and "column" in entry:
+                yield entry
+
+
+def compact(csv_path: PathLike, *, min_entries: int = 0) -> int:
+    """Fold the journal for `csv_path` into the CSV. Returns the number of entries compacted."""
+    from workflows.universal_outreach_utils.crm_store import open_store
+
+    journal = CRMJournal(journal_path_for(csv_path))
+    pending = len(journal)
+    if pending == 0 or pending < min_entries:
+        return 0
+    open_store(csv_path).flush()
+    return pending
+
+
+def start_background_compaction(csv_path: PathLike, interval_seconds: float, *, min_entries: int = 0) -> threading.Event:
+    """Compact every `interval_seconds` on a daemon thread. Set the returned Event to stop it."""
+    stop = threading.Event()
+
+    def _loop():
+        while not stop.wait(interval_seconds):
+            try:
+                compact(csv_path, min_entries=min_entries)
+            except Exception as e:
+                print(f"⚠️ CRM journal compaction failed for {csv_path}: {e}")
+
+    threading.Thread(target=_loop, name="crm-journal-compactor", daemon=True).start()
+    return stop
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Fold the CRM mutation journal into the canonical CSV.")
+    ap.add_argument("csv_path", help="Path to the canonical CRM CSV")
+    ap.add_argument("--min-entries", type=int, default=0, help="Skip compaction if fewer entries are pending")
+    args = ap.parse_args()
+    n = compact(args.csv_path, min_entries=args.min_entries)
+    print(f"Compacted {n} journal entr{'y' if n == 1 else 'ies'} into {args.csv_path}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
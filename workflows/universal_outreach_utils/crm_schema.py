@@ -8,6 +8,8 @@ Centralizes:
 - Valid enums (Deliverability, stages)
 - Normalizers & validators
 - Convenience setters for writing stage results back to the CSV
+- A compiled schema (built once): immutable fieldnames, name→index maps, per-stage column keys
+- CRMRow: a compact list-backed row with a dict-like API for large CSV passes
 
 This module mirrors your current CSV header precisely, including the new
 Deliverability column and per‑stage Bounce Status fields.
@@ -16,7 +18,9 @@ Path suggestion: workflows/universal_outreach_utils/crm_schema.py
 """
 from __future__ import annotations
 from datetime import datetime
-from typing import Dict, List, Iterable, Optional
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Dict, List, Iterable, Iterator, Mapping, Optional, Tuple
 
 # =============================
 # Base columns (pre-stage)
@@ -80,13 +84,17 @@ STAGE_SUBFIELDS: List[str] = [
 BOUNCE_SUFFIX = "Bounce Status"
 
 
-def stage_fields() -> List[str]:
+def _build_stage_fields() -> Tuple[str, ...]:
     fields: List[str] = []
     for stage in STAGES:
         for sub in STAGE_SUBFIELDS:
             fields.append(f"{stage} {sub}")
         fields.append(f"{BOUNCE_SUFFIX} for {stage}")
-    return fields
+    return tuple(fields)
+
+
+def stage_fields() -> List[str]:
+    return list(SCHEMA.stage_fields)
 
 
 def NOTES_FIELD() -> List[str]:
@@ -96,8 +104,189 @@ def NOTES_FIELD() -> List[str]:
 
 
 def FIELDNAMES() -> List[str]:
-    """Exact, ordered fieldnames for csv.DictWriter to match the sheet."""
-    return BASE_FIELDS + stage_fields() + NOTES_FIELD()
+    """Exact, ordered fieldnames for csv.DictWriter to match the sheet.
+    Returns a fresh list (callers may extend it); use SCHEMA.fieldnames for the cached tuple."""
+    return list(SCHEMA.fieldnames)
+
+
+# =============================
+# Compiled schema (built once at import)
+# =============================
+
+class StageColumns:
+    """Precomputed column keys for one stage (no f-strings on the write path)."""
+
+    __slots__ = ("stage", "sender_used", "time_sent", "date_sent", "subject_sent", "body_sent", "bounce_status")
+
+    def __init__(self, stage: str):
+        self.stage = stage
+        self.sender_used = f"{stage} Sender Used"
+        self.time_sent = f"{stage} Time Sent"
+        self.date_sent = f"{stage} Date Sent"
+        self.subject_sent = f"{stage} Subject Sent"
+        self.body_sent = f"{stage} Body Sent"
+        self.bounce_status = f"{BOUNCE_SUFFIX} for {stage}"
+
+
+class RowLayout:
+    """Immutable column order + name→index map shared by every CRMRow read from one header."""
+
+    __slots__ = ("fieldnames", "index", "unique")
+
+    def __init__(self, fieldnames: Iterable[str]):
+        self.fieldnames: Tuple[str, ...] = tuple(fieldnames)
+        # Duplicate header names: last wins, like the dicts csv.DictReader builds
+        self.index: Mapping[str, int] = MappingProxyType({name: i for i, name in enumerate(self.fieldnames)})
+        self.unique = len(self.index) == len(self.fieldnames)
+
+    def __len__(self) -> int:
+        return len(self.fieldnames)
+
+    def row(self, values: Iterable[Optional[str]] = ()) -> "CRMRow":
+        """Build a row from a CSV record; short records are padded with "", long ones clipped."""
+        return CRMRow(self, values)
+
+
+@lru_cache(maxsize=64)
+def _layout_for(fieldnames: Tuple[str, ...]) -> RowLayout:
+    return RowLayout(fieldnames)
+
+
+def compile_layout(fieldnames: Iterable[str]) -> RowLayout:
+    """Shared layout for a header (cached, so every file with the sheet header reuses one map)."""
+    return _layout_for(tuple(fieldnames))
+
+
+class CompiledSchema:
+    """The CRM schema, compiled once: fieldnames, index map and per-stage column keys."""
+
+    __slots__ = ("fieldnames", "stage_fields", "index", "layout", "stage_columns")
+
+    def __init__(self):
+        self.stage_fields: Tuple[str, ...] = _build_stage_fields()
+        self.layout: RowLayout = compile_layout(tuple(BASE_FIELDS) + self.stage_fields + tuple(NOTES_FIELD()))
+        self.fieldnames: Tuple[str, ...] = self.layout.fieldnames
+        self.index: Mapping[str, int] = self.layout.index
+        self.stage_columns: Mapping[str, StageColumns] = MappingProxyType({s: StageColumns(s) for s in STAGES})
+
+
+class CRMRow:
+    """Compact CRM row: values in a list addressed through a shared RowLayout.
+
+    Supports the dict API the CRM code uses (get / [] / in / keys / items / setdefault / update),
+    so it can stand in for csv.DictReader rows and be fed to csv.DictWriter. Columns outside the
+    layout (e.g. added by ensure_columns) live in a small `_extra` dict created on first use.
+    """
+
+    __slots__ = ("_layout", "_values", "_extra")
+
+    def __init__(self, layout: RowLayout, values: Iterable[Optional[str]] = ()):
+        width = len(layout.fieldnames)
+        vals = ["" if v is None else v for v in values]
+        if len(vals) < width:
+            vals.extend([""] * (width - len(vals)))
+        elif len(vals) > width:
+            del vals[width:]
+        self._layout = layout
+        self._values = vals
+        self._extra: Optional[Dict[str, str]] = None
+
+    @property
+    def layout(self) -> RowLayout:
+        return self._layout
+
+    def __getitem__(self, key: str) -> str:
+        i = self._layout.index.get(key)
+        if i is not None:
+            return self._values[i]
+        if self._extra is not None and key in self._extra:
+            return self._extra[key]
+        raise KeyError(key)
+
+    def get(self, key: str, default=None):
+        i = self._layout.index.get(key)
+        if i is not None:
+            return self._values[i]
+        if self._extra is not None:
+            return self._extra.get(key, default)
+        return default
+
+    def __setitem__(self, key: str, value: str) -> None:
+        i = self._layout.index.get(key)
+        if i is not None:
+            self._values[i] = value
+        else:
+            if self._extra is None:
+                self._extra = {}
+            self._extra[key] = value
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._layout.index or (self._extra is not None and key in self._extra)
+
+    def __iter__(self) -> Iterator[str]:
+        yield from self._layout.index
+        if self._extra:
+            yield from self._extra
+
+    def __len__(self) -> int:
+        return len(self._layout.index) + (len(self._extra) if self._extra else 0)
+
+    def keys(self) -> List[str]:
+        return list(self)
+
+    def values(self) -> List[str]:
+        return [self[k] for k in self]
+
+    def items(self) -> List[Tuple[str, str]]:
+        return [(k, self[k]) for k in self]
+
+    def setdefault(self, key: str, default: str = "") -> str:
+        if key in self:
+            return self[key]
+        self[key] = default
+        return default
+
+    def update(self, other=(), **kwargs) -> None:
+        pairs = other.items() if hasattr(other, "items") else other
+        for k, v in pairs:
+            self[k] = v
+        for k, v in kwargs.items():
+            self[k] = v
+
+    def values_for(self, fieldnames: Tuple[str, ...]) -> List[str]:
+        """Values in `fieldnames` order ("" for absent columns), ready for csv.writer.
+        When the header starts with this row's layout (the usual case) the list is copied, not looked up."""
+        layout = self._layout
+        n = len(layout.fieldnames)
+        if layout.unique and fieldnames[:n] == layout.fieldnames:
+            vals = list(self._values)
+            if len(fieldnames) > n:
+                vals.extend(self.get(k, "") for k in fieldnames[n:])
+            return vals
+        return [self.get(k, "") for k in fieldnames]
+
+    def to_dict(self) -> Dict[str, str]:
+        d = {k: self._values[i] for k, i in self._layout.index.items()}
+        if self._extra:
+            d.update(self._extra)
+        return d
+
+    copy = to_dict
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, CRMRow):
+            return self.to_dict() == other.to_dict()
+        if isinstance(other, dict):
+            return self.to_dict() == other
+        return NotImplemented
+
+    __hash__ = None  # type: ignore[assignment]
+
+    def __repr__(self) -> str:
+        return f"CRMRow({self.to_dict()!r})"
+
+
+SCHEMA = CompiledSchema()
 
 # =============================
 # Enums / normalizers
@@ -133,10 +322,24 @@ def normalize_deliverability(value: Optional[str]) -> str:
     return DELIVERABILITY_MAP.get(v, value if (value or "") in ALLOWED_DELIVERABILITY else "")
 
 
+@lru_cache(maxsize=32)
+def _allowed_set(allowed: Tuple[str, ...]) -> frozenset:
+    return frozenset(allowed)
+
+
+def allowed_deliverability_set(allowed: Iterable[str]) -> frozenset:
+    """The allow-list as a frozenset, built once per distinct list (controls are read once per run)."""
+    if isinstance(allowed, frozenset):
+        return allowed
+    return _allowed_set(tuple(allowed))
+
+
 def deliverability_is_allowed(value: str, allowed: Iterable[str]) -> bool:
     """Return True if normalized deliverability is in the allowed set."""
     norm = normalize_deliverability(value)
-    return norm in set(allowed)
+    if not isinstance(allowed, (set, frozenset)):
+        allowed = allowed_deliverability_set(allowed)
+    return norm in allowed
 
 # =============================
 # Convenience: write results for a given stage
@@ -156,25 +359,27 @@ def set_stage_send_result(
     Mutates `row` with send details for the stage and updates generic timestamps.
     `stage` must be one of STAGES (e.g., "Opener", "Follow Up 1").
     """
-    if stage not in STAGES:
+    cols = SCHEMA.stage_columns.get(stage)
+    if cols is None:
         raise ValueError(f"Unknown stage: {stage}")
 
     sent_dt = sent_dt or datetime.utcnow()
+    date_sent = sent_dt.strftime("%Y-%m-%d")
 
-    row[f"{stage} Sender Used"] = sender_used or ""
-    row[f"{stage} Subject Sent"] = subject or ""
-    row[f"{stage} Body Sent"] = body or ""
-    row[f"{stage} Time Sent"] = sent_dt.strftime("%H:%M:%S")
-    row[f"{stage} Date Sent"] = sent_dt.strftime("%Y-%m-%d")
+    row[cols.sender_used] = sender_used or ""
+    row[cols.subject_sent] = subject or ""
+    row[cols.body_sent] = body or ""
+    row[cols.time_sent] = sent_dt.strftime("%H:%M:%S")
+    row[cols.date_sent] = date_sent
 
     b = (bounce_status or "").strip().lower()
-    row[f"{BOUNCE_SUFFIX} for {stage}"] = b if b in BOUNCE_STATUSES else (b or "")
+    row[cols.bounce_status] = b if b in BOUNCE_STATUSES else (b or "")
 
     # Generic bookkeeping
     iso_ts = sent_dt.isoformat(timespec="seconds")
     row["Last Message Sent Timestamp"] = iso_ts
     row["Last Message Sent Time Stamp"] = iso_ts  # keep legacy column in sync
-    row["Last Contacted Date"] = row[f"{stage} Date Sent"]
+    row["Last Contacted Date"] = date_sent
 
 
 # =============================
@@ -183,7 +388,7 @@ def set_stage_send_result(
 
 def ensure_defaults(row: Dict[str, str]) -> None:
     """Ensure required keys exist so DictWriter doesn't fail."""
-    for k in FIELDNAMES():
+    for k in SCHEMA.fieldnames:
         row.setdefault(k, "")
 
 
@@ -0,0 +1,285 @@
+"""
+Per-client CRM shards with a small client directory index.
+
+Layout (next to the canonical CSV):
+
+    CRM_leads_copy.csv                  # export for the Google Sheet workflow
+    CRM_leads_copy_shards/
+        clients.json                    # directory: header, canonical CSV stamp, {client_norm: {name, rows, path}}
+        acme_co.csv                     # one CSV (+ its own journal) per client
+        globex.csv
+        _unassigned.csv                 # rows with a blank client
+
+Once shards are built they are canonical: CRMStore / stream_rows are opened on a client's shard, so
+client lookup reads only clients.json and per-client loads cost O(that client's leads).
+`export` folds every shard (and its journal) back into the single CSV for the sheet.
+
+clients.json records the size / mtime of the canonical CSV (and its journal) as of the last build or
+export. If the canonical CSV changes behind the shards' back (a sheet import, a write to the single
+file), opening the directory raises StaleShardsError instead of silently reading shards that miss
+the new rows: re-shard with `build` (or `export` first if the shards hold updates the CSV lacks).
+Row counts are refreshed on build, export, `list` and whenever a runner loads a shard.
+
+    python3 -m workflows.universal_outreach_utils.crm_shards build  /path/to/CRM_leads_copy.csv
+    python3 -m workflows.universal_outreach_utils.crm_shards export /path/to/CRM_leads_copy.csv
+    python3 -m workflows.universal_outreach_utils.crm_shards list   /path/to/CRM_leads_copy.csv
+
+Path suggestion: workflows/universal_outreach_utils/crm_shards.py
+"""
+from __future__ import annotations
+
+import argparse
+import csv
+import json
+import os
+import re
+from pathlib import Path
+from typing import Dict, List, Optional, Union
+
+from workflows.universal_outreach_utils.crm_journal import journal_path_for
+from workflows.universal_outreach_utils.crm_store import (
+    _write_csv_atomic,
+    open_store,
+    stream_rows,
+)
+
+PathLike = Union[str, Path]
+
+DIRECTORY_FILE = "clients.json"
+UNASSIGNED = "_unassigned"
+CLIENT_COLUMN = "Client Name"
+
+
+def _norm(s: Optional[str]) -> str:
+    return " ".join((s or "").split()).lower()
+
+
+def _slug(name: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "_", _norm(name)).strip("_") or "client"
+
+
+def shard_dir_for(csv_path: PathLike) -> Path:
+    """CRM_leads_copy.csv -> CRM_leads_copy_shards/ (same directory)."""
+    p = Path(csv_path)
+    return p.with_name(f"{p.stem}_shards")
+
+
+def source_stamp(csv_path: PathLike) -> Dict[str, Optional[List[int]]]:
+    """[size, mtime_ns] of the canonical CSV and its journal (None for a missing file)."""
+    stamp = {}
+    for p in (Path(csv_path), journal_path_for(csv_path)):
+        st = p.stat() if p.exists() else None
+        stamp[p.name] = [st.st_size, st.st_mtime_ns] if st else None
+    return stamp
+
+
+class StaleShardsError(RuntimeError):
+    """The canonical CSV changed after the shards were built (e.g. a sheet import)."""
+
+
+class ClientDirectory:
+    """The clients.json index: client → display name, row count and shard file."""
+
+    def __init__(self, shard_dir: PathLike, data: Dict):
+        self.shard_dir = Path(shard_dir)
+        self.header: List[str] = list(data.get("header") or [])
+        self.client_col: str = data.get("client_col") or CLIENT_COLUMN
+        self.clients: Dict[str, Dict] = dict(data.get("clients") or {})
+        self.source: Optional[Dict] = data.get("source")
+
+    @classmethod
+    def load(cls, shard_dir: PathLike) -> Optional["ClientDirectory"]:
+        path = Path(shard_dir) / DIRECTORY_FILE
+        if not path.exists():
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(shard_dir, json.load(f))
+
+    def save(self) -> None:
+        data = {"header": self.header, "client_col": self.client_col, "source": self.source, "clients": self.clients}
+        tmp = self.shard_dir / f".{DIRECTORY_FILE}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+        os.replace(tmp, self.shard_dir / DIRECTORY_FILE)
+
+    def clients_present(self) -> Dict[str, str]:
+        """{normalized client: display name}, excluding the unassigned bucket."""
+        return {k: v["name"] for k, v in self.clients.items() if k != UNASSIGNED}
+
+    def entry(self, client: str) -> Optional[Dict]:
+        return self.clients.get(_norm(client))
+
+    def shard_path(self, client: str) -> Optional[Path]:
+        e = self.entry(client)
+        return self.shard_dir / e["path"] if e else None
+
+    def shard_paths(self) -> List[Path]:
+        return [self.shard_dir / e["path"] for e in self.clients.values()]
+
+    def record_rows(self, client: str, rows: int) -> None:
+        """Keep a client's row count current (saved only when it changed)."""
+        e = self.entry(client)
+        if e is not None and e.get("rows") != rows:
+            e["rows"] = rows
+            self.save()
+
+    def is_stale(self, csv_path: PathLike) -> bool:
+        return self.source is not None and self.source != source_stamp(csv_path)
+
+
+def open_client_directory(csv_path: PathLike, *, check_fresh: bool = True) -> Optional[ClientDirectory]:
+    """The directory for `csv_path` if shards have been built, else None (single-file CRM).
+    Raises StaleShardsError if the canonical CSV changed since the last build / export."""
+    directory = ClientDirectory.load(shard_dir_for(csv_path))
+    if directory is None or not check_fresh:
+        return directory
+    if directory.source is None:
+        # Built before the directory recorded its source: trust it once and start tracking
+        print(f"⚠️ CRM client directory {directory.shard_dir} has no source stamp; recording the current {Path(csv_path).name}.")
+        directory.source = source_stamp(csv_path)
+        directory.save()
+    elif directory.is_stale(csv_path):
+        raise StaleShardsError(
+            f"{csv_path} changed after its shards in {directory.shard_dir} were built (sheet import or a "
+            f"direct write?); the shards would miss those rows. Re-shard it with "
+            f"`python3 -m workflows.universal_outreach_utils.crm_shards build {csv_path}`, after `export` "
+            f"if the shards hold updates the CSV lacks."
+        )
+    return directory
+
+
+def resolve_client_path(csv_path: PathLike, client: str) -> Path:
+    """Where a client's rows live: its shard if the CRM is sharded, else the canonical CSV.
+    Raises KeyError for a client the (fresh) directory does not know: it has no rows anywhere."""
+    directory = open_client_directory(csv_path)
+    if directory is None:
+        return Path(csv_path)
+    shard = directory.shard_path(client)
+    if shard is None:
+        raise KeyError(f"Client '{client}' not in CRM client directory {directory.shard_dir}")
+    return shard
+
+
+def build_shards(csv_path: PathLike) -> ClientDirectory:
+    """Split the canonical CSV (plus pending journal) into per-client shards in one streaming pass."""
+    csv_path = Path(csv_path)
+    shard_dir = shard_dir_for(csv_path)
+    shard_dir.mkdir(parents=True, exist_ok=True)
+    open_store(csv_path).flush()  # fold pending journal entries into the source first
+
+    with open(csv_path, newline="", encoding="utf-8") as f:
+        header = next(csv.reader(f), None) or []
+    client_col = next((c for c in header if _norm(c) == _norm(CLIENT_COLUMN)), CLIENT_COLUMN)
+
+    writers: Dict[str, csv.DictWriter] = {}
+    handles = []
+    clients: Dict[str, Dict] = {}
+    used_slugs: Dict[str, str] = {}
+    try:
+        for row in stream_rows(csv_path):
+            display = (row.get(client_col) or "").strip()
+            key = _norm(display) or UNASSIGNED
+            if key not in writers:
+                slug = UNASSIGNED if key == UNASSIGNED else _slug(display)
+                while slug in used_slugs and used_slugs[slug] != key:
+                    slug += "_"
+                used_slugs[slug] = key
+                fh = open(shard_dir / f".{slug}.csv.tmp", "w", newline="", encoding="utf-8")
+                handles.append((fh, shard_dir / f".{slug}.csv.tmp", shard_dir / f"{slug}.csv"))
+                w = csv.DictWriter(fh, fieldnames=header, quoting=csv.QUOTE_ALL, extrasaction="ignore")
+                w.writeheader()
+                writers[key] = w
+                clients[key] = {"name": display or UNASSIGNED, "rows": 0, "path": f"{slug}.csv"}
+            writers[key].writerow(row)
+            clients[key]["rows"] += 1
+    finally:
+        for fh, _, _ in handles:
+            fh.close()
+    for _, tmp, final in handles:
+        os.replace(tmp, final)
+
+    directory = ClientDirectory(
+        shard_dir,
+        {"header": header, "client_col": client_col, "source": source_stamp(csv_path), "clients": clients},
+    )
+    directory.save()
+    return directory
+
+
+def export_csv(csv_path: PathLike, dest: Optional[PathLike] = None) -> Path:
+    """Fold every shard (after compacting its journal) into one CSV for the sheet workflow.
+    Rows are grouped by client in directory order. Exporting over a canonical CSV that changed since
+    the shards were built raises StaleShardsError (it would discard those changes)."""
+    in_place = dest is None or Path(dest).resolve() == Path(csv_path).resolve()
+    directory = open_client_directory(csv_path, check_fresh=in_place)
+    if directory is None:
+        raise FileNotFoundError(f"No shards built for {csv_path}")
+    header = list(directory.header)
+    for shard in directory.shard_paths():
+        store = open_store(shard)
+        store.flush()
+        for col in store.fieldnames:
+            if col not in header:
+                header.append(col)
+
+    counts: Dict[str, int] = {}
+
+    def _rows():
+        for key, e in directory.clients.items():
+            for row in stream_rows(directory.shard_dir / e["path"]):
+                counts[key] = counts.get(key, 0) + 1
+                yield row
+
+    out = _write_csv_atomic(Path(dest or csv_path), header, _rows())
+    for key, e in directory.clients.items():
+        e["rows"] = counts.get(key, 0)
+    if in_place:
+        directory.source = source_stamp(csv_path)
+    directory.save()
+    return out
+
+
+def update_fields(csv_path: PathLike, lead_id: str, fields: Dict[str, str], *, client: Optional[str] = None) -> int:
+    """Sharded counterpart of crm_store.update_fields. With `client` only that shard is touched;
+    without it, shards are searched in directory order until the lead is found."""
+    directory = open_client_directory(csv_path)
+    if directory is None:
+        return open_store(csv_path).update(lead_id, fields)
+    paths = [directory.shard_path(client)] if client else directory.shard_paths()
+    for path in paths:
+        if path is None:
+            continue
+        store = open_store(path)
+        if lead_id in store:
+            return store.update(lead_id, fields)
+    return 0
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Per-client CRM shards (build / export / list).")
+    ap.add_argument("cmd", choices=("build", "export", "list"))
+    ap.add_argument("csv_path", help="Path to the canonical CRM CSV")
+    args = ap.parse_args()
+
+    if args.cmd == "build":
+        d = build_shards(args.csv_path)
+        print(f"Built {len(d.clients)} shard(s) in {d.shard_dir}")
+    elif args.cmd == "export":
+        out = export_csv(args.csv_path)
+        print(f"Exported shards -> {out}")
+    else:
+        d = open_client_directory(args.csv_path, check_fresh=False)
+        if d is None:
+            print(f"No shards built for {args.csv_path}")
+            return 1
+        if d.is_stale(args.csv_path):
+            print(f"⚠️ {args.csv_path} changed since the shards were built; run `build` to re-shard it.")
+        for key, e in d.clients.items():
+            d.record_rows(key, sum(1 for _ in stream_rows(d.shard_dir / e["path"], columns=())))
+        for key, e in sorted(d.clients.items()):
+            print(f"{e['name']:<40} {e['rows']:>8}  {e['path']}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,458 @@
+"""
+Optional SQLite mirror of the CRM CSV for indexed queries.
+
+Centralizes:
+- A `leads` table whose columns are crm_schema.FIELDNAMES() plus any extra CSV headers
+- Indexes on Email, Client Name, Messaging Status and Sequence Stage (normalized shadow columns,
+  so lookups match the runners' trim/lowercase/collapse-whitespace comparisons)
+- CSV import/export that round-trips the file byte-for-byte (header order, quoting style,
+  line terminator, BOM, trailing newline and ragged rows are recorded at import)
+- Freshness: the mirror remembers the CSV's size/mtime and re-imports when the CSV changes;
+  pending CRM journal deltas are applied on top at query time
+- Incremental upkeep: a compaction in this process (CRMStore.flush) hands the mirror the journal
+  entries it folded into the CSV, so the mirror applies those instead of re-importing the file;
+  only a change from elsewhere (sheet import, another process's compaction) costs a full import
+- MirrorBackedStore: the runners' write path when the mirror serves reads; updates are journaled
+  and applied to the mirror, so the CSV is never loaded whole, and compaction runs only once the
+  journal reaches a size threshold
+
+The CSV stays canonical; the mirror is a read accelerator. Enable it for the runners with:
+
+    export CRM_SQLITE_PATH=/path/to/crm_mirror.sqlite3
+
+Commands:
+
+    python3 -m workflows.universal_outreach_utils.crm_sqlite import CRM_leads_copy.csv crm.sqlite3
+    python3 -m workflows.universal_outreach_utils.crm_sqlite export crm.sqlite3 out.csv
+    python3 -m workflows.universal_outreach_utils.crm_sqlite untouched crm.sqlite3 --client "Acme"
+
+Path suggestion: workflows/universal_outreach_utils/crm_sqlite.py
+"""
+from __future__ import annotations
+
+import argparse
+import csv
+import io
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+from workflows.universal_outreach_utils.crm_journal import CRMJournal, journal_path_for
+from workflows.universal_outreach_utils.crm_schema import FIELDNAMES
+from workflows.universal_outreach_utils.crm_store import (
+    KEY_COLUMN,
+    add_compaction_listener,
+    normalize_email,
+    open_store,
+)
+
+PathLike = Union[str, Path]
+
+ENV_SQLITE_PATH = "CRM_SQLITE_PATH"
+
+UNTOUCHED_STATUSES = ("", "untouched", "new")
+
+# Indexed CRM columns -> normalized shadow column
+_SHADOW_COLS = {
+    "Email": "_email_norm",
+    "Client Name": "_client_norm",
+    "Messaging Status": "_status_norm",
+    "Sequence Stage": "_stage_norm",
+}
+
+# Candidate CSV formats tried (in order) when proving a byte-for-byte round trip
+_FORMATS: List[Tuple[int, str]] = [
+    (csv.QUOTE_ALL, "\r\n"),
+    (csv.QUOTE_ALL, "\n"),
+    (csv.QUOTE_MINIMAL, "\r\n"),
+    (csv.QUOTE_MINIMAL, "\n"),
+]
+
+
+def _norm(s: Optional[str]) -> str:
+    return " ".join((s or "").split()).lower()
+
+
+def _q(name: str) -> str:
+    """Quote a CSV header as an SQLite identifier."""
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _serialize(header: List[str], records: List[List[str]], quoting: int, lineterminator: str) -> str:
+    buf = io.StringIO()
+    w = csv.writer(buf, quoting=quoting, lineterminator=lineterminator)
+    w.writerow(header)
+    w.writerows(records)
+    return buf.getvalue()
+
+
+class CRMSqliteMirror:
+    """SQLite copy of the CRM CSV with normalized indexes and a lossless CSV round trip."""
+
+    def __init__(self, db_path: PathLike):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+
+    # -----------------------------
+    # Meta
+    # -----------------------------
+    def _meta(self, key: str, default=None):
+        row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def _set_meta(self, key: str, value) -> None:
+        self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, json.dumps(value)))
+
+    @property
+    def header(self) -> List[str]:
+        return list(self._meta("header", []))
+
+    def _columns(self) -> List[str]:
+        return [r[1] for r in self._conn.execute("PRAGMA table_info(leads)")]
+
+    # -----------------------------
+    # Import / export
+    # -----------------------------
+    def import_csv(self, csv_path: PathLike) -> Dict[str, object]:
+        """Replace the mirror with `csv_path`. Returns {"rows": n, "exact": bool} where `exact` means
+        export_csv() will reproduce the file byte-for-byte."""
+        csv_path = Path(csv_path)
+        raw = csv_path.read_bytes()
+        bom = raw.startswith(b"\xef\xbb\xbf")
+        text = raw.decode("utf-8-sig" if bom else "utf-8")
+        parsed = list(csv.reader(io.StringIO(text, newline="")))
+        header, records = (parsed[0], parsed[1:]) if parsed else ([], [])
+
+        # Fields beyond the header cannot be stored; serializing the clipped records makes such
+        # files fail the exactness check instead of silently losing data
+        clipped = [rec[: len(header)] for rec in records]
+        fmt = None
+        for quoting, term in _FORMATS:
+            out = _serialize(header, clipped, quoting, term)
+            if out == text or (not text.endswith(("\n", "\r")) and out[: -len(term)] == text):
+                fmt = (quoting, term, text.endswith(("\n", "\r")))
+                break
+        exact = fmt is not None
+        if fmt is None:
+            fmt = (csv.QUOTE_ALL, "\r\n", True)
+
+        columns = list(dict.fromkeys(list(header) + FIELDNAMES()))
+        with self._lock, self._conn:
+            self._conn.execute("DROP TABLE IF EXISTS leads")
+            col_sql = ", ".join(f"{_q(c)} TEXT" for c in columns)
+            shadow_sql = ", ".join(f"{s} TEXT" for s in _SHADOW_COLS.values())
+            self._conn.execute(f"CREATE TABLE leads (_row INTEGER PRIMARY KEY, _width INTEGER, {col_sql}, {shadow_sql})")
+            for col, shadow in _SHADOW_COLS.items():
+                self._conn.execute(f"CREATE INDEX idx_leads{shadow} ON leads ({shadow})")
+            pos = {c: i for i, c in enumerate(header)}
+            insert_cols = ["_row", "_width"] + columns + list(_SHADOW_COLS.values())
+            placeholders = ", ".join("?" for _ in insert_cols)
+            sql = f"INSERT INTO leads ({', '.join(_q(c) for c in insert_cols)}) VALUES ({placeholders})"
+
+            def _values():
+                for n, rec in enumerate(records):
+                    vals = [rec[pos[c]] if c in pos and pos[c] < len(rec) else None for c in columns]
+                    by_name = dict(zip(columns, vals))
+                    yield [n, min(len(rec), len(header))] + vals + [_norm(by_name.get(c)) for c in _SHADOW_COLS]
+
+            self._conn.executemany(sql, _values())
+            self._set_meta("header", header)
+            self._set_meta("added_columns", [])
+            self._set_meta("format", {"quoting": fmt[0], "lineterminator": fmt[1], "trailing_newline": fmt[2], "bom": bom})
+            st = csv_path.stat()
+            self._set_meta("source", {"path": str(csv_path.resolve()), "size": st.st_size, "mtime_ns": st.st_mtime_ns})
+        return {"rows": len(records), "exact": exact}
+
+    def export_csv(self, dest: PathLike) -> Path:
+        """Write the mirror back out as CSV using the format recorded at import."""
+        dest = Path(dest)
+        header = self.header
+        fmt = self._meta("format", {}) or {}
+        quoting = int(fmt.get("quoting", csv.QUOTE_ALL))
+        term = fmt.get("lineterminator", "\r\n")
+        added = list(self._meta("added_columns", []) or [])
+        cols = header + added
+        records = []
+        with self._lock:
+            sel = ", ".join(["_width"] + [_q(c) for c in cols])
+            for r in self._conn.execute(f"SELECT {sel} FROM leads ORDER BY _row"):
+                vals = list(r)[1:]
+                if not added:
+                    vals = vals[: r[0]]  # ragged rows keep their original width
+                records.append(["" if v is None else v for v in vals])
+        text = _serialize(cols, records, quoting, term)
+        if not fmt.get("trailing_newline", True) and text.endswith(term):
+            text = text[: -len(term)]
+        data = text.encode("utf-8")
+        if fmt.get("bom"):
+            data = b"\xef\xbb\xbf" + data
+        tmp = dest.with_name(f".{dest.name}.tmp")
+        tmp.write_bytes(data)
+        os.replace(tmp, dest)
+        return dest
+
+    # -----------------------------
+    # Freshness
+    # -----------------------------
+    def ensure_fresh(self, csv_path: PathLike) -> bool:
+        """Re-import if the CSV changed since the last import, then apply pending journal deltas.
+        Returns True if a re-import happened."""
+        csv_path = Path(csv_path)
+        src = self._meta("source", {}) or {}
+        st = csv_path.stat()
+        reimported = False
+        if (
+            src.get("path") != str(csv_path.resolve())
+            or src.get("size") != st.st_size
+            or src.get("mtime_ns") != st.st_mtime_ns
+            or "leads" not in {r[0] for r in self._conn.execute("SELECT name FROM sqlite_master WHERE type='table'")}
+        ):
+            self.import_csv(csv_path)
+            reimported = True
+        for email, fields in CRMJournal(journal_path_for(csv_path)).overlay().items():
+            self.update(email, fields)
+        return reimported
+
+    def apply_compaction(
+        self,
+        csv_path: PathLike,
+        fieldnames: List[str],
+        entries: Iterable[Dict[str, str]],
+        before: Optional[Tuple[int, int]],
+    ) -> bool:
+        """A compaction rewrote `csv_path` as (the CSV it replaced + `entries`), in CRMStore's format:
+        apply the entries and adopt the new file instead of re-importing it. Returns False (the next
+        ensure_fresh re-imports) if the replaced CSV was not the one this mirror last imported."""
+        csv_path = Path(csv_path)
+        src = self._meta("source", {}) or {}
+        if before is None or src.get("path") != str(csv_path.resolve()) or (src.get("size"), src.get("mtime_ns")) != tuple(before):
+            return False
+        merged: Dict[str, Dict[str, str]] = {}
+        for e in entries:
+            merged.setdefault(_norm(e.get("email")), {})[e["column"]] = "" if e.get("value") is None else str(e["value"])
+        for email, fields in merged.items():
+            self.update(email, fields)
+        st = csv_path.stat()
+        with self._lock, self._conn:
+            existing = set(self._columns())
+            for col in fieldnames:
+                if col not in existing:
+                    self._conn.execute(f"ALTER TABLE leads ADD COLUMN {_q(col)} TEXT")
+            self._conn.execute("UPDATE leads SET _width = ?", (len(fieldnames),))
+            self._set_meta("header", list(fieldnames))
+            self._set_meta("added_columns", [c for c in self._meta("added_columns", []) or [] if c not in fieldnames])
+            # CRMStore writes QUOTE_ALL, csv's default "\r\n", no BOM, trailing newline
+            self._set_meta("format", {"quoting": csv.QUOTE_ALL, "lineterminator": "\r\n", "trailing_newline": True, "bom": False})
+            self._set_meta("source", {"path": str(csv_path.resolve()), "size": st.st_size, "mtime_ns": st.st_mtime_ns})
+        return True
+
+    # -----------------------------
+    # Queries
+    # -----------------------------
+    def _rows(self, where: str, params: Iterable, limit: Optional[int] = None) -> List[Dict[str, str]]:
+        cols = [c for c in self._columns() if not c.startswith("_")]
+        sel = ", ".join(_q(c) for c in cols)
+        sql = f"SELECT {sel} FROM leads WHERE {where} ORDER BY _row"
+        params = list(params)
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(int(limit))
+        with self._lock:
+            cur = self._conn.execute(sql, params)
+            return [{c: ("" if v is None else v) for c, v in zip(cols, r)} for r in cur]
+
+    def clients(self) -> Dict[str, str]:
+        """{normalized client name: display name as stored} for every client present."""
+        with self._lock:
+            cur = self._conn.execute(
+                f"SELECT _client_norm, MIN({_q('Client Name')}) FROM leads WHERE _client_norm != '' GROUP BY _client_norm"
+            )
+            return {norm: (disp or "").strip() for norm, disp in cur}
+
+    def leads_for_client(self, client: str, limit: Optional[int] = None) -> List[Dict[str, str]]:
+        return self._rows("_client_norm = ?", [_norm(client)], limit)
+
+    def untouched_leads(self, client: str, limit: Optional[int] = None) -> List[Dict[str, str]]:
+        """Leads for `client` whose Messaging Status is blank/untouched/new (both lookups indexed)."""
+        marks = ", ".join("?" for _ in UNTOUCHED_STATUSES)
+        return self._rows(f"_client_norm = ? AND _status_norm IN ({marks})", [_norm(client), *UNTOUCHED_STATUSES], limit)
+
+    def get(self, email: str) -> Optional[Dict[str, str]]:
+        rows = self._rows("_email_norm = ?", [_norm(email)], 1)
+        return rows[0] if rows else None
+
+    # -----------------------------
+    # Writes
+    # -----------------------------
+    def update(self, email: str, fields: Dict[str, str]) -> int:
+        """Set fields on every row for `email`, adding columns as needed. Returns rows updated."""
+        if not fields:
+            return 0
+        with self._lock, self._conn:
+            existing = set(self._columns())
+            header = self.header
+            added = list(self._meta("added_columns", []) or [])
+            for col in fields:
+                if col not in existing:
+                    self._conn.execute(f"ALTER TABLE leads ADD COLUMN {_q(col)} TEXT")
+                if col not in header and col not in added:
+                    added.append(col)
+            self._set_meta("added_columns", added)
+            assigns = [f"{_q(c)} = ?" for c in fields]
+            params = ["" if v is None else str(v) for v in fields.values()]
+            for col, shadow in _SHADOW_COLS.items():
+                if col in fields:
+                    assigns.append(f"{shadow} = ?")
+                    params.append(_norm(fields[col]))
+            params.append(_norm(email))
+            cur = self._conn.execute(f"UPDATE leads SET {', '.join(assigns)} WHERE _email_norm = ?", params)
+            return cur.rowcount
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class MirrorBackedStore:
+    """CRMStore stand-in for runs whose reads the mirror serves: the same write surface
+    (update / update_many / reconcile / ensure_columns / flush) without loading the CSV.
+
+    - Updates are diffed against the mirror's rows, journaled (group commit), then applied to the mirror
+    - `flush()` compacts the journal into the CSV (a full CRMStore load) only once it holds at least
+      `compact_min_entries` entries; until then every reader replays it, as between compactions
+    """
+
+    def __init__(self, mirror: CRMSqliteMirror, csv_path: PathLike, *, compact_min_entries: int = 500):
+        self.mirror = mirror
+        self.csv_path = Path(csv_path)
+        self.key_col = KEY_COLUMN
+        self.journal = CRMJournal(journal_path_for(self.csv_path))
+        self.compact_min_entries = max(0, int(compact_min_entries))
+        self._lock = threading.RLock()
+
+    @property
+    def fieldnames(self) -> List[str]:
+        return self.mirror.header + list(self.mirror._meta("added_columns", []) or [])
+
+    def get(self, email: Optional[str]) -> Optional[Dict[str, str]]:
+        return self.mirror.get(normalize_email(email))
+
+    def ensure_columns(self, columns: Iterable[str]) -> None:
+        """No-op: columns are added (to the mirror and, at compaction, the CSV) by the first value set."""
+
+    def update(self, email: Optional[str], fields: Dict[str, str]) -> int:
+        return self.update_many([(email, fields)])[0]
+
+    def update_many(self, updates: Iterable[Tuple[Optional[str], Dict[str, str]]]) -> List[int]:
+        """Journal the changed fields of several updates with one append, then apply them to the mirror."""
+        with self._lock:
+            diffs: List[Tuple[Optional[str], Dict[str, str]]] = []
+            deltas = []
+            for email, fields in updates:
+                row = self.get(email)
+                diff = {}
+                if row is not None:
+                    for col, val in fields.items():
+                        val = "" if val is None else str(val)
+                        if (row.get(col) or "") != val:
+                            diff[col] = val
+                            deltas.append((email, col, val))
+                diffs.append((email, diff))
+            self.journal.append_many(deltas)
+            return [self.mirror.update(normalize_email(email), diff) if diff else 0 for email, diff in diffs]
+
+    def reconcile(
+        self,
+        leads: Iterable[Dict[str, str]],
+        columns: Iterable[str],
+        *,
+        row_filter: Optional[Callable[[Dict[str, str]], bool]] = None,
+    ) -> Dict[str, float]:
+        """CRMStore.reconcile against the mirror's rows (indexed email lookups)."""
+        t0 = time.perf_counter()
+        cols = list(columns)
+        checked = 0
+        updates = []
+        with self._lock:
+            for lead in leads:
+                row = self.get(lead.get(self.key_col))
+                if row is None or (row_filter is not None and not row_filter(row)):
+                    continue
+                checked += 1
+                updates.append((lead.get(self.key_col), {c: lead[c] for c in cols if c in lead}))
+            changed = sum(self.update_many(updates))
+        return {"checked": checked, "changed": changed, "elapsed_ms": (time.perf_counter() - t0) * 1000.0}
+
+    def flush(self) -> bool:
+        """Compact once the journal holds `compact_min_entries` entries. Returns True if the CSV was written."""
+        with self._lock:
+            if len(self.journal) < max(1, self.compact_min_entries):
+                return False
+            return open_store(self.csv_path).flush()  # the mirror applies the folded entries (listener)
+
+
+_MIRRORS: Dict[Tuple[Path, Path], CRMSqliteMirror] = {}
+_MIRRORS_LOCK = threading.Lock()
+
+
+def open_mirror(csv_path: PathLike, db_path: Optional[PathLike] = None) -> Optional[CRMSqliteMirror]:
+    """Open (and freshen) the mirror for `csv_path` if CRM_SQLITE_PATH (or `db_path`) is set, else None.
+    One mirror per (CSV, database) per process, kept current by this process's compactions."""
+    db = db_path or os.environ.get(ENV_SQLITE_PATH)
+    if not db:
+        return None
+    key = (Path(csv_path).resolve(), Path(db).resolve())
+    with _MIRRORS_LOCK:
+        mirror = _MIRRORS.get(key)
+        if mirror is None:
+            mirror = CRMSqliteMirror(db)
+            _MIRRORS[key] = mirror
+            add_compaction_listener(
+                csv_path,
+                lambda store, entries, before: mirror.apply_compaction(store.csv_path, store.fieldnames, entries, before),
+            )
+    mirror.ensure_fresh(csv_path)
+    return mirror
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="SQLite mirror of the CRM CSV (import/export/query).")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    p_imp = sub.add_parser("import", help="Import a CRM CSV into the mirror")
+    p_imp.add_argument("csv_path")
+    p_imp.add_argument("db_path")
+    p_exp = sub.add_parser("export", help="Export the mirror back to CSV")
+    p_exp.add_argument("db_path")
+    p_exp.add_argument("csv_path")
+    p_q = sub.add_parser("untouched", help="List untouched leads for a client")
+    p_q.add_argument("db_path")
+    p_q.add_argument("--client", required=True)
+    p_q.add_argument("--limit", type=int, default=None)
+    args = ap.parse_args()
+
+    if args.cmd == "import":
+        res = CRMSqliteMirror(args.db_path).import_csv(args.csv_path)
+        print(f"Imported {res['rows']} rows into {args.db_path} (byte-for-byte round trip: {'yes' if res['exact'] else 'NO'})")
+        return 0 if res["exact"] else 1
+    if args.cmd == "export":
+        CRMSqliteMirror(args.db_path).export_csv(args.csv_path)
+        print(f"Exported {args.db_path} -> {args.csv_path}")
+        return 0
+    rows = CRMSqliteMirror(args.db_path).untouched_leads(args.client, args.limit)
+    for r in rows:
+        print(r.get("Email", ""))
+    print(f"{len(rows)} untouched lead(s) for client '{args.client}'")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
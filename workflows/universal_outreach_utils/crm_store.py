@@ -0,0 +1,451 @@
+"""
+Indexed, row-level CRM store for the Outreach system.
+
+Centralizes:
+- Loading the CRM CSV once and indexing rows by normalized Email
+- Compact rows (crm_schema.CRMRow: one value list per row over a shared column layout)
+- Single-row updates applied in memory (no full-file rewrite per lead)
+- Write-ahead journaling of every update (see crm_journal.py) so a crash never loses or truncates data
+- Atomic flush/compaction back to CSV (temp file + os.replace), preserving header order and QUOTE_ALL,
+  under an inter-process lock that re-reads base CSV + journal first (safe with several writer processes)
+- CSV import/export so the Google Sheet workflow keeps working unchanged
+
+Typical use (opener runner / follow-up crm.update_fields):
+
+    store = open_store(CRM_CSV)
+    store.update("lead@example.com", {"Owner / Assigned To": "sales@ourdomain.com"})
+    ...
+    store.flush()   # once per batch/run (compacts the journal), not once per send
+
+Path suggestion: workflows/universal_outreach_utils/crm_store.py
+"""
+from __future__ import annotations
+
+import csv
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple, Union
+
+from workflows.universal_outreach_utils.crm_journal import CRMJournal, journal_path_for
+from workflows.universal_outreach_utils.crm_schema import CRMRow, compile_layout
+
+PathLike = Union[str, Path]
+
+KEY_COLUMN = "Email"
+
+
+def normalize_email(value: Optional[str]) -> str:
+    """Lowercase + trim an email so index lookups are robust to sheet formatting."""
+    return (value or "").strip().lower()
+
+
+class CRMStore:
+    """In-memory CRM table with an email→row index and dirty-row tracking.
+
+    - `update()` appends the changed fields to the journal (O(1)), then touches only the matching
+      row(s) in memory; it never rewrites the file.
+    - Loading replays the journal over the base CSV, so readers always see base + journal merged.
+    - `flush()` compacts under an inter-process lock: re-reads base CSV + journal, writes the CSV once,
+      atomically, then drops the folded journal.
+    - Duplicate emails are kept (each row is updated), mirroring the previous CSV behaviour.
+    """
+
+    def __init__(self, csv_path: PathLike, *, key_col: str = KEY_COLUMN, journal: bool = True):
+        self.csv_path = Path(csv_path)
+        self.key_col = key_col
+        self.journal: Optional[CRMJournal] = CRMJournal(journal_path_for(self.csv_path)) if journal else None
+        self.fieldnames: List[str] = []
+        self.rows: List[CRMRow] = []
+        self._index: Dict[str, List[int]] = {}
+        self._dirty: Set[int] = set()
+        self._header_dirty = False
+        self._lock = threading.RLock()
+        self.load()
+
+    # -----------------------------
+    # Loading / indexing
+    # -----------------------------
+    def load(self) -> None:
+        """(Re)read the CSV from disk, rebuild the index and replay any pending journal entries."""
+        with self._lock:
+            if self.journal is None:
+                self._load()
+                return
+            # Shared lock: never read the CSV of one compaction with the journal of the next
+            with self.journal.file_lock(shared=True):
+                self._load()
+
+    def _load(self, entries: Optional[Iterable[Dict[str, str]]] = None) -> None:
+        fieldnames, rows = _read_csv(self.csv_path)
+        self.fieldnames = fieldnames
+        self.rows = rows
+        self._rebuild_index()
+        self._dirty.clear()
+        self._header_dirty = False
+        if self.journal is not None:
+            self._apply_entries(self.journal.replay() if entries is None else entries)
+
+    def _apply_entries(self, entries: Iterable[Dict[str, str]]) -> int:
+        """Apply journal entries in memory (no re-journaling). Returns rows touched."""
+        touched = 0
+        for e in entries:
+            touched += self._apply(e.get("email"), {e["column"]: e.get("value")})
+        return touched
+
+    def _rebuild_index(self) -> None:
+        self._index = {}
+        for i, row in enumerate(self.rows):
+            self._index.setdefault(normalize_email(row.get(self.key_col)), []).append(i)
+
+    # -----------------------------
+    # Reads
+    # -----------------------------
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def __contains__(self, email: object) -> bool:
+        return normalize_email(str(email or "")) in self._index
+
+    def find(self, email: Optional[str]) -> List[CRMRow]:
+        """All rows for an email (usually one)."""
+        return [self.rows[i] for i in self._index.get(normalize_email(email), [])]
+
+    def get(self, email: Optional[str]) -> Optional[CRMRow]:
+        """First row for an email, or None."""
+        idxs = self._index.get(normalize_email(email))
+        return self.rows[idxs[0]] if idxs else None
+
+    def iter_rows(self, predicate: Optional[Callable[[CRMRow], bool]] = None) -> Iterator[CRMRow]:
+        for row in self.rows:
+            if predicate is None or predicate(row):
+                yield row
+
+    def snapshot(self) -> List[Dict[str, str]]:
+        """Detached copies of all rows, safe for callers that mutate leads in memory."""
+        return [r.to_dict() for r in self.rows]
+
+    # -----------------------------
+    # Writes
+    # -----------------------------
+    def ensure_columns(self, columns: Iterable[str]) -> None:
+        """Append any missing columns to the header (existing order is preserved)."""
+        with self._lock:
+            for col in columns:
+                if col not in self.fieldnames:
+                    self.fieldnames.append(col)
+                    self._header_dirty = True
+
+    def update(self, email: Optional[str], fields: Dict[str, str]) -> int:
+        """Apply `fields` to every row for `email`. Returns the number of rows that changed.
+        Changed fields are journaled before they are applied; unknown columns are added to the header."""
+        return self.update_many([(email, fields)])[0]
+
+    def update_many(self, updates: Iterable[Tuple[Optional[str], Dict[str, str]]]) -> List[int]:
+        """Group commit: journal the deltas of several updates with one append (+fsync), then apply
+        them in order. Returns rows changed per update."""
+        with self._lock:
+            updates = list(updates)
+            if self.journal is not None:
+                deltas = []
+                pending: Dict[Tuple[str, str], str] = {}
+                for email, fields in updates:
+                    key = normalize_email(email)
+                    idxs = self._index.get(key)
+                    if not idxs:
+                        continue
+                    for col, val in fields.items():
+                        val = "" if val is None else str(val)
+                        if (key, col) in pending:
+                            differs = pending[(key, col)] != val
+                        else:
+                            differs = any(self.rows[i].get(col) != val for i in idxs)
+                        if differs:
+                            deltas.append((email, col, val))
+                            pending[(key, col)] = val
+                self.journal.append_many(deltas)
+            return [self._apply(email, fields) for email, fields in updates]
+
+    def _apply(self, email: Optional[str], fields: Dict[str, str]) -> int:
+        with self._lock:
+            idxs = self._index.get(normalize_email(email))
+            if not idxs:
+                return 0
+            self.ensure_columns(fields.keys())
+            changed = 0
+            for i in idxs:
+                row = self.rows[i]
+                row_changed = False
+                for col, val in fields.items():
+                    val = "" if val is None else str(val)
+                    if row.get(col) != val:
+                        row[col] = val
+                        row_changed = True
+                if row_changed:
+                    self._dirty.add(i)
+                    changed += 1
+            return changed
+
+    def reconcile(
+        self,
+        leads: Iterable[Dict[str, str]],
+        columns: Iterable[str],
+        *,
+        row_filter: Optional[Callable[[Dict[str, str]], bool]] = None,
+    ) -> Dict[str, float]:
+        """Diff mutated in-memory leads against their stored rows and persist only what changed.
+
+        Each lead is found through the email index (no table scan); only columns present on the
+        lead and different from the stored row are written. Returns
+        {"checked": n, "changed": rows_changed, "elapsed_ms": ms}."""
+        t0 = time.perf_counter()
+        cols = list(columns)
+        checked = changed = 0
+        with self._lock:
+            for lead in leads:
+                email = lead.get(self.key_col)
+                row = self.get(email)
+                if row is None or (row_filter is not None and not row_filter(row)):
+                    continue
+                checked += 1
+                diff = {}
+                for col in cols:
+                    if col not in lead:
+                        continue
+                    val = "" if lead[col] is None else str(lead[col])
+                    if (row.get(col) or "") != val:
+                        diff[col] = val
+                if diff:
+                    changed += self.update(email, diff)
+        return {"checked": checked, "changed": changed, "elapsed_ms": (time.perf_counter() - t0) * 1000.0}
+
+    @property
+    def dirty_count(self) -> int:
+        return len(self._dirty)
+
+    def is_dirty(self) -> bool:
+        return bool(self._dirty) or self._header_dirty
+
+    def flush(self) -> bool:
+        """Compact: write the CSV back to `csv_path` and drop the folded journal. Returns True if written.
+
+        Runs under the journal's inter-process lock: the journal is rotated, then the base CSV and
+        the journal are re-read from disk, so deltas written (or already compacted) by other
+        processes since we loaded are folded in rather than overwritten. Our own updates are all
+        journaled, so nothing is lost by the re-read; new appends go to a fresh journal.
+        Compaction listeners (add_compaction_listener) are told what was folded in."""
+        with self._lock:
+            if self.journal is None:
+                if not self.is_dirty():
+                    return False
+                self.export_csv(self.csv_path)
+                self._dirty.clear()
+                self._header_dirty = False
+                return True
+            with self.journal.file_lock():
+                rotated = self.journal.rotate()
+                if rotated is None and not self.is_dirty():
+                    return False
+                # Columns added in memory only (ensure_columns without a value) survive the re-read
+                on_disk = set(_read_header(self.csv_path))
+                added = [col for col in self.fieldnames if col not in on_disk]
+                entries = list(self.journal.replay())
+                self._load(entries)
+                self.ensure_columns(added)
+                if rotated is None and not self._header_dirty:
+                    return False
+                before = file_stamp(self.csv_path)
+                self.export_csv(self.csv_path)
+                if rotated is not None:
+                    self.journal.finish_compaction()
+                _notify_compacted(self, entries, before)
+                self._dirty.clear()
+                self._header_dirty = False
+                return True
+
+    # -----------------------------
+    # CSV import / export
+    # -----------------------------
+    def export_csv(self, dest: PathLike) -> Path:
+        """Atomically write the current table to `dest` (QUOTE_ALL, header order preserved)."""
+        with self._lock:
+            return _write_csv_atomic(Path(dest), self.fieldnames, self.rows)
+
+    @classmethod
+    def import_csv(cls, src: PathLike, dest: PathLike, *, key_col: str = KEY_COLUMN) -> "CRMStore":
+        """Copy an external CSV (e.g. a sheet export) into `dest` and open a store on it."""
+        fieldnames, rows = _read_csv(Path(src))
+        _write_csv_atomic(Path(dest), fieldnames, rows)
+        return cls(dest, key_col=key_col)
+
+
+# =============================
+# Compaction listeners
+# =============================
+# (store, folded journal entries, CSV stamp before the rewrite) -> None; called under the store's
+# locks right after a compaction rewrote the CSV (e.g. the SQLite mirror applies the entries)
+CompactionListener = Callable[["CRMStore", List[Dict[str, str]], Optional[Tuple[int, int]]], None]
+_LISTENERS: Dict[Path, List[CompactionListener]] = {}
+_LISTENERS_LOCK = threading.Lock()
+
+
+def file_stamp(path: PathLike) -> Optional[Tuple[int, int]]:
+    """(size, mtime_ns) of a file, or None if it does not exist."""
+    try:
+        st = Path(path).stat()
+    except FileNotFoundError:
+        return None
+    return st.st_size, st.st_mtime_ns
+
+
+def add_compaction_listener(csv_path: PathLike, listener: CompactionListener) -> None:
+    """Call `listener` after every compaction of `csv_path` in this process."""
+    with _LISTENERS_LOCK:
+        _LISTENERS.setdefault(Path(csv_path).resolve(), []).append(listener)
+
+
+def _notify_compacted(store: "CRMStore", entries: List[Dict[str, str]], before: Optional[Tuple[int, int]]) -> None:
+    with _LISTENERS_LOCK:
+        listeners = list(_LISTENERS.get(store.csv_path.resolve(), ()))
+    for listener in listeners:
+        try:
+            listener(store, entries, before)
+        except Exception as e:
+            print(f"⚠️ CRM compaction listener failed for {store.csv_path}: {e}")
+
+
+# =============================
+# Process-wide store cache
+# =============================
+_STORES: Dict[Path, CRMStore] = {}
+_STORES_LOCK = threading.Lock()
+
+
+def open_store(csv_path: PathLike) -> CRMStore:
+    """Return the shared store for `csv_path`, loading it on first use."""
+    key = Path(csv_path).resolve()
+    with _STORES_LOCK:
+        store = _STORES.get(key)
+        if store is None:
+            store = CRMStore(key)
+            _STORES[key] = store
+        return store
+
+
+def update_fields(csv_path: PathLike, lead_id: str, fields: Dict[str, str], *, flush: bool = False) -> int:
+    """Drop-in backend for `crm.update_fields(lead_id, fields)`: row-level update, optional flush."""
+    store = open_store(csv_path)
+    changed = store.update(lead_id, fields)
+    if flush:
+        store.flush()
+    return changed
+
+
+def flush_all() -> int:
+    """Flush every open store (call at the end of a run). Returns how many files were written."""
+    with _STORES_LOCK:
+        stores = list(_STORES.values())
+    return sum(1 for s in stores if s.flush())
+
+
+def load_rows(csv_path: PathLike) -> List[CRMRow]:
+    """Read-only path: base CSV rows with pending journal deltas merged in (no index, no cache)."""
+    _, rows = _read_csv(Path(csv_path))
+    overlay = CRMJournal(journal_path_for(csv_path)).overlay()
+    if overlay:
+        for row in rows:
+            delta = overlay.get(normalize_email(row.get(KEY_COLUMN)))
+            if delta:
+                row.update(delta)
+    return rows
+
+
+def stream_rows(
+    csv_path: PathLike,
+    *,
+    match: Optional[Dict[str, Callable[[str], bool]]] = None,
+    columns: Optional[Iterable[str]] = None,
+) -> Iterator[Dict[str, str]]:
+    """Lazily yield CRM rows (base CSV + pending journal deltas) one at a time.
+
+    - `match` is pushed down: {column: predicate(raw value)} is evaluated on the raw CSV record,
+      before any row dict is built; rows failing any predicate cost one csv.reader step.
+    - `columns` projects each yielded dict to those columns (missing ones come back as "").
+    - Nothing is materialised, so callers that stop early never read the rest of the file.
+    """
+    overlay = CRMJournal(journal_path_for(csv_path)).overlay()
+    with open(csv_path, "r", newline="", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if header is None:
+            return
+        pos = {name: i for i, name in enumerate(header)}
+        key_pos = pos.get(KEY_COLUMN)
+        tests = [(col, pos.get(col), pred) for col, pred in (match or {}).items()]
+        proj = [(col, pos.get(col)) for col in (columns if columns is not None else header)]
+        for rec in reader:
+            width = len(rec)
+            delta = overlay.get(normalize_email(rec[key_pos])) if overlay and key_pos is not None and key_pos < width else None
+            ok = True
+            for col, i, pred in tests:
+                if delta is not None and col in delta:
+                    val = delta[col]
+                else:
+                    val = rec[i] if i is not None and i < width else ""
+                if not pred(val):
+                    ok = False
+                    break
+            if not ok:
+                continue
+            row = {col: (rec[i] if i is not None and i < width else "") for col, i in proj}
+            if delta is not None:
+                row.update((k, v) for k, v in delta.items() if columns is None or k in row)
+            yield row
+
+
+# =============================
+# CSV helpers
+# =============================
+
+def _read_header(path: Path) -> List[str]:
+    with open(path, "r", newline="", encoding="utf-8") as f:
+        return next(csv.reader(f), None) or []
+
+
+def _read_csv(path: Path) -> Tuple[List[str], List[CRMRow]]:
+    """Header + compact rows. Short records are padded with "" and extra trailing fields dropped,
+    which is what the DictReader → DictWriter(extrasaction="ignore") round trip used to write."""
+    with open(path, "r", newline="", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        fieldnames = next(reader, None) or []
+        layout = compile_layout(fieldnames)
+        rows = [CRMRow(layout, rec) for rec in reader if rec]
+    return list(fieldnames), rows
+
+
+def _write_csv_atomic(path: Path, fieldnames: List[str], rows: Iterable[Dict[str, str]]) -> Path:
+    """Write to a temp file in the same directory, fsync, then os.replace (never truncates on crash)."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    header = tuple(fieldnames)
+    fd, tmp = tempfile.mkstemp(prefix=f".{path.name}.", suffix=".tmp", dir=str(path.parent))
+    try:
+        with os.fdopen(fd, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f, quoting=csv.QUOTE_ALL)
+            writer.writerow(header)
+            for row in rows:
+                if isinstance(row, CRMRow):
+                    writer.writerow(row.values_for(header))
+                else:
+                    writer.writerow([row.get(k, "") for k in header])
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+    return path
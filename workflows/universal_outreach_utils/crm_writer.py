@@ -0,0 +1,145 @@
+"""
+Single-writer actor for the CRM.
+
+The parallel dispatcher runs one worker per inbox; if each worker wrote the CRM itself they would
+race and lose updates. Instead, one CRMWriter thread owns the CRMStore:
+
+- Workers `submit()` update messages (lead email + fields) onto a queue and get a ticket back
+- The writer drains the queue in batches and group-commits each batch (one journal append + fsync)
+- Each ticket is acknowledged once its batch is durable; `update()` is submit + wait for the ack
+
+    with CRMWriter(open_store(CRM_CSV)) as writer:
+        writer.update(lead_email, {"Owner / Assigned To": inbox})   # from any worker thread
+
+Path suggestion: workflows/universal_outreach_utils/crm_writer.py
+"""
+from __future__ import annotations
+
+import queue
+import threading
+from typing import Dict, List, Optional
+
+from workflows.universal_outreach_utils.crm_store import CRMStore
+
+_STOP = object()
+
+
+class WriteTicket:
+    """Acknowledgement handle for one submitted update."""
+
+    __slots__ = ("email", "fields", "_done", "changed", "error")
+
+    def __init__(self, email: Optional[str], fields: Dict[str, str]):
+        self.email = email
+        self.fields = fields
+        self._done = threading.Event()
+        self.changed = 0
+        self.error: Optional[BaseException] = None
+
+    def _resolve(self, changed: int = 0, error: Optional[BaseException] = None) -> None:
+        self.changed = changed
+        self.error = error
+        self._done.set()
+
+    def done(self) -> bool:
+        return self._done.is_set()
+
+    def wait(self, timeout: Optional[float] = None) -> int:
+        """Block until the update is committed. Returns rows changed; re-raises a commit error."""
+        if not self._done.wait(timeout):
+            raise TimeoutError(f"CRM write for {self.email} not acknowledged within {timeout}s")
+        if self.error is not None:
+            raise self.error
+        return self.changed
+
+
+class CRMWriter:
+    """Dedicated thread that owns a CRMStore and group-commits queued updates."""
+
+    def __init__(self, store: CRMStore, *, batch_size: int = 64, linger_seconds: float = 0.02):
+        self.store = store
+        self.batch_size = max(1, int(batch_size))
+        self.linger_seconds = max(0.0, float(linger_seconds))
+        self._queue: "queue.Queue[object]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self.batches = 0
+        self.updates = 0
+        self.max_batch = 0
+
+    # -----------------------------
+    # Lifecycle
+    # -----------------------------
+    def start(self) -> "CRMWriter":
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="crm-writer", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Drain everything already submitted, then stop the writer thread."""
+        if self._thread is None:
+            return
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+        self._thread = None
+
+    def __enter__(self) -> "CRMWriter":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    # -----------------------------
+    # Worker-facing API
+    # -----------------------------
+    def submit(self, email: Optional[str], fields: Dict[str, str]) -> WriteTicket:
+        """Queue an update without waiting for it to be written."""
+        ticket = WriteTicket(email, dict(fields))
+        if self._thread is None:
+            # Not started (e.g. interactive single-threaded mode): commit inline
+            self._commit([ticket])
+        else:
+            self._queue.put(ticket)
+        return ticket
+
+    def update(self, email: Optional[str], fields: Dict[str, str], *, timeout: Optional[float] = None) -> int:
+        """Submit and wait for the group commit that includes this update."""
+        return self.submit(email, fields).wait(timeout)
+
+    # -----------------------------
+    # Writer thread
+    # -----------------------------
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            first = self._queue.get()
+            if first is _STOP:
+                break
+            batch: List[WriteTicket] = [first]  # type: ignore[list-item]
+            # Linger briefly so concurrent workers share one commit
+            while len(batch) < self.batch_size:
+                try:
+                    item = self._queue.get(timeout=self.linger_seconds) if self.linger_seconds else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)  # type: ignore[arg-type]
+            self._commit(batch)
+
+    def _commit(self, batch: List[WriteTicket]) -> None:
+        try:
+            results = self.store.update_many((t.email, t.fields) for t in batch)
+        except BaseException as e:
+            for t in batch:
+                t._resolve(error=e)
+            return
+        for t, changed in zip(batch, results):
+            t._resolve(changed)
+        self.batches += 1
+        self.updates += len(batch)
+        self.max_batch = max(self.max_batch, len(batch))
+
+    def stats(self) -> Dict[str, int]:
+        return {"batches": self.batches, "updates": self.updates, "max_batch": self.max_batch}
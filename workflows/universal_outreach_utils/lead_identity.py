@@ -0,0 +1,325 @@
+"""
+Persistent lead identity index (SQLite) shared by the opener and follow-up runners.
+
+Centralizes:
+- Normalised identities per lead: email, DM link (and the email's company domain)
+- identity -> canonical lead + owning client, claimed by the first client that has the lead
+- A fingerprint per (lead, client) row so re-syncs only write rows whose identity fields changed
+- Cross-client duplicate detection before anything is sent (a lookup, not a rescan of the CRM)
+
+Dedupe used to rebuild this from the rows of the current run only; the index persists across
+runs and CSV imports, so a lead imported under a second client is caught the first time it shows up.
+
+The index lives next to the CRM CSV (CRM_leads_copy.csv.identity.sqlite3) unless overridden:
+
+    export LEAD_IDENTITY_DB=/path/to/identity.sqlite3      # or "off" to disable
+
+Commands:
+
+    python3 -m workflows.universal_outreach_utils.lead_identity sync /path/to/CRM_leads_copy.csv [--rebuild]
+    python3 -m workflows.universal_outreach_utils.lead_identity dups /path/to/CRM_leads_copy.csv
+
+Path suggestion: workflows/universal_outreach_utils/lead_identity.py
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime, UTC
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+from workflows.universal_outreach_utils.crm_journal import journal_path_for
+
+PathLike = Union[str, Path]
+
+ENV_IDENTITY_DB = "LEAD_IDENTITY_DB"
+IDENTITY_SUFFIX = ".identity.sqlite3"
+
+CLIENT_COLUMNS = ("Client Name", "Client", "client")
+
+# Columns that define who a lead is; the row fingerprint covers exactly these
+FINGERPRINT_COLUMNS = (
+    "Email", "id", "DM Link", "Client Name", "Client", "client",
+    "First Name", "Last Name", "Company Name",
+)
+
+# Mailbox providers: a shared domain here says nothing about the company
+FREE_MAIL_DOMAINS = frozenset({
+    "gmail.com", "googlemail.com", "yahoo.com", "outlook.com", "hotmail.com", "live.com",
+    "icloud.com", "me.com", "aol.com", "proton.me", "protonmail.com", "gmx.com",
+})
+
+
+def _norm(s: Optional[str]) -> str:
+    return " ".join((s or "").split()).lower()
+
+
+def normalize_dm_link(value: Optional[str]) -> str:
+    """https://www.instagram.com/Handle/ -> instagram.com/handle"""
+    v = (value or "").strip().lower()
+    for prefix in ("https://", "http://"):
+        if v.startswith(prefix):
+            v = v[len(prefix):]
+    if v.startswith("www."):
+        v = v[4:]
+    return v.split("?", 1)[0].rstrip("/")
+
+
+def email_domain(email: Optional[str]) -> str:
+    e = (email or "").strip().lower()
+    return e.rsplit("@", 1)[1] if "@" in e else ""
+
+
+def identity_keys(row: Dict[str, str]) -> List[Tuple[str, str]]:
+    """[(kind, normalised value)] for the identities present on a row, strongest first."""
+    keys = []
+    email = (row.get("Email") or "").strip().lower()
+    if email:
+        keys.append(("email", email))
+    dm = normalize_dm_link(row.get("DM Link"))
+    if dm:
+        keys.append(("dm", dm))
+    if not keys:
+        lid = (row.get("id") or "").strip().lower()
+        if lid:
+            keys.append(("id", lid))
+    return keys
+
+
+def row_client(row: Dict[str, str]) -> str:
+    """Normalised client of a row: the first non-empty client column. Projected rows (stream_rows
+    with columns=) carry every CLIENT_COLUMNS entry, "" for the ones the CRM does not have."""
+    for col in CLIENT_COLUMNS:
+        client = _norm(row.get(col))
+        if client:
+            return client
+    return ""
+
+
+def row_fingerprint(row: Dict[str, str]) -> str:
+    payload = "\x1f".join((row.get(c) or "").strip() for c in FINGERPRINT_COLUMNS)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+class LeadIdentityIndex:
+    """identity -> canonical lead/owner client, plus per-row fingerprints for incremental sync."""
+
+    def __init__(self, db_path: PathLike):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+            CREATE TABLE IF NOT EXISTS identities (
+                kind TEXT NOT NULL, value TEXT NOT NULL,
+                lead_key TEXT NOT NULL, client_norm TEXT NOT NULL, first_seen TEXT NOT NULL,
+                PRIMARY KEY (kind, value)
+            );
+            CREATE TABLE IF NOT EXISTS leads (
+                lead_key TEXT NOT NULL, client_norm TEXT NOT NULL,
+                fingerprint TEXT NOT NULL, domain TEXT NOT NULL, updated_at TEXT NOT NULL,
+                PRIMARY KEY (lead_key, client_norm)
+            );
+            CREATE INDEX IF NOT EXISTS idx_leads_domain ON leads (domain);
+            """
+        )
+
+    # -----------------------------
+    # Meta
+    # -----------------------------
+    def _meta(self, key: str, default=None):
+        row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def _set_meta(self, key: str, value) -> None:
+        self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, json.dumps(value)))
+
+    # -----------------------------
+    # Lookups / incremental updates
+    # -----------------------------
+    def owner(self, kind: str, value: str) -> Optional[Tuple[str, str]]:
+        """(canonical lead_key, owning client) for one identity, or None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT lead_key, client_norm FROM identities WHERE kind = ? AND value = ?", (kind, value)
+            ).fetchone()
+        return (row[0], row[1]) if row else None
+
+    def observe(self, row: Dict[str, str], client_norm: Optional[str] = None) -> Optional[Dict[str, object]]:
+        """Record `row` (if new or changed) and resolve it to its canonical lead.
+
+        Returns None for rows without any identity, else
+        {"lead_key", "owner_client", "cross_client", "domain_clients"} where `cross_client` means
+        another client already owns one of this row's identities. Call commit() after a batch."""
+        keys = identity_keys(row)
+        if not keys:
+            return None
+        client = _norm(client_norm) if client_norm is not None else row_client(row)
+        fp = row_fingerprint(row)
+        domain = email_domain(row.get("Email"))
+        if domain in FREE_MAIL_DOMAINS:
+            domain = ""
+        now = datetime.now(UTC).isoformat(timespec="seconds")
+
+        with self._lock:
+            owners = {}
+            for kind, value in keys:
+                hit = self._conn.execute(
+                    "SELECT lead_key, client_norm FROM identities WHERE kind = ? AND value = ?", (kind, value)
+                ).fetchone()
+                if hit:
+                    owners[(kind, value)] = hit
+            # Canonical lead: the one already owning the strongest identity, else this row's own key
+            first = next((owners[k] for k in keys if k in owners), None)
+            lead_key = first[0] if first else f"{keys[0][0]}:{keys[0][1]}"
+            owner_client = first[1] if first else client
+
+            stored = self._conn.execute(
+                "SELECT fingerprint FROM leads WHERE lead_key = ? AND client_norm = ?", (lead_key, client)
+            ).fetchone()
+            if stored is None or stored[0] != fp:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO leads (lead_key, client_norm, fingerprint, domain, updated_at) VALUES (?, ?, ?, ?, ?)",
+                    (lead_key, client, fp, domain, now),
+                )
+                for kind, value in keys:
+                    if (kind, value) not in owners:
+                        self._conn.execute(
+                            "INSERT OR IGNORE INTO identities (kind, value, lead_key, client_norm, first_seen) VALUES (?, ?, ?, ?, ?)",
+                            (kind, value, lead_key, owner_client, now),
+                        )
+
+            cross = any(o[1] != client for o in owners.values())
+            domain_clients: List[str] = []
+            if domain:
+                domain_clients = [
+                    r[0] for r in self._conn.execute(
+                        "SELECT DISTINCT client_norm FROM leads WHERE domain = ? AND client_norm != ?", (domain, client)
+                    )
+                ]
+        return {
+            "lead_key": lead_key,
+            "owner_client": owner_client,
+            "cross_client": cross,
+            "domain_clients": domain_clients,
+        }
+
+    def commit(self) -> None:
+        with self._lock:
+            self._conn.commit()
+
+    def sync_rows(self, rows: Iterable[Dict[str, str]]) -> Dict[str, int]:
+        """Observe many rows in one transaction. Returns {"seen", "cross_client"}."""
+        seen = cross = 0
+        with self._lock:
+            for r in rows:
+                res = self.observe(r)
+                if res is None:
+                    continue
+                seen += 1
+                cross += int(bool(res["cross_client"]))
+            self.commit()
+        return {"seen": seen, "cross_client": cross}
+
+    def sync_csv(self, csv_path: PathLike, *, rebuild: bool = False) -> Optional[Dict[str, int]]:
+        """Bring the index up to date with the CRM CSV (+ journal), or with its shards (+ journals)
+        once the CRM is sharded (crm_shards). Skipped (None) when no file changed since the last
+        sync; unchanged rows are fingerprint hits and cost no writes."""
+        from workflows.universal_outreach_utils.crm_shards import open_client_directory
+        from workflows.universal_outreach_utils.crm_store import stream_rows
+
+        directory = open_client_directory(csv_path)
+        paths = directory.shard_paths() if directory is not None else [Path(csv_path)]
+        source = {}
+        for path in paths:
+            for p in (path, journal_path_for(path)):
+                st = p.stat() if p.exists() else None
+                source[p.name] = [st.st_size, st.st_mtime_ns] if st else None
+        with self._lock:
+            if rebuild:
+                self._conn.execute("DELETE FROM identities")
+                self._conn.execute("DELETE FROM leads")
+            elif self._meta("source") == source:
+                return None
+            rows = (row for path in paths for row in stream_rows(path, columns=FINGERPRINT_COLUMNS))
+            stats = self.sync_rows(rows)
+            self._set_meta("source", source)
+            self.commit()
+        return stats
+
+    def ensure_seeded(self, csv_path: PathLike) -> Optional[Dict[str, int]]:
+        """Seed an empty index from the whole CRM so ownership follows file order, not run order."""
+        with self._lock:
+            if self._conn.execute("SELECT 1 FROM identities LIMIT 1").fetchone():
+                return None
+        return self.sync_csv(csv_path)
+
+    def cross_client_duplicates(self) -> List[Dict[str, object]]:
+        """Leads present under more than one client: [{"lead_key", "clients"}]."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT lead_key, GROUP_CONCAT(client_norm, '|') FROM leads GROUP BY lead_key "
+                "HAVING COUNT(DISTINCT client_norm) > 1 ORDER BY lead_key"
+            ).fetchall()
+        return [{"lead_key": k, "clients": sorted(set(c.split("|")))} for k, c in rows]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.commit()
+            self._conn.close()
+
+
+def identity_db_for(csv_path: PathLike) -> Path:
+    """CRM_leads_copy.csv -> CRM_leads_copy.csv.identity.sqlite3 (same directory)."""
+    p = Path(csv_path)
+    return p.with_name(p.name + IDENTITY_SUFFIX)
+
+
+def open_identity_index(csv_path: PathLike) -> Optional[LeadIdentityIndex]:
+    """The identity index for the canonical CRM, or None if LEAD_IDENTITY_DB=off."""
+    db = os.environ.get(ENV_IDENTITY_DB, "").strip()
+    if db.lower() in ("off", "0", "false", "no"):
+        return None
+    try:
+        return LeadIdentityIndex(db or identity_db_for(csv_path))
+    except sqlite3.Error as e:
+        print(f"⚠️ Lead identity index unavailable ({e}); falling back to per-run dedupe.")
+        return None
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Persistent lead identity index (sync / list cross-client duplicates).")
+    ap.add_argument("cmd", choices=("sync", "dups"))
+    ap.add_argument("csv_path", help="Path to the canonical CRM CSV")
+    ap.add_argument("--rebuild", action="store_true", help="Drop the index and rebuild it from the CSV")
+    args = ap.parse_args()
+
+    index = open_identity_index(args.csv_path)
+    if index is None:
+        print(f"Lead identity index disabled via {ENV_IDENTITY_DB}.")
+        return 1
+    if args.cmd == "sync":
+        stats = index.sync_csv(args.csv_path, rebuild=args.rebuild)
+        if stats is None:
+            print("Identity index already up to date.")
+        else:
+            print(f"Synced {stats['seen']} lead row(s); {stats['cross_client']} belong to another client.")
+    else:
+        dups = index.cross_client_duplicates()
+        for d in dups:
+            print(f"{d['lead_key']:<50} {', '.join(d['clients'])}")
+        print(f"{len(dups)} lead(s) span more than one client.")
+    index.close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,335 @@
+"""
+Content-addressed on-disk cache (SQLite) for LLM personalization results.
+
+Centralizes:
+- Keys: sha256 of the namespace + the exact request (rendered prompt/messages, model, temperature,
+  max_tokens) or, for non-chat renderers, the template/options + the lead's content fields
+- TTL per entry (expired entries are misses and are deleted on read / prune)
+- LRU eviction by last access once the cache exceeds its size or entry budget
+- Hit / miss / expired / eviction counters (per process, and lifetime totals in the meta table)
+
+A crashed or re-run campaign used to re-personalize every lead from scratch even though nothing
+in the request had changed; with the cache a retry or re-run only pays for leads whose rendered
+prompt, model parameters or lead fields differ. Only accepted results are stored (an output that
+failed to parse is never cached, so a retry still calls the model).
+
+    export LLM_CACHE_DB=/path/to/llm_cache.sqlite3     # or "off" to disable
+    export LLM_CACHE_TTL_HOURS=336                     # default 14 days
+    export LLM_CACHE_MAX_MB=64                         # LRU eviction above this (or LLM_CACHE_MAX_ENTRIES)
+
+    cache = open_llm_cache()
+    content = cache.completion("personalize_email", request_body, create_fn, accept=is_valid)
+
+    python3 -m workflows.universal_outreach_utils.llm_cache stats
+    python3 -m workflows.universal_outreach_utils.llm_cache prune
+    python3 -m workflows.universal_outreach_utils.llm_cache clear [--namespace personalize_email]
+
+Path suggestion: workflows/universal_outreach_utils/llm_cache.py
+"""
+from __future__ import annotations
+
+import argparse
+import atexit
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Union
+
+PathLike = Union[str, Path]
+
+ENV_CACHE_DB = "LLM_CACHE_DB"
+ENV_TTL_HOURS = "LLM_CACHE_TTL_HOURS"
+ENV_MAX_MB = "LLM_CACHE_MAX_MB"
+ENV_MAX_ENTRIES = "LLM_CACHE_MAX_ENTRIES"
+
+DEFAULT_DB_PATH = Path(__file__).resolve().parents[1] / "outreach_sender" / "state" / "llm_cache.sqlite3"
+DEFAULT_TTL_HOURS = 14 * 24
+DEFAULT_MAX_MB = 64
+DEFAULT_MAX_ENTRIES = 50_000
+
+# Lead columns that feed a personalization; status/timestamp columns are left out of cache keys
+LEAD_CONTENT_FIELDS = (
+    "Email", "First Name", "Last Name", "Company Name", "Client Name",
+    "Custom 1", "Custom 2", "Custom 3", "Industry", "Overview", "Copywriting Document Link",
+)
+
+COUNTERS = ("hits", "misses", "expired", "evictions", "stores")
+
+
+def lead_content(lead: Dict[str, Any], fields=LEAD_CONTENT_FIELDS) -> Dict[str, str]:
+    """The lead fields that belong in a cache key (present fields only, stripped)."""
+    return {f: str(lead.get(f) or "").strip() for f in fields if f in lead}
+
+
+def cache_key(namespace: str, request: Any) -> str:
+    canonical = json.dumps(request, sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=str)
+    return hashlib.sha256(f"{namespace}\x1f{canonical}".encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    """SQLite-backed, content-addressed LLM result cache with TTL and LRU/size eviction."""
+
+    def __init__(
+        self,
+        db_path: PathLike = DEFAULT_DB_PATH,
+        *,
+        ttl_seconds: float = DEFAULT_TTL_HOURS * 3600,
+        max_bytes: int = DEFAULT_MAX_MB * 1024 * 1024,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+    ):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.ttl_seconds = float(ttl_seconds)
+        self.max_bytes = int(max_bytes)
+        self.max_entries = int(max_entries)
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+            CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY, namespace TEXT NOT NULL, value TEXT NOT NULL,
+                size INTEGER NOT NULL, created REAL NOT NULL, last_access REAL NOT NULL, expires REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_entries_last_access ON entries (last_access);
+            """
+        )
+        self._conn.commit()
+        self.counters = dict.fromkeys(COUNTERS, 0)
+        self._entries, self._bytes = self._totals()
+
+    def _totals(self):
+        count, size = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        return int(count), int(size)
+
+    # -----------------------------
+    # Get / put
+    # -----------------------------
+    def get(self, namespace: str, request: Any) -> Optional[str]:
+        key = cache_key(namespace, request)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT value, size, expires FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.counters["misses"] += 1
+                return None
+            value, size, expires = row
+            if expires <= now:
+                self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                self._conn.commit()
+                self._entries -= 1
+                self._bytes -= size
+                self.counters["expired"] += 1
+                self.counters["misses"] += 1
+                return None
+            self._conn.execute("UPDATE entries SET last_access = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.counters["hits"] += 1
+            return value
+
+    def put(self, namespace: str, request: Any, value: str, ttl_seconds: Optional[float] = None) -> None:
+        key = cache_key(namespace, request)
+        now = time.time()
+        size = len(value.encode("utf-8"))
+        expires = now + (self.ttl_seconds if ttl_seconds is None else float(ttl_seconds))
+        with self._lock:
+            old = self._conn.execute("SELECT size FROM entries WHERE key = ?", (key,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries (key, namespace, value, size, created, last_access, expires) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, namespace, value, size, now, now, expires),
+            )
+            self._conn.commit()
+            if old is None:
+                self._entries += 1
+                self._bytes += size
+            else:
+                self._bytes += size - old[0]
+            self.counters["stores"] += 1
+            if self._entries > self.max_entries or self._bytes > self.max_bytes:
+                self._evict()
+
+    def _evict(self) -> None:
+        """Drop expired entries, then least recently used ones until ~90% of the budget is free."""
+        now = time.time()
+        self._conn.execute("DELETE FROM entries WHERE expires <= ?", (now,))
+        self._entries, self._bytes = self._totals()  # resync (other processes share the file)
+        target_entries = int(self.max_entries * 0.9)
+        target_bytes = int(self.max_bytes * 0.9)
+        evicted = 0
+        while self._entries > target_entries or self._bytes > target_bytes:
+            rows = self._conn.execute("SELECT key, size FROM entries ORDER BY last_access LIMIT 256").fetchall()
+            if not rows:
+                break
+            victims = []
+            for key, size in rows:
+                if self._entries <= target_entries and self._bytes <= target_bytes:
+                    break
+                victims.append((key,))
+                self._entries -= 1
+                self._bytes -= size
+            self._conn.executemany("DELETE FROM entries WHERE key = ?", victims)
+            evicted += len(victims)
+        self._conn.commit()
+        self.counters["evictions"] += evicted
+
+    # -----------------------------
+    # Memoized calls
+    # -----------------------------
+    def completion(
+        self,
+        namespace: str,
+        request: Dict[str, Any],
+        create: Callable[[Dict[str, Any]], str],
+        *,
+        accept: Optional[Callable[[str], bool]] = None,
+        ttl_seconds: Optional[float] = None,
+    ) -> str:
+        """`create(request)` (completion text) served from the cache; stores it if `accept` allows."""
+        cached = self.get(namespace, request)
+        if cached is not None:
+            return cached
+        content = create(request)
+        if content and (accept is None or accept(content)):
+            self.put(namespace, request, content, ttl_seconds)
+        return content
+
+    def memoize_json(
+        self,
+        namespace: str,
+        request: Dict[str, Any],
+        compute: Callable[[], Dict[str, Any]],
+        *,
+        accept: Optional[Callable[[Dict[str, Any]], bool]] = None,
+        ttl_seconds: Optional[float] = None,
+    ) -> Dict[str, Any]:
+        """Cache a dict-returning renderer (e.g. render_llm_email) under `request`."""
+        cached = self.get(namespace, request)
+        if cached is not None:
+            try:
+                return json.loads(cached)
+            except json.JSONDecodeError:
+                pass
+        result = compute()
+        if isinstance(result, dict) and (accept is None or accept(result)):
+            self.put(namespace, request, json.dumps(result, ensure_ascii=False), ttl_seconds)
+        return result
+
+    # -----------------------------
+    # Maintenance / stats
+    # -----------------------------
+    def prune(self) -> int:
+        """Delete expired entries and enforce the size budget. Returns entries removed."""
+        with self._lock:
+            before = self._totals()[0]
+            self._evict()
+            return before - self._entries
+
+    def clear(self, namespace: Optional[str] = None) -> int:
+        with self._lock:
+            if namespace:
+                cur = self._conn.execute("DELETE FROM entries WHERE namespace = ?", (namespace,))
+            else:
+                cur = self._conn.execute("DELETE FROM entries")
+            self._conn.commit()
+            self._entries, self._bytes = self._totals()
+            return cur.rowcount
+
+    def lifetime_counters(self) -> Dict[str, int]:
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM meta WHERE key = 'counters'").fetchone()
+        totals = dict.fromkeys(COUNTERS, 0)
+        if row:
+            totals.update(json.loads(row[0]))
+        return totals
+
+    def _persist_counters(self) -> None:
+        totals = self.lifetime_counters()
+        for name in COUNTERS:
+            totals[name] += self.counters[name]
+        self._conn.execute(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES ('counters', ?)", (json.dumps(totals),)
+        )
+        self._conn.commit()
+        self.counters = dict.fromkeys(COUNTERS, 0)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.counters["hits"] + self.counters["misses"]
+            return dict(
+                self.counters,
+                hit_rate=round(self.counters["hits"] / lookups, 3) if lookups else 0.0,
+                entries=self._entries,
+                megabytes=round(self._bytes / (1024 * 1024), 2),
+            )
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is None:
+                return
+            self._persist_counters()
+            self._conn.close()
+            self._conn = None
+
+
+_shared: Optional[LLMCache] = None
+_shared_lock = threading.Lock()
+_shared_opened = False
+
+
+def open_llm_cache() -> Optional[LLMCache]:
+    """The process-wide LLM cache (configured from env), or None if LLM_CACHE_DB=off."""
+    global _shared, _shared_opened
+    with _shared_lock:
+        if _shared_opened:
+            return _shared
+        _shared_opened = True
+        db = os.environ.get(ENV_CACHE_DB, "").strip()
+        if db.lower() in ("off", "0", "false", "no"):
+            return None
+        try:
+            _shared = LLMCache(
+                db or DEFAULT_DB_PATH,
+                ttl_seconds=float(os.environ.get(ENV_TTL_HOURS, DEFAULT_TTL_HOURS)) * 3600,
+                max_bytes=int(float(os.environ.get(ENV_MAX_MB, DEFAULT_MAX_MB)) * 1024 * 1024),
+                max_entries=int(os.environ.get(ENV_MAX_ENTRIES, DEFAULT_MAX_ENTRIES)),
+            )
+        except (sqlite3.Error, OSError, ValueError) as e:
+            print(f"⚠️ LLM cache unavailable ({e}); every personalization calls the model.")
+            return None
+
+        def _report_and_close():
+            if any(_shared.counters.values()):
+                print(f"[LLMCache] {_shared.stats()}")
+            _shared.close()
+
+        atexit.register(_report_and_close)
+        return _shared
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="LLM personalization cache (stats / prune / clear).")
+    ap.add_argument("cmd", choices=("stats", "prune", "clear"))
+    ap.add_argument("--namespace", default=None, help="clear only this namespace")
+    args = ap.parse_args()
+
+    cache = open_llm_cache()
+    if cache is None:
+        print(f"LLM cache disabled via {ENV_CACHE_DB}.")
+        return 1
+    if args.cmd == "prune":
+        print(f"Pruned {cache.prune()} entr(ies).")
+    elif args.cmd == "clear":
+        print(f"Cleared {cache.clear(args.namespace)} entr(ies).")
+    print(json.dumps({"db": str(cache.db_path), **cache.stats(), "lifetime": cache.lifetime_counters()}, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,204 @@
+"""
+Process-wide, pooled OpenAI client (sync and async) for every module that calls the LLM.
+
+The opener writer and the personalizer each built their own client at import (reading the key
+file as a side effect of importing them), and the follow-up engine's LLMClient re-read the key file
+and re-imported `openai` for every follow-up, then called the legacy `openai.ChatCompletion` API.
+This module centralizes:
+
+- One `OpenAI` client per API key per process, over one keep-alive httpx connection pool, so
+  requests reuse warm TLS connections instead of handshaking per client
+- One `AsyncOpenAI` client per key per event loop, with the same pool limits, keep-alive and
+  timeout (httpx async pools are bound to the loop that made them)
+- The API key, resolved once on first use: OPENAI_API_KEY, else the key file (OPENAI_KEY_PATH,
+  default Creds/gpt_key.json, "api_key" or "OPENAI_API_KEY"); a missing key or SDK is logged once
+  and surfaces as LLMUnavailable
+- Pool size, keep-alive and timeout from the environment
+- No SDK retries (max_retries=0): retries, deadlines, hedging and the circuit breaker are
+  llm_resilience's, so each of its attempts is exactly one request
+
+    export LLM_HTTP_POOL_SIZE=20          # max (and max idle) connections
+    export LLM_HTTP_KEEPALIVE_S=60
+    export LLM_HTTP_TIMEOUT_S=60
+
+    resp = chat(model="gpt-4o-mini", messages=[...])          # sync
+    resp = await achat(model="gpt-4o-mini", messages=[...])   # async
+
+Path suggestion: workflows/universal_outreach_utils/llm_pool.py
+"""
+from __future__ import annotations
+
+import atexit
+import json
+import os
+import threading
+import weakref
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+ENV_KEY_PATH = "OPENAI_KEY_PATH"
+ENV_POOL_SIZE = "LLM_HTTP_POOL_SIZE"
+ENV_KEEPALIVE_S = "LLM_HTTP_KEEPALIVE_S"
+ENV_TIMEOUT_S = "LLM_HTTP_TIMEOUT_S"
+
+DEFAULT_KEY_PATH = "/Users/kevinnovanta/backend_for_ai_agency/Creds/gpt_key.json"
+DEFAULT_POOL_SIZE = 20
+DEFAULT_KEEPALIVE_S = 60.0
+DEFAULT_TIMEOUT_S = 60.0
+
+
+class LLMUnavailable(Exception):
+    """No LLM provider available (SDK not installed or no API key)."""
+
+
+def _env_number(name: str, default: float) -> float:
+    try:
+        return float(os.environ.get(name, "") or default)
+    except ValueError:
+        print(f"⚠️ [LLMPool] Ignoring non-numeric {name}={os.environ.get(name)!r}; using {default}.")
+        return default
+
+
+_lock = threading.Lock()
+_resolved = False
+_api_key: Optional[str] = None
+_unavailable_reason: Optional[str] = None
+_clients: Dict[str, Any] = {}
+_async_clients: Dict[str, "weakref.WeakKeyDictionary"] = {}
+
+
+def _resolve_key() -> None:
+    """Read the API key once (under _lock)."""
+    global _resolved, _api_key, _unavailable_reason
+    if _resolved:
+        return
+    _resolved = True
+    try:
+        import openai  # noqa: F401  (lazy: importing this module never requires the SDK)
+    except ImportError:
+        _unavailable_reason = "the openai package is not installed"
+    key = os.environ.get("OPENAI_API_KEY") or None
+    if key is None:
+        path = Path(os.environ.get(ENV_KEY_PATH) or DEFAULT_KEY_PATH)
+        try:
+            with open(path, "r") as f:
+                data = json.load(f)
+            key = data.get("api_key") or data.get("OPENAI_API_KEY") or None
+        except (OSError, ValueError) as e:
+            print(f"⚠️ [LLMPool] Could not read the OpenAI key file {path}: {e}")
+        if key is None and _unavailable_reason is None:
+            _unavailable_reason = f"no OpenAI API key (OPENAI_API_KEY or {path})"
+    _api_key = key
+    if _unavailable_reason:
+        print(f"⚠️ [LLMPool] LLM unavailable: {_unavailable_reason}.")
+
+
+def _limits():
+    import httpx  # installed with openai
+
+    size = max(1, int(_env_number(ENV_POOL_SIZE, DEFAULT_POOL_SIZE)))
+    limits = httpx.Limits(
+        max_connections=size,
+        max_keepalive_connections=size,
+        keepalive_expiry=_env_number(ENV_KEEPALIVE_S, DEFAULT_KEEPALIVE_S),
+    )
+    return httpx, limits, httpx.Timeout(_env_number(ENV_TIMEOUT_S, DEFAULT_TIMEOUT_S)), size
+
+
+def available() -> bool:
+    with _lock:
+        _resolve_key()
+        return _unavailable_reason is None
+
+
+def api_key() -> Optional[str]:
+    with _lock:
+        _resolve_key()
+        return _api_key
+
+
+def get_client(api_key: Optional[str] = None):
+    """The shared sync OpenAI client (one per key). Raises LLMUnavailable."""
+    with _lock:
+        _resolve_key()
+        if api_key is None:
+            if _unavailable_reason:
+                raise LLMUnavailable(_unavailable_reason)
+            api_key = _api_key
+        client = _clients.get(api_key)
+        if client is None:
+            try:
+                from openai import OpenAI
+            except ImportError as e:
+                raise LLMUnavailable("the openai package is not installed") from e
+            httpx, limits, timeout, size = _limits()
+            client = OpenAI(
+                api_key=api_key,
+                http_client=httpx.Client(limits=limits, timeout=timeout),
+                max_retries=0,  # llm_resilience is the only retry policy (its deadlines cover every attempt)
+            )
+            _clients[api_key] = client
+            print(f"[LLMPool] OpenAI client ready (pool {size}, keep-alive {limits.keepalive_expiry:g}s).")
+        return client
+
+
+def get_async_client(api_key: Optional[str] = None):
+    """The shared AsyncOpenAI client for the running event loop (one per key). Raises LLMUnavailable."""
+    import asyncio  # only async callers pay for it (it dominates this module's import time otherwise)
+
+    loop = asyncio.get_running_loop()
+    with _lock:
+        _resolve_key()
+        if api_key is None:
+            if _unavailable_reason:
+                raise LLMUnavailable(_unavailable_reason)
+            api_key = _api_key
+        per_loop = _async_clients.setdefault(api_key, weakref.WeakKeyDictionary())
+        client = per_loop.get(loop)
+        if client is None:
+            try:
+                from openai import AsyncOpenAI
+            except ImportError as e:
+                raise LLMUnavailable("the openai package is not installed") from e
+            httpx, limits, timeout, _ = _limits()
+            client = AsyncOpenAI(
+                api_key=api_key,
+                http_client=httpx.AsyncClient(limits=limits, timeout=timeout),
+                max_retries=0,
+            )
+            per_loop[loop] = client
+        return client
+
+
+def chat(**request: Any):
+    """client.chat.completions.create(**request) on the shared sync client."""
+    return get_client().chat.completions.create(**request)
+
+
+async def achat(**request: Any):
+    """client.chat.completions.create(**request) on the shared async client for this loop."""
+    return await get_async_client().chat.completions.create(**request)
+
+
+@atexit.register
+def close() -> None:
+    """Close the sync clients' connection pools (async pools close with their event loop)."""
+    with _lock:
+        clients = list(_clients.values())
+        _clients.clear()
+    for client in clients:
+        try:
+            client.close()
+        except Exception:
+            pass
+
+
+def reset() -> None:
+    """Close the clients and forget the resolved key (re-read on next use)."""
+    global _resolved, _api_key, _unavailable_reason
+    close()
+    with _lock:
+        _async_clients.clear()
+        _resolved = False
+        _api_key = None
+        _unavailable_reason = None
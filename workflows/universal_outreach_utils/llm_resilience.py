@@ -0,0 +1,379 @@
+"""
+Resilience policy for LLM calls: deadlines, retries, hedged requests and a circuit breaker.
+
+No LLM call had a timeout (one stalled request held an inbox worker for as long as the provider
+took), a transient 429 / 5xx went straight to the un-personalized fallback, and during an outage
+every lead still paid the full time to fail. This module centralizes, per stage (personalize_email,
+opener, followup_email, ...):
+
+- Deadline: a total time budget per call; each attempt gets the time that is left as its timeout
+- Retries: transient errors (timeouts, connection errors, 429, 5xx) are retried with full-jitter
+  exponential backoff while the deadline allows; other errors (bad request, failed validation) are not
+- Hedging (opt-in): once a stage has latency history, a call still running after its p95 gets one
+  duplicate request and the first success wins; hedges are capped at a share of calls (hedge budget)
+- Circuit breaker (provider-wide): after consecutive provider failures calls fail fast with
+  CircuitOpen (an LLMUnavailable), so callers switch to their fallback templates at once; after a
+  cooldown one probe call is let through and a success closes the circuit again
+- Counters per stage for every policy decision (retries, timeouts, hedges, hedge wins,
+  short-circuits, failures) and call latency p50 / p95 / p99, logged at exit
+
+    export LLM_RESILIENCE=on                                    # default on; "off" = direct calls
+    export LLM_DEADLINES_S="default=45,personalize_subject=15"  # seconds per call, per stage
+    export LLM_RETRIES=2 LLM_RETRY_BASE_S=0.5 LLM_RETRY_CAP_S=8
+    export LLM_HEDGE=on LLM_HEDGE_QUANTILE=0.95 LLM_HEDGE_BUDGET=0.1   # hedging is off by default
+    export LLM_BREAKER_FAILURES=5 LLM_BREAKER_COOLDOWN_S=30
+
+    # attempt(timeout_s, cancelled) makes one request; cancelled (a threading.Event or None) is set
+    # when a hedged twin has already won
+    content = run("personalize_email", lambda timeout, cancelled: create(request, timeout))
+
+Path suggestion: workflows/universal_outreach_utils/llm_resilience.py
+"""
+from __future__ import annotations
+
+import atexit
+import os
+import random
+import threading
+import time
+from collections import Counter, deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Deque, Dict, Optional, TypeVar
+
+from workflows.universal_outreach_utils.llm_pool import LLMUnavailable
+
+T = TypeVar("T")
+Attempt = Callable[[Optional[float], Optional[threading.Event]], T]
+
+ENV_ENABLED = "LLM_RESILIENCE"
+ENV_DEADLINES = "LLM_DEADLINES_S"
+ENV_RETRIES = "LLM_RETRIES"
+ENV_RETRY_BASE_S = "LLM_RETRY_BASE_S"
+ENV_RETRY_CAP_S = "LLM_RETRY_CAP_S"
+ENV_HEDGE = "LLM_HEDGE"
+ENV_HEDGE_QUANTILE = "LLM_HEDGE_QUANTILE"
+ENV_HEDGE_BUDGET = "LLM_HEDGE_BUDGET"
+ENV_BREAKER_FAILURES = "LLM_BREAKER_FAILURES"
+ENV_BREAKER_COOLDOWN_S = "LLM_BREAKER_COOLDOWN_S"
+
+# Seconds per call (all attempts, backoff and hedges included)
+DEFAULT_DEADLINES_S: Dict[str, float] = {
+    "default": 45.0,
+    "opener": 40.0,
+    "generic_subject": 20.0,
+    "personalize_email": 40.0,
+    "personalize_subject": 20.0,
+    "fused_opener": 45.0,
+    "followup_email": 30.0,
+    "subject_batch": 90.0,
+    "personalize_email_batch": 120.0,
+    "personalize_subject_batch": 90.0,
+}
+
+# Exception classes (openai / httpx, matched by name so the SDK stays optional) worth a retry
+_TRANSIENT_ERRORS = {
+    "APITimeoutError", "APIConnectionError", "RateLimitError", "InternalServerError",
+    "TimeoutException", "TransportError", "RemoteProtocolError",
+}
+
+
+class LLMDeadlineExceeded(TimeoutError):
+    """The stage's deadline passed before the call succeeded."""
+
+
+class CircuitOpen(LLMUnavailable):
+    """The provider is failing; calls fail fast until the breaker's cooldown ends."""
+
+
+def is_transient(error: BaseException) -> bool:
+    """Timeouts, connection errors, 429 and 5xx (a retry may succeed)."""
+    if isinstance(error, (TimeoutError, ConnectionError)):
+        return True
+    status = getattr(error, "status_code", None)
+    if isinstance(status, int):
+        return status == 429 or status >= 500
+    return any(cls.__name__ in _TRANSIENT_ERRORS for cls in type(error).__mro__)
+
+
+def parse_deadlines(spec: str) -> Dict[str, float]:
+    """'default=45,personalize_email=30' -> {stage: seconds} (bad entries are logged and skipped)."""
+    deadlines = {}
+    for part in (spec or "").split(","):
+        if not part.strip():
+            continue
+        stage, _, value = part.partition("=")
+        try:
+            deadlines[stage.strip()] = float(value)
+        except ValueError:
+            print(f"⚠️ [LLMResilience] Ignoring deadline entry {part.strip()!r} (expected stage=seconds).")
+    return deadlines
+
+
+def _env_number(name: str, default: float) -> float:
+    try:
+        return float(os.environ.get(name, "") or default)
+    except ValueError:
+        print(f"⚠️ [LLMResilience] Ignoring non-numeric {name}={os.environ.get(name)!r}; using {default}.")
+        return default
+
+
+class CircuitBreaker:
+    """Consecutive-failure breaker: closed -> open (fail fast) -> half-open (one probe) -> closed."""
+
+    def __init__(self, failures: int = 5, cooldown_s: float = 30.0):
+        self.failures = max(1, int(failures))
+        self.cooldown_s = float(cooldown_s)
+        self.state = "closed"
+        self.opens = 0
+        self._lock = threading.Lock()
+        self._consecutive = 0
+        self._opened_at = 0.0
+        self._probing = False
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open":
+                if time.monotonic() - self._opened_at < self.cooldown_s:
+                    return False
+                self.state = "half_open"
+                self._probing = False
+            if self._probing:
+                return False
+            self._probing = True
+            return True
+
+    def success(self) -> None:
+        with self._lock:
+            self._consecutive = 0
+            self._probing = False
+            if self.state != "closed":
+                self.state = "closed"
+                print("✅ [LLMResilience] Provider answered again; circuit closed.")
+
+    def failure(self) -> None:
+        with self._lock:
+            self._consecutive += 1
+            self._probing = False
+            if self.state == "half_open" or (self.state == "closed" and self._consecutive >= self.failures):
+                self.state = "open"
+                self._opened_at = time.monotonic()
+                self.opens += 1
+                print(
+                    f"❌ [LLMResilience] {self._consecutive} consecutive provider failure(s); circuit open, "
+                    f"using fallbacks for {self.cooldown_s:g}s."
+                )
+
+
+class LLMResilience:
+    """Deadline / retry / hedge / breaker policy shared by every LLM call site."""
+
+    def __init__(
+        self,
+        *,
+        deadlines_s: Optional[Dict[str, float]] = None,
+        retries: int = 2,
+        retry_base_s: float = 0.5,
+        retry_cap_s: float = 8.0,
+        hedge: bool = False,
+        hedge_quantile: float = 0.95,
+        hedge_min_samples: int = 20,
+        hedge_budget: float = 0.1,
+        breaker: Optional[CircuitBreaker] = None,
+        window: int = 500,
+    ):
+        self.deadlines_s = dict(DEFAULT_DEADLINES_S if deadlines_s is None else deadlines_s)
+        self.retries = max(0, int(retries))
+        self.retry_base_s = float(retry_base_s)
+        self.retry_cap_s = float(retry_cap_s)
+        self.hedge = bool(hedge)
+        self.hedge_quantile = float(hedge_quantile)
+        self.hedge_min_samples = int(hedge_min_samples)
+        self.hedge_budget = float(hedge_budget)
+        self.breaker = breaker or CircuitBreaker()
+        self._window = window
+        self._lock = threading.Lock()
+        self._counts: Dict[str, Counter] = {}
+        self._latencies: Dict[str, Deque[float]] = {}
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    @classmethod
+    def from_env(cls) -> "LLMResilience":
+        return cls(
+            deadlines_s={**DEFAULT_DEADLINES_S, **parse_deadlines(os.environ.get(ENV_DEADLINES, ""))},
+            retries=int(_env_number(ENV_RETRIES, 2)),
+            retry_base_s=_env_number(ENV_RETRY_BASE_S, 0.5),
+            retry_cap_s=_env_number(ENV_RETRY_CAP_S, 8.0),
+            hedge=(os.environ.get(ENV_HEDGE) or "off").strip().lower() in ("1", "on", "true", "yes"),
+            hedge_quantile=_env_number(ENV_HEDGE_QUANTILE, 0.95),
+            hedge_budget=_env_number(ENV_HEDGE_BUDGET, 0.1),
+            breaker=CircuitBreaker(
+                failures=int(_env_number(ENV_BREAKER_FAILURES, 5)),
+                cooldown_s=_env_number(ENV_BREAKER_COOLDOWN_S, 30.0),
+            ),
+        )
+
+    # -----------------------------
+    # Bookkeeping
+    # -----------------------------
+    def _count(self, stage: str, name: str, n: int = 1) -> None:
+        with self._lock:
+            self._counts.setdefault(stage, Counter())[name] += n
+
+    def _record_latency(self, stage: str, seconds: float) -> None:
+        with self._lock:
+            self._latencies.setdefault(stage, deque(maxlen=self._window)).append(seconds)
+
+    def deadline(self, stage: str) -> float:
+        return self.deadlines_s.get(stage, self.deadlines_s.get("default", 45.0))
+
+    def hedge_after(self, stage: str) -> Optional[float]:
+        """Seconds after which a call gets a hedged twin (the stage's latency quantile), None if not yet known."""
+        with self._lock:
+            samples = sorted(self._latencies.get(stage, ()))
+        if len(samples) < self.hedge_min_samples:
+            return None
+        return samples[min(len(samples) - 1, int(len(samples) * self.hedge_quantile))]
+
+    def _take_hedge(self, stage: str) -> bool:
+        with self._lock:
+            counts = self._counts.setdefault(stage, Counter())
+            if counts["hedged"] + 1 > self.hedge_budget * max(1, counts["calls"]):
+                counts["hedge_denied"] += 1
+                return False
+            counts["hedged"] += 1
+            return True
+
+    def _pool(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=32, thread_name_prefix="llm-hedge")
+            return self._executor
+
+    # -----------------------------
+    # Calls
+    # -----------------------------
+    def _attempt(self, stage: str, attempt: Attempt, remaining: float) -> Any:
+        """One attempt within `remaining` seconds, hedged after the stage's p95 when enabled."""
+        hedge_after = self.hedge_after(stage) if self.hedge else None
+        if hedge_after is None or hedge_after >= remaining:
+            return attempt(remaining, None)
+        started = time.monotonic()
+        end = started + remaining
+        primary_cancel = threading.Event()
+        primary = self._pool().submit(attempt, remaining, primary_cancel)
+        done, _ = wait([primary], timeout=hedge_after)
+        if not done and self._take_hedge(stage):
+            hedge_cancel = threading.Event()
+            hedge = self._pool().submit(attempt, max(0.0, end - time.monotonic()), hedge_cancel)
+            pending = {primary: primary_cancel, hedge: hedge_cancel}
+        else:
+            pending = {primary: primary_cancel}
+            hedge = None
+        error: Optional[BaseException] = None
+        while pending:
+            done, _ = wait(list(pending), timeout=max(0.0, end - time.monotonic()), return_when=FIRST_COMPLETED)
+            if not done:
+                break
+            for fut in done:
+                pending.pop(fut)
+                if fut.exception() is None:
+                    for cancel in pending.values():
+                        cancel.set()
+                    if fut is hedge:
+                        self._count(stage, "hedge_wins")
+                    return fut.result()
+                error = fut.exception()
+        for cancel in pending.values():
+            cancel.set()
+        if pending or error is None:
+            raise LLMDeadlineExceeded(f"{stage}: no response within {remaining:.1f}s")
+        raise error
+
+    def call(self, stage: str, attempt: Attempt) -> Any:
+        """attempt(timeout_s, cancelled) under the stage's deadline, retry, hedge and breaker policy."""
+        started = time.monotonic()
+        deadline_at = started + self.deadline(stage)
+        self._count(stage, "calls")
+        if not self.breaker.allow():
+            self._count(stage, "short_circuited")
+            raise CircuitOpen(f"{stage}: circuit open (provider failing), using the fallback")
+        retries = 0
+        while True:
+            remaining = deadline_at - time.monotonic()
+            try:
+                if remaining <= 0:
+                    raise LLMDeadlineExceeded(f"{stage}: deadline of {self.deadline(stage):g}s passed")
+                result = self._attempt(stage, attempt, remaining)
+            except Exception as e:
+                if not is_transient(e):
+                    self.breaker.success()  # the provider answered (bad request, failed validation, ...)
+                    self._count(stage, "failed")
+                    raise
+                self.breaker.failure()
+                if isinstance(e, TimeoutError) or "Timeout" in type(e).__name__:
+                    self._count(stage, "timeouts")
+                delay = random.uniform(0.0, min(self.retry_cap_s, self.retry_base_s * 2 ** retries))
+                if retries >= self.retries or time.monotonic() + delay >= deadline_at or not self.breaker.allow():
+                    self._count(stage, "failed")
+                    raise
+                retries += 1
+                self._count(stage, "retries")
+                print(f"⚠️ [LLMResilience] {stage}: {type(e).__name__} ({e}); retry {retries}/{self.retries} in {delay:.1f}s.")
+                time.sleep(delay)
+                continue
+            self.breaker.success()
+            self._count(stage, "ok")
+            self._record_latency(stage, time.monotonic() - started)
+            return result
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        out = {}
+        with self._lock:
+            for stage, counts in self._counts.items():
+                lat = sorted(self._latencies.get(stage, ()))
+
+                def q(p):
+                    return round(lat[min(len(lat) - 1, int(len(lat) * p))] * 1000, 1) if lat else None
+
+                out[stage] = {**dict(counts), "p50_ms": q(0.5), "p95_ms": q(0.95), "p99_ms": q(0.99)}
+        return out
+
+    def report(self) -> None:
+        for stage, s in self.stats().items():
+            decisions = ", ".join(
+                f"{k} {s[k]}" for k in ("retries", "timeouts", "hedged", "hedge_wins", "hedge_denied", "short_circuited", "failed")
+                if s.get(k)
+            )
+            print(
+                f"[LLMResilience] {stage}: {s.get('calls', 0)} call(s), {s.get('ok', 0)} ok"
+                f"{', ' + decisions if decisions else ''}; p50 {s['p50_ms']} ms / p95 {s['p95_ms']} ms / p99 {s['p99_ms']} ms"
+            )
+        if self.breaker.opens:
+            print(f"[LLMResilience] Circuit opened {self.breaker.opens} time(s); now {self.breaker.state}.")
+
+
+_policy: Optional[LLMResilience] = None
+_policy_lock = threading.Lock()
+_policy_resolved = False
+
+
+def open_resilience() -> Optional[LLMResilience]:
+    """The process-wide policy (configured from the environment on first use); None if LLM_RESILIENCE=off."""
+    global _policy, _policy_resolved
+    with _policy_lock:
+        if not _policy_resolved:
+            _policy_resolved = True
+            if (os.environ.get(ENV_ENABLED) or "on").strip().lower() not in ("0", "off", "false", "no"):
+                _policy = LLMResilience.from_env()
+                atexit.register(_policy.report)
+        return _policy
+
+
+def run(stage: str, attempt: Attempt) -> Any:
+    """attempt(timeout_s, cancelled) under the resilience policy (a direct call when it is off)."""
+    policy = open_resilience()
+    if policy is None:
+        return attempt(None, None)
+    return policy.call(stage, attempt)
@@ -0,0 +1,440 @@
+"""
+Streaming chat completions with incremental validation and early cut-off.
+
+Every LLM caller waited for the full completion and only then ran json.loads, so a malformed or
+runaway response cost the whole generation time before the caller fell back to its base text.
+This module centralizes:
+
+- Streaming the completion (opt-in, LLM_STREAMING=on) and validating it while it arrives:
+  an incremental JSON scanner exposes the top-level string fields as they stream and reports
+  syntax errors at the first bad character
+- Length rules per stage (max words / sentences / chars per field or for the whole text); a stream
+  that is clearly invalid or over its limit is closed at once and StreamAborted is raised, so the
+  caller's existing fallback runs without waiting for the rest
+- Checks on the complete output (truncated JSON, too few sentences), also raised as StreamAborted
+- Time-to-first-token and abort / reject counts per stage (summary logged at exit)
+
+With streaming off, chat_text() is a plain request and rules are not applied. Either way the call
+runs under the llm_resilience policy (deadline, retries, hedging, circuit breaker) for its stage.
+
+    export LLM_STREAMING=on       # default off
+
+    rules = StreamRules(json_object=True, limits=(FieldLimit("body_html", max_words=110),))
+    try:
+        content, usage = chat_text("personalize_email", request_body, rules)
+    except StreamAborted as e:
+        ...  # fallback (e.kind: "invalid_json", "max_words", ...; e.early: cut off mid-stream)
+
+Path suggestion: workflows/universal_outreach_utils/llm_stream.py
+"""
+from __future__ import annotations
+
+import atexit
+import json
+import os
+import re
+import threading
+import time
+from collections import Counter, deque
+from dataclasses import dataclass
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from workflows.universal_outreach_utils import llm_pool, llm_resilience
+from workflows.universal_outreach_utils.llm_resilience import LLMDeadlineExceeded
+
+ENV_STREAMING = "LLM_STREAMING"
+
+_ESCAPES = {'"': '"', "\\": "\\", "/": "/", "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t"}
+
+# A sentence end followed by the start of the next sentence (so a sentence counts once it has begun)
+_NEXT_SENTENCE_RE = re.compile(r"[.!?]+[\"')\]]*\s+(?=\S)")
+
+
+def streaming_enabled() -> bool:
+    return (os.environ.get(ENV_STREAMING) or "off").strip().lower() in ("1", "on", "true", "yes")
+
+
+class StreamCancelled(Exception):
+    """A hedged twin of this request already answered."""
+
+
+class StreamAborted(Exception):
+    """A streamed completion failed its rules: cut off mid-stream (early) or rejected when complete."""
+
+    def __init__(self, kind: str, reason: str, partial: str = "", early: bool = True):
+        super().__init__(reason)
+        self.kind = kind
+        self.reason = reason
+        self.partial = partial
+        self.early = early
+
+
+# =============================
+# Incremental JSON
+# =============================
+class IncrementalJSON:
+    """Scans one streamed JSON object: top-level string values as they arrive, first syntax error.
+
+    Nested values are skipped (bracket depth only); the complete text is still parsed with json.loads
+    by the caller, so this only has to be right about what it reports early.
+    """
+
+    def __init__(self):
+        self.error: Optional[str] = None
+        self.closed = False
+        self._values: Dict[str, List[str]] = {}
+        self._state = "start"
+        self._depth = 0
+        self._in_string = False
+        self._role = ""
+        self._escape: Optional[str] = None
+        self._key_chars: List[str] = []
+        self._key = ""
+        self._scalar: List[str] = []
+
+    def value(self, field: str) -> Optional[str]:
+        """The (possibly partial) string value of a top-level field, None if it has not started."""
+        parts = self._values.get(field)
+        return None if parts is None else "".join(parts)
+
+    def feed(self, text: str) -> None:
+        for ch in text:
+            if self.error is not None:
+                return
+            if self._in_string:
+                self._string_char(ch)
+            else:
+                self._step(ch)
+
+    def _fail(self, message: str) -> None:
+        self.error = message
+
+    def _step(self, ch: str) -> None:
+        state = self._state
+        if state == "scalar":
+            if ch in ",}" or ch.isspace():
+                try:
+                    json.loads("".join(self._scalar))
+                except ValueError:
+                    return self._fail(f"invalid value {''.join(self._scalar)!r}")
+                self._state = "comma"
+                self._step(ch)
+            else:
+                self._scalar.append(ch)
+            return
+        if ch.isspace():
+            return
+        if state == "start":
+            if ch != "{":
+                return self._fail(f"expected a JSON object, got {ch!r}")
+            self._state = "key_or_end"
+        elif state in ("key_or_end", "key"):
+            if ch == '"':
+                self._open_string("key")
+            elif ch == "}" and state == "key_or_end":
+                self._close()
+            else:
+                self._fail(f"expected a key, got {ch!r}")
+        elif state == "colon":
+            if ch != ":":
+                return self._fail(f"expected ':', got {ch!r}")
+            self._state = "value"
+        elif state == "value":
+            if ch == '"':
+                self._open_string("value")
+            elif ch in "{[":
+                self._state, self._depth = "nested", 1
+            elif ch in "-0123456789tfn":
+                self._state, self._scalar = "scalar", [ch]
+            else:
+                self._fail(f"expected a value, got {ch!r}")
+        elif state == "nested":
+            if ch == '"':
+                self._open_string("nested")
+            elif ch in "{[":
+                self._depth += 1
+            elif ch in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    self._state = "comma"
+        elif state == "comma":
+            if ch == ",":
+                self._state = "key"
+            elif ch == "}":
+                self._close()
+            else:
+                self._fail(f"expected ',' or '}}', got {ch!r}")
+        else:  # done
+            self._fail("trailing data after the JSON object")
+
+    def _close(self) -> None:
+        self._state = "done"
+        self.closed = True
+
+    def _open_string(self, role: str) -> None:
+        self._in_string, self._role = True, role
+        if role == "key":
+            self._key_chars = []
+        elif role == "value":
+            self._values[self._key] = []
+
+    def _emit(self, text: str) -> None:
+        if self._role == "key":
+            self._key_chars.append(text)
+        elif self._role == "value":
+            self._values[self._key].append(text)
+
+    def _string_char(self, ch: str) -> None:
+        if self._escape is not None:
+            if self._escape == "":
+                if ch == "u":
+                    self._escape = "u"
+                elif ch in _ESCAPES:
+                    self._escape = None
+                    self._emit(_ESCAPES[ch])
+                else:
+                    self._fail(f"invalid escape \\{ch}")
+                return
+            self._escape += ch
+            if len(self._escape) == 5:
+                try:
+                    self._emit(chr(int(self._escape[1:], 16)))
+                except ValueError:
+                    return self._fail(f"invalid escape \\{self._escape}")
+                self._escape = None
+            return
+        if ch == "\\":
+            self._escape = ""
+        elif ch == '"':
+            self._in_string = False
+            if self._role == "key":
+                self._key = "".join(self._key_chars)
+                self._state = "colon"
+            elif self._role == "value":
+                self._state = "comma"
+        else:
+            self._emit(ch)
+
+
+# =============================
+# Rules
+# =============================
+def _sentences_begun(text: str) -> int:
+    text = text.strip()
+    return len(_NEXT_SENTENCE_RE.findall(text)) + 1 if text else 0
+
+
+@dataclass(frozen=True)
+class FieldLimit:
+    """Length limits for one JSON field (field=None: the whole completion text).
+
+    If the output is not JSON (and the rules allow that), field limits apply to the whole text.
+    """
+
+    field: Optional[str] = None
+    max_words: Optional[int] = None
+    max_chars: Optional[int] = None
+    max_sentences: Optional[int] = None
+    min_sentences: Optional[int] = None  # checked on the complete output
+    skip_subject_line: bool = False  # free-form email: a leading "Subject: ..." line is not counted
+
+
+@dataclass(frozen=True)
+class StreamRules:
+    json_object: bool = False  # the output must be one JSON object (abort at the first syntax error)
+    limits: Tuple[FieldLimit, ...] = ()
+    slack: float = 0.1  # cut off only once a word / char limit is exceeded by this fraction
+
+    def _text(self, limit: FieldLimit, text: str, parser: Optional[IncrementalJSON]) -> Optional[str]:
+        if limit.field is None or parser is None or parser.error is not None:
+            return _without_subject_line(text) if limit.skip_subject_line else text
+        return parser.value(limit.field)
+
+    def violation(self, text: str, parser: Optional[IncrementalJSON]) -> Optional[Tuple[str, str]]:
+        """(kind, reason) if the partial output already breaks a rule."""
+        if self.json_object and parser is not None and parser.error is not None:
+            return "invalid_json", f"invalid JSON: {parser.error}"
+        for limit in self.limits:
+            value = self._text(limit, text, parser)
+            if not value:
+                continue
+            label = limit.field or "output"
+            if limit.max_words is not None:
+                words = len(value.split())
+                if words > limit.max_words * (1 + self.slack):
+                    return "max_words", f"{label}: {words} words (limit {limit.max_words})"
+            if limit.max_chars is not None and len(value) > limit.max_chars * (1 + self.slack):
+                return "max_chars", f"{label}: {len(value)} chars (limit {limit.max_chars})"
+            if limit.max_sentences is not None:
+                sentences = _sentences_begun(value)
+                if sentences > limit.max_sentences:
+                    return "max_sentences", f"{label}: {sentences} sentences (limit {limit.max_sentences})"
+        return None
+
+    def final_violation(self, text: str, parser: Optional[IncrementalJSON]) -> Optional[Tuple[str, str]]:
+        """(kind, reason) if the complete output breaks a rule."""
+        found = self.violation(text, parser)
+        if found is not None:
+            return found
+        if self.json_object and parser is not None and not parser.closed:
+            return "invalid_json", "invalid JSON: truncated object"
+        for limit in self.limits:
+            if limit.min_sentences is None:
+                continue
+            sentences = _sentences_begun(self._text(limit, text, parser) or "")
+            if sentences < limit.min_sentences:
+                return "min_sentences", f"{limit.field or 'output'}: {sentences} sentences (minimum {limit.min_sentences})"
+        return None
+
+
+def _without_subject_line(text: str) -> str:
+    """Body of a free-form email: drops a first line starting with "Subject:" (as the opener writer
+    does); while that line is still streaming there is no body yet."""
+    if not text.lower().startswith("subject:"):
+        return text
+    _, newline, body = text.partition("\n")
+    return body if newline else ""
+
+
+# =============================
+# Stats
+# =============================
+class StreamStats:
+    """Per-stage streaming counters and time-to-first-token samples."""
+
+    def __init__(self, window: int = 1000):
+        self._lock = threading.Lock()
+        self._window = window
+        self._counts: Dict[str, Counter] = {}
+        self._ttft: Dict[str, Deque[float]] = {}
+
+    def record(self, stage: str, ttft: Optional[float], outcome: str) -> None:
+        with self._lock:
+            self._counts.setdefault(stage, Counter())[outcome] += 1
+            self._counts[stage]["streams"] += 1
+            if ttft is not None:
+                self._ttft.setdefault(stage, deque(maxlen=self._window)).append(ttft)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        out = {}
+        with self._lock:
+            for stage, counts in self._counts.items():
+                ttft = sorted(self._ttft.get(stage, ()))
+                streams = counts["streams"]
+                aborted = sum(n for k, n in counts.items() if k.startswith("aborted:"))
+                rejected = sum(n for k, n in counts.items() if k.startswith("rejected:"))
+                out[stage] = {
+                    **dict(counts),
+                    "abort_rate": round(aborted / streams, 4) if streams else 0.0,
+                    "reject_rate": round(rejected / streams, 4) if streams else 0.0,
+                    "ttft_p50_ms": round(ttft[len(ttft) // 2] * 1000, 1) if ttft else None,
+                    "ttft_p95_ms": round(ttft[min(len(ttft) - 1, int(len(ttft) * 0.95))] * 1000, 1) if ttft else None,
+                }
+        return out
+
+
+STATS = StreamStats()
+
+
+def stats() -> Dict[str, Dict[str, Any]]:
+    return STATS.stats()
+
+
+@atexit.register
+def _report() -> None:
+    for stage, s in STATS.stats().items():
+        print(
+            f"[LLMStream] {stage}: {s['streams']} stream(s), abort rate {s['abort_rate']:.1%}, "
+            f"reject rate {s['reject_rate']:.1%}, TTFT p50 {s['ttft_p50_ms']} ms / p95 {s['ttft_p95_ms']} ms"
+        )
+
+
+# =============================
+# Requests
+# =============================
+def _create(client, request: Dict[str, Any], timeout: Optional[float], **extra: Any):
+    if timeout is not None:
+        extra["timeout"] = timeout
+    if client is None:
+        return llm_pool.chat(**request, **extra)
+    return client.chat.completions.create(**request, **extra)
+
+
+def stream_text(
+    stage: str,
+    request: Dict[str, Any],
+    rules: Optional[StreamRules] = None,
+    *,
+    timeout: Optional[float] = None,
+    cancelled: Optional[threading.Event] = None,
+    client: Any = None,
+) -> Tuple[str, Any]:
+    """(content, usage) of a streamed completion, validated against `rules` as it arrives.
+
+    Raises StreamAborted (the stream is closed first) when a rule is broken, LLMDeadlineExceeded when
+    the stream outlives `timeout` and StreamCancelled once `cancelled` is set.
+    """
+    started = time.monotonic()
+    stream = _create(client, request, timeout, stream=True, stream_options={"include_usage": True})
+    parser = IncrementalJSON() if rules is not None and (rules.json_object or any(l.field for l in rules.limits)) else None
+    parts: List[str] = []
+    usage = None
+    ttft = None
+    try:
+        for chunk in stream:
+            if cancelled is not None and cancelled.is_set():
+                raise StreamCancelled(f"{stage}: a hedged request answered first")
+            if timeout is not None and time.monotonic() - started > timeout:
+                raise LLMDeadlineExceeded(f"{stage}: stream still running after {timeout:.1f}s")
+            usage = getattr(chunk, "usage", None) or usage
+            if not getattr(chunk, "choices", None):
+                continue
+            delta = chunk.choices[0].delta.content or ""
+            if not delta:
+                continue
+            if ttft is None:
+                ttft = time.monotonic() - started
+            parts.append(delta)
+            if rules is None:
+                continue
+            if parser is not None:
+                parser.feed(delta)
+            found = rules.violation("".join(parts), parser)
+            if found is not None:
+                raise StreamAborted(found[0], found[1], "".join(parts), early=True)
+        content = "".join(parts)
+        if rules is not None:
+            found = rules.final_violation(content.strip(), parser)
+            if found is not None:
+                raise StreamAborted(found[0], found[1], content, early=False)
+    except StreamAborted as e:
+        close = getattr(stream, "close", None)
+        if close is not None:
+            close()
+        STATS.record(stage, ttft, f"{'aborted' if e.early else 'rejected'}:{e.kind}")
+        elapsed = (time.monotonic() - started) * 1000
+        print(f"⚠️ [LLMStream] {stage}: {'cut off' if e.early else 'rejected'} after {elapsed:.0f} ms ({e.reason}).")
+        raise
+    except Exception as e:
+        close = getattr(stream, "close", None)
+        if close is not None:
+            close()
+        STATS.record(stage, ttft, "cancelled" if isinstance(e, StreamCancelled) else "errors")
+        raise
+    STATS.record(stage, ttft, "completed")
+    return content, usage
+
+
+def chat_text(stage: str, request: Dict[str, Any], rules: Optional[StreamRules] = None, *, client: Any = None) -> Tuple[str, Any]:
+    """(content, usage) for a chat-completions request: streamed and checked against `rules` when
+    streaming is enabled, a plain request otherwise; under the stage's resilience policy.
+    `client` overrides the shared pooled client (e.g. a client for another API key)."""
+    streaming = streaming_enabled()
+
+    def _attempt(timeout, cancelled):
+        if streaming:
+            return stream_text(stage, request, rules, timeout=timeout, cancelled=cancelled, client=client)
+        response = _create(client, request, timeout)
+        return response.choices[0].message.content, getattr(response, "usage", None)
+
+    return llm_resilience.run(stage, _attempt)
@@ -0,0 +1,61 @@
+import csv
+
+import pytest
+
+from workflows.universal_outreach_utils import crm_shards
+from workflows.universal_outreach_utils.crm_shards import StaleShardsError, build_shards, open_client_directory
+from workflows.universal_outreach_utils.crm_store import open_store
+from workflows.universal_outreach_utils.lead_identity import LeadIdentityIndex
+
+
+def _write_crm(path, rows):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f, quoting=csv.QUOTE_ALL)
+        writer.writerow(["Email", "Client Name", "Messaging Status"])
+        writer.writerows(rows)
+
+
+@pytest.fixture
+def crm(tmp_path):
+    path = tmp_path / "CRM_leads_copy.csv"
+    _write_crm(path, [["a@acme.com", "Acme", ""], ["b@globex.com", "Globex", ""]])
+    build_shards(path)
+    return path
+
+
+def test_sheet_import_after_build_is_detected(crm):
+    assert open_client_directory(crm) is not None
+    _write_crm(crm, [["a@acme.com", "Acme", ""], ["b@globex.com", "Globex", ""], ["c@initech.com", "Initech", ""]])
+    with pytest.raises(StaleShardsError):
+        open_client_directory(crm)
+    with pytest.raises(StaleShardsError):
+        crm_shards.resolve_client_path(crm, "initech")
+    assert "initech" in build_shards(crm).clients_present()
+
+
+def test_export_keeps_the_directory_fresh_and_counts_current(crm):
+    directory = open_client_directory(crm)
+    open_store(directory.shard_path("acme")).update("a@acme.com", {"Messaging Status": "Opener Sent"})
+    directory.clients["acme"]["rows"] = 7  # drifted count
+    directory.save()
+
+    crm_shards.export_csv(crm)
+
+    directory = open_client_directory(crm)
+    assert directory.entry("acme")["rows"] == 1
+    with open(crm, newline="", encoding="utf-8") as f:
+        assert {r["Email"]: r["Messaging Status"] for r in csv.DictReader(f)}["a@acme.com"] == "Opener Sent"
+    with pytest.raises(KeyError):
+        crm_shards.resolve_client_path(crm, "initech")
+
+
+def test_identity_index_seeds_from_the_shards(crm, tmp_path):
+    # A row that only the shard has: seeding from the canonical CSV would miss it
+    with open(open_client_directory(crm).shard_path("globex"), "a", newline="", encoding="utf-8") as f:
+        csv.writer(f, quoting=csv.QUOTE_ALL).writerow(["d@globex.com", "Globex", ""])
+    index = LeadIdentityIndex(tmp_path / "identity.sqlite3")
+    try:
+        assert index.ensure_seeded(crm)["seen"] == 3
+        assert index.owner("email", "d@globex.com")[1] == "globex"
+    finally:
+        index.close()
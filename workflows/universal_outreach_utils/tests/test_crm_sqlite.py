@@ -0,0 +1,49 @@
+import csv
+
+from workflows.universal_outreach_utils.crm_journal import CRMJournal, journal_path_for
+from workflows.universal_outreach_utils.crm_sqlite import MirrorBackedStore, open_mirror
+from workflows.universal_outreach_utils.crm_store import CRMStore, load_rows
+
+
+def _write_crm(path):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f, quoting=csv.QUOTE_ALL)
+        writer.writerow(["Email", "Client Name", "Messaging Status"])
+        writer.writerow(["a@acme.com", "Acme", ""])
+        writer.writerow(["b@acme.com", "Acme", ""])
+
+
+def test_compaction_updates_the_mirror_without_a_reimport(tmp_path):
+    crm = tmp_path / "CRM_leads_copy.csv"
+    _write_crm(crm)
+    mirror = open_mirror(crm, tmp_path / "mirror.sqlite3")
+
+    store = CRMStore(crm)
+    store.update("a@acme.com", {"Messaging Status": "Opener Sent", "Sequence Stage": "1"})
+    assert store.flush()
+
+    assert mirror.ensure_fresh(crm) is False  # the compaction was applied, not re-imported
+    assert mirror.get("a@acme.com")["Sequence Stage"] == "1"
+    assert [r["Email"] for r in mirror.untouched_leads("acme")] == ["b@acme.com"]
+    mirror.export_csv(tmp_path / "export.csv")
+    assert (tmp_path / "export.csv").read_bytes() == crm.read_bytes()
+
+
+def test_mirror_backed_store_writes_journal_and_mirror(tmp_path):
+    crm = tmp_path / "CRM_leads_copy.csv"
+    _write_crm(crm)
+    mirror = open_mirror(crm, tmp_path / "mirror.sqlite3")
+    store = MirrorBackedStore(mirror, crm, compact_min_entries=2)
+
+    assert store.update("b@acme.com", {"Messaging Status": "Opener Sent"}) == 1
+    assert store.update("b@acme.com", {"Messaging Status": "Opener Sent"}) == 0  # unchanged: not journaled
+    assert mirror.untouched_leads("acme")[0]["Email"] == "a@acme.com"
+    assert len(CRMJournal(journal_path_for(crm))) == 1
+    assert store.flush() is False  # below the compaction threshold
+
+    stats = store.reconcile([{"Email": "a@acme.com", "Messaging Status": "Opener Sent"}], ["Messaging Status"])
+    assert stats["changed"] == 1
+    assert store.flush() is True
+    assert not journal_path_for(crm).exists()
+    assert {r["Email"]: r["Messaging Status"] for r in load_rows(crm)} == {"a@acme.com": "Opener Sent", "b@acme.com": "Opener Sent"}
+    assert mirror.ensure_fresh(crm) is False
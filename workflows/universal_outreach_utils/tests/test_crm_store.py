@@ -0,0 +1,64 @@
+import csv
+import threading
+
+import pytest
+
+from workflows.universal_outreach_utils import crm_journal
+from workflows.universal_outreach_utils.crm_journal import CRMJournal, compact, journal_path_for
+from workflows.universal_outreach_utils.crm_store import CRMStore, load_rows
+
+
+def _write_crm(path):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f, quoting=csv.QUOTE_ALL)
+        writer.writerow(["Email", "Messaging Status", "Owner / Assigned To"])
+        writer.writerow(["a@acme.com", "", ""])
+        writer.writerow(["b@beta.com", "", ""])
+
+
+def test_flush_keeps_deltas_compacted_by_another_store(tmp_path):
+    crm = tmp_path / "CRM_leads_copy.csv"
+    _write_crm(crm)
+    a, b = CRMStore(crm), CRMStore(crm)  # two processes with the same CRM loaded
+
+    a.update("a@acme.com", {"Messaging Status": "Opener Sent"})
+    assert a.flush()
+    b.update("b@beta.com", {"Owner / Assigned To": "sales@ourdomain.com"})
+    assert b.flush()
+
+    rows = {r["Email"]: r.to_dict() for r in load_rows(crm)}
+    assert rows["a@acme.com"]["Messaging Status"] == "Opener Sent"
+    assert rows["b@beta.com"]["Owner / Assigned To"] == "sales@ourdomain.com"
+    assert not journal_path_for(crm).exists()
+    assert b.get("a@acme.com")["Messaging Status"] == "Opener Sent"
+
+
+def test_flush_keeps_columns_added_in_memory(tmp_path):
+    crm = tmp_path / "CRM_leads_copy.csv"
+    _write_crm(crm)
+    store = CRMStore(crm)
+    store.ensure_columns(["Variant"])
+    assert store.flush()
+    assert CRMStore(crm).fieldnames[-1] == "Variant"
+    assert compact(crm) == 0
+
+
+@pytest.mark.skipif(crm_journal.fcntl is None, reason="no inter-process lock without fcntl")
+def test_append_during_compaction_lands_in_the_fresh_journal(tmp_path):
+    path = journal_path_for(tmp_path / "CRM_leads_copy.csv")
+    compactor = CRMJournal(path)
+    compactor.append("a@acme.com", "Messaging Status", "Opener Sent")
+
+    with compactor.file_lock():
+        rotated = compactor.rotate()
+        # Another writer (own handle, as in another process) appends while the compaction is running
+        writer = threading.Thread(target=CRMJournal(path).append, args=("b@beta.com", "Messaging Status", "Replied"))
+        writer.start()
+        writer.join(0.2)
+        assert writer.is_alive()  # waits for the compaction instead of writing into the rotated file
+        folded = [e["email"] for e in compactor.replay_file(rotated)]
+        compactor.finish_compaction()
+    writer.join(5)
+
+    assert folded == ["a@acme.com"]
+    assert [e["email"] for e in compactor.replay()] == ["b@beta.com"]
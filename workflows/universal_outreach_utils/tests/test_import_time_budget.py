@@ -0,0 +1,26 @@
+import importlib.util
+import os
+from pathlib import Path
+
+import pytest
+
+_SCRIPT = Path(__file__).resolve().parents[3] / "scripts" / "import_time_budget.py"
+_spec = importlib.util.spec_from_file_location("import_time_budget", _SCRIPT)
+budget = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(budget)
+
+# Slower CI machines: IMPORT_BUDGET_SCALE=2 doubles every budget (same as the script's --scale)
+SCALE = float(os.getenv("IMPORT_BUDGET_SCALE", "1") or 1)
+
+
+@pytest.mark.parametrize("module", list(budget.BUDGETS_MS))
+def test_entry_point_import_is_fast_and_side_effect_free(module):
+    results = [budget.measure(module) for _ in range(3)]
+    error = next((r[2] for r in results if r[2]), None)
+    if error and error.startswith("ModuleNotFoundError"):
+        pytest.skip(f"dependency missing: {error}")
+    assert error is None, error
+    ms, slowest, _, events = min(results, key=lambda r: r[0] if r[0] is not None else float("inf"))
+    assert events == []
+    limit = budget.BUDGETS_MS[module] * SCALE
+    assert ms is not None and ms <= limit, f"{module}: {ms} ms > {limit:.0f} ms; slowest: {slowest[:5]}"
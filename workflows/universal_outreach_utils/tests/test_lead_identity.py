@@ -0,0 +1,34 @@
+import csv
+
+import pytest
+
+from workflows.universal_outreach_utils.lead_identity import LeadIdentityIndex, row_client
+
+
+def _write_crm(path, client_col, rows):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=["Email", "First Name", "Company Name", client_col])
+        writer.writeheader()
+        for email, client in rows:
+            writer.writerow({"Email": email, "First Name": "Ana", "Company Name": "Acme", client_col: client})
+
+
+@pytest.mark.parametrize("client_col", ["Client Name", "Client", "client"])
+def test_seeding_reads_the_crm_client_column(tmp_path, client_col):
+    crm = tmp_path / "CRM_leads_copy.csv"
+    _write_crm(crm, client_col, [("a@acme.com", "Acme Agency"), ("b@beta.com", "Beta Co")])
+    index = LeadIdentityIndex(tmp_path / "identity.sqlite3")
+    try:
+        index.ensure_seeded(crm)
+        assert index.owner("email", "a@acme.com")[1] == "acme agency"
+        res = index.observe({"Email": "a@acme.com", "First Name": "Ana", "Company Name": "Acme", client_col: "Acme Agency"}, "Acme Agency")
+        assert res["owner_client"] == "acme agency"
+        assert res["cross_client"] is False
+        assert index.observe({"Email": "a@acme.com", client_col: "Beta Co"}, "Beta Co")["cross_client"] is True
+    finally:
+        index.close()
+
+
+def test_row_client_skips_empty_projected_columns():
+    assert row_client({"Client Name": "", "Client": " Acme  Agency ", "client": ""}) == "acme agency"
+    assert row_client({"Client Name": "", "Client": ""}) == ""
@@ -0,0 +1,32 @@
+import asyncio
+
+import pytest
+
+from workflows.universal_outreach_utils import llm_pool
+
+
+@pytest.fixture
+def no_key(tmp_path, monkeypatch):
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    monkeypatch.setenv("OPENAI_KEY_PATH", str(tmp_path / "missing.json"))
+    llm_pool.reset()
+    yield
+    llm_pool.reset()
+
+
+def test_achat_without_a_key_raises_llm_unavailable(no_key):
+    with pytest.raises(llm_pool.LLMUnavailable):
+        asyncio.run(llm_pool.achat(model="gpt-4o-mini", messages=[]))
+
+
+def test_async_client_is_shared_within_a_loop(no_key):
+    pytest.importorskip("openai")
+    pytest.importorskip("httpx")
+
+    async def two_clients():
+        return llm_pool.get_async_client("sk-test"), llm_pool.get_async_client("sk-test")
+
+    first, second = asyncio.run(two_clients())
+    assert first is second
+    assert first.max_retries == 0
+    assert asyncio.run(two_clients())[0] is not first
@@ -0,0 +1,138 @@
+import time
+
+import pytest
+
+from workflows.universal_outreach_utils.llm_resilience import (
+    CircuitBreaker,
+    CircuitOpen,
+    LLMDeadlineExceeded,
+    LLMResilience,
+    is_transient,
+    parse_deadlines,
+)
+
+
+class _StatusError(Exception):
+    def __init__(self, status_code):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+
+class RateLimitError(Exception):
+    """Stands in for openai.RateLimitError (matched by class name)."""
+
+
+def _policy(**kwargs):
+    opts = {"deadlines_s": {"default": 5.0}, "retries": 2, "retry_base_s": 0.0, "retry_cap_s": 0.0}
+    opts.update(kwargs)
+    return LLMResilience(**opts)
+
+
+def _flaky(errors, result="ok"):
+    calls = []
+
+    def attempt(timeout, cancelled):
+        calls.append(timeout)
+        if len(calls) <= len(errors):
+            raise errors[len(calls) - 1]
+        return result
+
+    return attempt, calls
+
+
+@pytest.mark.parametrize("error", [TimeoutError(), ConnectionError(), _StatusError(429), _StatusError(503), RateLimitError()])
+def test_transient_errors(error):
+    assert is_transient(error)
+
+
+@pytest.mark.parametrize("error", [_StatusError(400), ValueError("bad json"), KeyError("x")])
+def test_non_transient_errors(error):
+    assert not is_transient(error)
+
+
+def test_parse_deadlines_skips_bad_entries():
+    assert parse_deadlines("default=45, opener=12.5,bogus,x=y") == {"default": 45.0, "opener": 12.5}
+
+
+def test_transient_errors_are_retried_until_success():
+    policy = _policy()
+    attempt, calls = _flaky([ConnectionError("reset"), _StatusError(500)])
+    assert policy.call("stage", attempt) == "ok"
+    assert len(calls) == 3
+    assert policy.stats()["stage"]["retries"] == 2
+    assert policy.breaker.state == "closed"
+
+
+def test_retries_stop_at_the_configured_count():
+    policy = _policy(retries=1)
+    attempt, calls = _flaky([ConnectionError()] * 5)
+    with pytest.raises(ConnectionError):
+        policy.call("stage", attempt)
+    assert len(calls) == 2
+
+
+def test_non_transient_errors_are_not_retried_and_do_not_trip_the_breaker():
+    policy = _policy(breaker=CircuitBreaker(failures=1, cooldown_s=60))
+    attempt, calls = _flaky([_StatusError(400)])
+    with pytest.raises(_StatusError):
+        policy.call("stage", attempt)
+    assert len(calls) == 1
+    assert policy.breaker.state == "closed"
+
+
+def test_each_attempt_gets_the_time_left_and_the_deadline_ends_the_call():
+    policy = _policy(deadlines_s={"default": 0.2}, retries=100)
+
+    def attempt(timeout, cancelled):
+        timeouts.append(timeout)
+        time.sleep(0.05)
+        raise TimeoutError("slow")
+
+    timeouts = []
+    started = time.monotonic()
+    with pytest.raises(TimeoutError):
+        policy.call("stage", attempt)
+    assert time.monotonic() - started < 1.0
+    assert 1 < len(timeouts) < 100
+    assert all(b < a for a, b in zip(timeouts, timeouts[1:]))
+    assert timeouts[0] <= 0.2
+
+
+def test_an_exhausted_deadline_fails_without_calling_the_attempt():
+    policy = _policy(deadlines_s={"default": 0.0})
+    attempt, calls = _flaky([])
+    with pytest.raises(LLMDeadlineExceeded):
+        policy.call("stage", attempt)
+    assert calls == []
+
+
+def test_breaker_opens_after_consecutive_failures_and_fails_fast():
+    policy = _policy(retries=0, breaker=CircuitBreaker(failures=2, cooldown_s=60))
+    attempt, calls = _flaky([ConnectionError()] * 2)
+    for _ in range(2):
+        with pytest.raises(ConnectionError):
+            policy.call("stage", attempt)
+    assert policy.breaker.state == "open"
+    with pytest.raises(CircuitOpen):
+        policy.call("stage", attempt)
+    assert len(calls) == 2
+    assert policy.stats()["stage"]["short_circuited"] == 1
+
+
+def test_half_open_lets_one_probe_through():
+    breaker = CircuitBreaker(failures=1, cooldown_s=0.05)
+    breaker.failure()
+    assert breaker.state == "open"
+    assert not breaker.allow()
+    time.sleep(0.06)
+    assert breaker.allow()
+    assert breaker.state == "half_open"
+    assert not breaker.allow()  # only one probe at a time
+    breaker.failure()  # failed probe: open again for another cooldown
+    assert breaker.state == "open"
+    assert not breaker.allow()
+    time.sleep(0.06)
+    assert breaker.allow()
+    breaker.success()
+    assert breaker.state == "closed"
+    assert breaker.allow() and breaker.allow()
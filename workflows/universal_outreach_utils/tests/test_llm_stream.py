@@ -0,0 +1,114 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from workflows.universal_outreach_utils.llm_stream import (
+    FieldLimit,
+    IncrementalJSON,
+    StreamAborted,
+    StreamRules,
+    stream_text,
+)
+
+
+def _feed_in_chunks(text, size):
+    parser = IncrementalJSON()
+    for i in range(0, len(text), size):
+        parser.feed(text[i:i + size])
+    return parser
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 1000])
+def test_chunked_feed_decodes_escapes_like_json_loads(size):
+    doc = {"subject": 'Say "hi" \\ café', "body": "line one\nline\ttwo — done/", "n": 3, "extra": {"a": ["}"]}}
+    text = json.dumps(doc)  # ensure_ascii: é / — arrive as \uXXXX escapes split across chunks
+    parser = _feed_in_chunks(text, size)
+    assert parser.error is None
+    assert parser.closed
+    assert parser.value("subject") == doc["subject"]
+    assert parser.value("body") == doc["body"]
+    assert parser.value("extra") is None  # nested values are skipped
+
+
+def test_partial_value_is_visible_before_the_string_closes():
+    parser = IncrementalJSON()
+    parser.feed('{"body": "Hello wor')
+    assert parser.value("body") == "Hello wor"
+    assert parser.value("subject") is None
+    assert not parser.closed
+
+
+@pytest.mark.parametrize("text", ['["not an object"]', '{"a": tru}', '{"a": "x" "b"}', '{"a": "\\q"}', '{"a": "\\u12G4"}'])
+def test_syntax_errors_are_reported_at_the_first_bad_character(text):
+    parser = _feed_in_chunks(text, 1)
+    assert parser.error is not None
+
+
+def test_word_limit_cuts_off_only_past_the_slack():
+    rules = StreamRules(json_object=True, limits=(FieldLimit("body", max_words=10),), slack=0.1)
+    parser = IncrementalJSON()
+    parser.feed('{"body": "' + " ".join(["w"] * 11))
+    assert rules.violation("", parser) is None
+    parser.feed(" w")
+    assert rules.violation("", parser)[0] == "max_words"
+
+
+def test_sentence_limit_cuts_off_once_the_next_sentence_begins():
+    rules = StreamRules(limits=(FieldLimit(max_sentences=2),))
+    assert rules.violation("One. Two.", None) is None
+    assert rules.violation("One. Two. ", None) is None
+    assert rules.violation("One. Two. T", None)[0] == "max_sentences"
+
+
+def test_subject_line_is_not_counted_against_the_body():
+    rules = StreamRules(limits=(FieldLimit(max_words=3, skip_subject_line=True),), slack=0.0)
+    assert rules.violation("Subject: a very long subject line here", None) is None
+    assert rules.violation("Subject: x\nOne two three four", None)[0] == "max_words"
+
+
+def test_final_checks_reject_truncated_json_and_short_output():
+    rules = StreamRules(json_object=True, limits=(FieldLimit("body", min_sentences=2),))
+    truncated = _feed_in_chunks('{"body": "One. Two."', 4)
+    assert rules.final_violation("", truncated)[0] == "invalid_json"
+    short = _feed_in_chunks('{"body": "Only one."}', 4)
+    assert rules.final_violation("", short)[0] == "min_sentences"
+    ok = _feed_in_chunks('{"body": "One. Two."}', 4)
+    assert rules.final_violation("", ok) is None
+
+
+class _FakeStream:
+    def __init__(self, deltas):
+        self.deltas = deltas
+        self.sent = 0
+        self.closed = False
+
+    def __iter__(self):
+        for delta in self.deltas:
+            self.sent += 1
+            yield SimpleNamespace(usage=None, choices=[SimpleNamespace(delta=SimpleNamespace(content=delta))])
+
+    def close(self):
+        self.closed = True
+
+
+def _client(stream):
+    return SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=lambda **_: stream)))
+
+
+def test_stream_is_closed_as_soon_as_the_word_limit_is_exceeded():
+    stream = _FakeStream(['{"body": "'] + ["word "] * 50 + ['"}'])
+    rules = StreamRules(json_object=True, limits=(FieldLimit("body", max_words=5),), slack=0.0)
+    with pytest.raises(StreamAborted) as info:
+        stream_text("test_stage", {"model": "m", "messages": []}, rules, client=_client(stream))
+    assert info.value.kind == "max_words"
+    assert info.value.early
+    assert stream.closed
+    assert stream.sent < 10
+
+
+def test_complete_stream_is_returned_when_it_passes_the_rules():
+    stream = _FakeStream(['{"body": ', '"Hi there', '. Bye."}'])
+    rules = StreamRules(json_object=True, limits=(FieldLimit("body", max_words=5, min_sentences=2),))
+    content, _ = stream_text("test_stage", {"model": "m", "messages": []}, rules, client=_client(stream))
+    assert json.loads(content) == {"body": "Hi there. Bye."}
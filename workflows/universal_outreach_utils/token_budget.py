@@ -0,0 +1,232 @@
+"""
+Token counting and per-stage input budgets for LLM requests.
+
+Centralizes:
+- Token counts from the model's real BPE tokenizer (tiktoken), with a chat-message overhead per
+  message like the API applies; an approximate counter is used when tiktoken (or its encoding file)
+  is unavailable, and that is logged once
+- Input budgets per stage (personalize_email, personalize_subject, ...)
+- Trimming lead fields to fit a budget, lowest-priority field first, each down to a floor
+- One log line per request: counted vs. budgeted tokens (and what was trimmed), plus the prompt
+  tokens the API reports, to keep the counter honest
+
+Prompt size used to be estimated as `len(prompt.split())` and nothing bounded it: one lead with a
+scraped multi-page `Overview` made its request several times larger (slower and more expensive)
+than the rest of the campaign.
+
+tiktoken downloads its encoding files on first use; for offline hosts point TIKTOKEN_CACHE_DIR at a
+directory that already holds them.
+
+    export PROMPT_TOKEN_BUDGETS="personalize_email=2000,personalize_subject=900"   # or "off"
+
+    budget = open_token_budget()
+    body = budget.fit("personalize_email", lead, build_request, model="gpt-4o-mini")
+
+Path suggestion: workflows/universal_outreach_utils/token_budget.py
+"""
+from __future__ import annotations
+
+import os
+import re
+import threading
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Mapping, Optional, Sequence, Tuple
+
+try:
+    import tiktoken
+except ImportError:  # optional: counts fall back to an approximation
+    tiktoken = None
+
+ENV_BUDGETS = "PROMPT_TOKEN_BUDGETS"
+
+DEFAULT_MODEL = "gpt-4o-mini"
+DEFAULT_BUDGETS: Dict[str, int] = {
+    "personalize_email": 2000,
+    "personalize_subject": 900,
+    "fused_opener": 3000,
+}
+
+# Lead fields that may be shortened, lowest priority first, with the tokens each always keeps
+FIELD_PRIORITY: Tuple[Tuple[str, int], ...] = (
+    ("Overview", 48),
+    ("Custom 1", 24),
+    ("Custom 2", 24),
+    ("Industry", 8),
+)
+
+# Chat format overhead (per message, and for priming the reply), as documented for the chat models
+_TOKENS_PER_MESSAGE = 3
+_TOKENS_PER_REPLY = 3
+
+# Approximate BPE pieces: short word chunks, digit groups, single punctuation marks
+_APPROX_PIECE_RE = re.compile(r"\s?[^\W\d_]{1,6}|\s?\d{1,3}|\s?[^\w\s]|\s+")
+
+
+class Tokenizer:
+    """encode / count / truncate for one model; approximate when tiktoken cannot load."""
+
+    def __init__(self, model: str = DEFAULT_MODEL):
+        self.model = model
+        self._encoding = None
+        self.name = "approx"
+        if tiktoken is None:
+            print("⚠️ [TokenBudget] tiktoken is not installed; token counts are approximate.")
+            return
+        try:
+            try:
+                self._encoding = tiktoken.encoding_for_model(model)
+            except KeyError:
+                self._encoding = tiktoken.get_encoding("o200k_base")
+            self.name = f"tiktoken:{self._encoding.name}"
+        except Exception as e:  # e.g. offline without a TIKTOKEN_CACHE_DIR
+            print(f"⚠️ [TokenBudget] Could not load the tokenizer for {model} ({e}); token counts are approximate.")
+
+    def encode(self, text: str) -> List[Any]:
+        if self._encoding is not None:
+            return self._encoding.encode(text or "", disallowed_special=())
+        return _APPROX_PIECE_RE.findall(text or "")
+
+    def count(self, text: str) -> int:
+        return len(self.encode(text))
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        """`text` cut to at most `max_tokens` tokens (at a token boundary, trailing space dropped)."""
+        tokens = self.encode(text)
+        if len(tokens) <= max_tokens:
+            return text
+        head = tokens[:max(0, max_tokens)]
+        cut = self._encoding.decode(head) if self._encoding is not None else "".join(head)
+        return cut.rstrip()
+
+    def count_messages(self, messages: Sequence[Mapping[str, Any]]) -> int:
+        total = _TOKENS_PER_REPLY
+        for message in messages:
+            total += _TOKENS_PER_MESSAGE
+            for value in message.values():
+                if isinstance(value, str):
+                    total += self.count(value)
+        return total
+
+
+@lru_cache(maxsize=16)
+def tokenizer_for(model: str = DEFAULT_MODEL) -> Tokenizer:
+    return Tokenizer(model)
+
+
+def count_tokens(text: str, model: str = DEFAULT_MODEL) -> int:
+    return tokenizer_for(model).count(text)
+
+
+def parse_budgets(spec: str) -> Dict[str, int]:
+    """'stage=tokens,stage=tokens' -> {stage: tokens} (malformed entries are skipped with a warning)."""
+    budgets: Dict[str, int] = {}
+    for item in (spec or "").split(","):
+        if not item.strip():
+            continue
+        stage, _, value = item.partition("=")
+        try:
+            budgets[stage.strip()] = int(value)
+        except ValueError:
+            print(f"⚠️ [TokenBudget] Ignoring malformed budget {item.strip()!r} in {ENV_BUDGETS}.")
+    return budgets
+
+
+class TokenBudget:
+    """Per-stage input budgets, enforced by trimming lead fields in FIELD_PRIORITY order."""
+
+    def __init__(
+        self,
+        budgets: Optional[Mapping[str, int]] = None,
+        priority: Sequence[Tuple[str, int]] = FIELD_PRIORITY,
+    ):
+        self.budgets = dict(DEFAULT_BUDGETS if budgets is None else budgets)
+        self.priority = tuple(priority)
+        self._lock = threading.Lock()
+        self.stats: Dict[str, Dict[str, int]] = {}
+
+    def budget(self, stage: str) -> Optional[int]:
+        return self.budgets.get(stage)
+
+    def _record(self, stage: str, **deltas: int) -> None:
+        with self._lock:
+            row = self.stats.setdefault(stage, {"requests": 0, "trimmed": 0, "over_budget": 0, "tokens": 0})
+            for k, v in deltas.items():
+                row[k] += v
+
+    def fit(
+        self,
+        stage: str,
+        lead: Mapping[str, Any],
+        build: Callable[[Mapping[str, Any]], Any],
+        *,
+        messages_of: Callable[[Any], Sequence[Mapping[str, Any]]] = lambda body: body["messages"],
+        model: str = DEFAULT_MODEL,
+    ) -> Any:
+        """
+        build(lead) for the stage, re-built from a trimmed copy of the lead if its messages exceed
+        the stage budget. Fields are shortened lowest priority first, each by the remaining excess
+        but never below its floor; a request that still does not fit is sent as is (and logged).
+        """
+        tok = tokenizer_for(model)
+        result = build(lead)
+        tokens = tok.count_messages(messages_of(result))
+        budget = self.budget(stage)
+        trims: List[str] = []
+        if budget is not None and tokens > budget:
+            trimmed = {k: lead[k] for k in lead}
+            for field, floor in self.priority:
+                value = trimmed.get(field)
+                if not isinstance(value, str) or not value:
+                    continue
+                field_tokens = tok.count(value)
+                keep = max(floor, field_tokens - (tokens - budget))
+                if keep >= field_tokens:
+                    continue
+                before = tokens
+                trimmed[field] = tok.truncate(value, keep)
+                result = build(trimmed)
+                tokens = tok.count_messages(messages_of(result))
+                # A field rendered into both the prompt and the payload shrinks the request twice as
+                # fast as the field itself: give back what the budget still allows (one rebuild)
+                dropped_per_token = (before - tokens) / (field_tokens - keep)
+                if tokens < budget and dropped_per_token > 1:
+                    relaxed = min(field_tokens, keep + int((budget - tokens) / dropped_per_token))
+                    if relaxed > keep:
+                        candidate = dict(trimmed, **{field: tok.truncate(value, relaxed)})
+                        candidate_result = build(candidate)
+                        candidate_tokens = tok.count_messages(messages_of(candidate_result))
+                        if candidate_tokens <= budget:
+                            trimmed, result, tokens, keep = candidate, candidate_result, candidate_tokens, relaxed
+                trims.append(f"{field} {field_tokens}->{keep}")
+                if tokens <= budget:
+                    break
+        over = budget is not None and tokens > budget
+        self._record(stage, requests=1, trimmed=int(bool(trims)), over_budget=int(over), tokens=tokens)
+        line = f"[TokenBudget] {stage}: {tokens}/{budget if budget is not None else '-'} input tokens ({tok.name})"
+        if trims:
+            line += f"; trimmed {', '.join(trims)}"
+        print(("⚠️ " if over else "") + line + ("; still over budget, sending as is" if over else ""))
+        return result
+
+    @staticmethod
+    def report_usage(stage: str, messages: Sequence[Mapping[str, Any]], usage: Any, model: str = DEFAULT_MODEL) -> None:
+        """Log the prompt tokens the API billed next to the local count."""
+        actual = getattr(usage, "prompt_tokens", None)
+        if actual is None:
+            return
+        counted = tokenizer_for(model).count_messages(messages)
+        print(f"[TokenBudget] {stage}: API reported {actual} prompt tokens (counted {counted}).")
+
+
+_budget: Optional[TokenBudget] = None
+
+
+def open_token_budget() -> Optional[TokenBudget]:
+    """The process-wide TokenBudget configured from PROMPT_TOKEN_BUDGETS, or None when set to 'off'."""
+    global _budget
+    spec = os.environ.get(ENV_BUDGETS, "").strip()
+    if spec.lower() in ("off", "0", "false", "none"):
+        return None
+    if _budget is None:
+        _budget = TokenBudget(dict(DEFAULT_BUDGETS, **parse_budgets(spec)))
+    return _budget